@@ -0,0 +1,83 @@
+"""
+Startup regression benchmark for the TAO CLI.
+
+Runs `python -X importtime` on the CLI entry module in a fresh interpreter
+several times, reports the slowest imports of the best run, and exits
+non-zero when the cold-start import time exceeds the budget.
+
+Usage:
+    python benchmarks/startup_importtime.py [--budget-ms 150] [--runs 5] [--module tao.main]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+SRC_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+def measure(module: str) -> Tuple[int, List[Tuple[str, int, int]]]:
+    """
+    Import `module` in a fresh interpreter.
+
+    Returns:
+        Tuple[int, List[Tuple[str, int, int]]]: The cumulative import time of
+        the module in microseconds, and (name, self_us, cumulative_us) for
+        every module it imported.
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SRC_DIRECTORY, env.get('PYTHONPATH')]))
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               capture_output=True, text=True, env=env)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+
+    imports = []
+    total = 0
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        imports.append((name, self_us, cumulative_us))
+        if len(indent) == 1:
+            total += cumulative_us
+    return total, imports
+
+
+def summarize(imports: List[Tuple[str, int, int]], top: int) -> List[Tuple[str, int]]:
+    # Attribute time to top-level packages so one heavy dependency stands out
+    packages: Dict[str, int] = {}
+    for name, self_us, _ in imports:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check TAO CLI cold-start import time against a budget")
+    parser.add_argument('--module', default='tao.main', help="Module whose import time is measured")
+    parser.add_argument('--budget-ms', type=float, default=150.0, help="Maximum allowed import time")
+    parser.add_argument('--runs', type=int, default=5, help="Number of fresh interpreters; the best run counts")
+    parser.add_argument('--top', type=int, default=10, help="Number of packages to report")
+    args = parser.parse_args()
+
+    results = [measure(args.module) for _ in range(max(1, args.runs))]
+    total, imports = min(results, key=lambda result: result[0])
+    total_ms = total / 1000.0
+
+    print(f"{args.module}: {total_ms:.1f} ms (best of {len(results)}, budget {args.budget_ms:.0f} ms)")
+    for package, self_us in summarize(imports, args.top):
+        print(f"  {package:<30} {self_us / 1000.0:8.1f} ms")
+
+    if total_ms > args.budget_ms:
+        print(f"Startup budget exceeded by {total_ms - args.budget_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
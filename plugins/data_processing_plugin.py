@@ -0,0 +1,221 @@
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+import pandas as pd
+from tao.base_plugin import BasePlugin
+
+logger = logging.getLogger(__name__)
+
+FILTER_OPERATORS = {
+    '==': lambda column, value: column == value,
+    '!=': lambda column, value: column != value,
+    '<': lambda column, value: column < value,
+    '<=': lambda column, value: column <= value,
+    '>': lambda column, value: column > value,
+    '>=': lambda column, value: column >= value,
+    'in': lambda column, value: column.isin(value),
+    'not_in': lambda column, value: ~column.isin(value),
+    'between': lambda column, value: column.between(value[0], value[1]),
+    'is_null': lambda column, value: column.isna(),
+    'not_null': lambda column, value: column.notna(),
+    'contains': lambda column, value: column.astype(str).str.contains(value, regex=False),
+}
+
+# How each aggregate is computed per chunk and how the chunk partials combine
+_PARTIALS = {'sum': ('sum',), 'count': ('count',), 'min': ('min',), 'max': ('max',), 'mean': ('sum', 'count')}
+_COMBINE = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+_ALL_ROWS = '__all_rows__'
+
+
+class DataProcessingPlugin(BasePlugin):
+    """
+    Streams CSV files in fixed-size chunks, so memory stays bounded by the
+    chunk size whatever the file size.
+
+    `process_csv_files` parameters:
+        input_files: CSV paths, or `input_directory` with an optional `pattern` (default *.csv).
+        output_directory: Where `<name>.processed.csv` (and `<name>.aggregate.csv`) are written.
+            Without it, nothing is written and only counts and aggregates are returned.
+        chunk_size: Rows per chunk (default 100000).
+        columns: Columns to keep, in order. Only these and the filtered columns are parsed.
+        dtype: Column types passed to pandas.read_csv.
+        filters: List of {column, op, value}; op is one of ==, !=, <, <=, >, >=, in, not_in,
+            between, is_null, not_null or contains. Rows must match all filters.
+        aggregate: {group_by: [...], metrics: {name: {func, column}}}; func is sum, count, min,
+            max or mean. A count without a column counts rows.
+        max_workers: Files processed in parallel (default 4).
+    """
+
+    def initialize(self) -> None:
+        pass
+
+    def cleanup(self) -> None:
+        pass
+
+    def get_available_tasks(self) -> List[str]:
+        return ['process_csv_files']
+
+    def execute_task(self, task_name: str, parameters: Dict[str, Any], variables: Dict[str, Any]) -> Any:
+        if task_name == 'process_csv_files':
+            return self.process_csv_files(parameters)
+        raise ValueError(f"Unknown task: {task_name}")
+
+    def process_csv_files(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        files = self._input_files(parameters)
+        output_directory = parameters.get('output_directory')
+        if output_directory:
+            os.makedirs(output_directory, exist_ok=True)
+        self._validate(parameters)
+
+        start_time = time.perf_counter()
+        max_workers = max(1, min(int(parameters.get('max_workers', 4)), len(files) or 1))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tao-csv') as pool:
+            futures = [pool.submit(self._process_file, path, parameters, output_directory) for path in files]
+            processed = [future.result() for future in futures]
+        seconds = time.perf_counter() - start_time
+
+        rows_read = sum(result['rows_read'] for result in processed)
+        rows_written = sum(result['rows_written'] for result in processed)
+        logger.info(f"Processed {len(processed)} CSV files, {rows_read} rows in {seconds:.2f}s "
+                    f"({rows_read / seconds if seconds > 0 else 0:.0f} rows/s)")
+        return {
+            'processed_files': processed,
+            'file_count': len(processed),
+            'rows_read': rows_read,
+            'rows_written': rows_written,
+            'seconds': seconds,
+            'rows_per_second': rows_read / seconds if seconds > 0 else 0.0,
+        }
+
+    @staticmethod
+    def _input_files(parameters: Dict[str, Any]) -> List[str]:
+        if parameters.get('input_files') is not None:
+            files = parameters['input_files']
+            return [files] if isinstance(files, str) else list(files)
+        if parameters.get('input_directory'):
+            pattern = os.path.join(parameters['input_directory'], parameters.get('pattern', '*.csv'))
+            return sorted(glob.glob(pattern))
+        raise ValueError("process_csv_files needs input_files or input_directory")
+
+    @staticmethod
+    def _validate(parameters: Dict[str, Any]):
+        for condition in parameters.get('filters') or []:
+            if condition.get('op') not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown filter operator '{condition.get('op')}', expected one of "
+                                 f"{', '.join(FILTER_OPERATORS)}")
+        for name, metric in ((parameters.get('aggregate') or {}).get('metrics') or {}).items():
+            if metric.get('func') not in _PARTIALS:
+                raise ValueError(f"Unknown aggregate '{metric.get('func')}' for {name}, expected one of "
+                                 f"{', '.join(_PARTIALS)}")
+            if metric['func'] != 'count' and not metric.get('column'):
+                raise ValueError(f"Aggregate {name} needs a column")
+
+    def _process_file(self, path: str, parameters: Dict[str, Any], output_directory: Optional[str]) -> Dict[str, Any]:
+        columns = parameters.get('columns')
+        filters = parameters.get('filters') or []
+        aggregate = parameters.get('aggregate')
+        usecols = None
+        if columns:
+            # Parse only the columns something reads
+            needed = list(columns) + [condition['column'] for condition in filters]
+            if aggregate:
+                needed += list(aggregate.get('group_by') or [])
+                needed += [metric['column'] for metric in (aggregate.get('metrics') or {}).values()
+                           if metric.get('column')]
+            usecols = list(dict.fromkeys(needed))
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        output_path = os.path.join(output_directory, f"{name}.processed.csv") if output_directory else None
+        output = open(output_path, 'w', newline='') if output_path else None
+        rows_read = rows_written = 0
+        totals = None
+        start_time = time.perf_counter()
+        try:
+            reader = pd.read_csv(path, chunksize=int(parameters.get('chunk_size', 100000)), usecols=usecols,
+                                 dtype=parameters.get('dtype'))
+            for chunk in reader:
+                rows_read += len(chunk)
+                if filters:
+                    chunk = chunk[self._mask(chunk, filters)]
+                if aggregate:
+                    totals = self._combine(totals, self._partial_aggregate(chunk, aggregate), aggregate)
+                if columns:
+                    chunk = chunk[columns]
+                rows_written += len(chunk)
+                if output is not None:
+                    chunk.to_csv(output, header=output.tell() == 0, index=False)
+        finally:
+            if output is not None:
+                output.close()
+        seconds = time.perf_counter() - start_time
+
+        result = {
+            'file': path,
+            'output': output_path,
+            'rows_read': rows_read,
+            'rows_written': rows_written,
+            'seconds': seconds,
+            'rows_per_second': rows_read / seconds if seconds > 0 else 0.0,
+        }
+        if aggregate:
+            aggregates = self._finish_aggregate(totals, aggregate)
+            if output_directory:
+                result['aggregate_output'] = os.path.join(output_directory, f"{name}.aggregate.csv")
+                aggregates.to_csv(result['aggregate_output'], index=False)
+            result['aggregates'] = aggregates.to_dict(orient='records')
+        logger.info(f"Processed {path}: {rows_read} rows read, {rows_written} written, "
+                    f"{result['rows_per_second']:.0f} rows/s")
+        return result
+
+    @staticmethod
+    def _mask(chunk: pd.DataFrame, filters: List[Dict[str, Any]]):
+        mask = None
+        for condition in filters:
+            matches = FILTER_OPERATORS[condition['op']](chunk[condition['column']], condition.get('value'))
+            mask = matches if mask is None else mask & matches
+        return mask
+
+    @staticmethod
+    def _group_keys(aggregate: Dict[str, Any]) -> List[str]:
+        return list(aggregate.get('group_by') or []) or [_ALL_ROWS]
+
+    def _partial_aggregate(self, chunk: pd.DataFrame, aggregate: Dict[str, Any]) -> pd.DataFrame:
+        keys = self._group_keys(aggregate)
+        if keys == [_ALL_ROWS]:
+            chunk = chunk.assign(**{_ALL_ROWS: 0})
+        grouped = chunk.groupby(keys, sort=False, dropna=False)
+        parts = {}
+        for name, metric in aggregate['metrics'].items():
+            for partial in _PARTIALS[metric['func']]:
+                if partial == 'count' and not metric.get('column'):
+                    parts[f"{name}__count"] = grouped.size()
+                else:
+                    parts[f"{name}__{partial}"] = grouped[metric['column']].agg(partial)
+        return pd.DataFrame(parts)
+
+    def _combine(self, totals: Optional[pd.DataFrame], partial: pd.DataFrame,
+                 aggregate: Dict[str, Any]) -> pd.DataFrame:
+        if totals is None:
+            return partial
+        combined = pd.concat([totals, partial])
+        functions = {column: _COMBINE[column.rsplit('__', 1)[1]] for column in combined.columns}
+        return combined.groupby(level=list(range(combined.index.nlevels)), sort=False, dropna=False).agg(functions)
+
+    def _finish_aggregate(self, totals: Optional[pd.DataFrame], aggregate: Dict[str, Any]) -> pd.DataFrame:
+        keys = self._group_keys(aggregate)
+        metrics = aggregate['metrics']
+        if totals is None:
+            return pd.DataFrame(columns=[key for key in keys if key != _ALL_ROWS] + list(metrics))
+        result = pd.DataFrame(index=totals.index)
+        for name, metric in metrics.items():
+            if metric['func'] == 'mean':
+                result[name] = totals[f"{name}__sum"] / totals[f"{name}__count"]
+            else:
+                result[name] = totals[f"{name}__{_PARTIALS[metric['func']][0]}"]
+        result = result.reset_index()
+        if keys == [_ALL_ROWS]:
+            result = result.drop(columns=[_ALL_ROWS])
+        return result
@@ -0,0 +1,329 @@
+import errno
+import fnmatch
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from tao.base_plugin import BasePlugin
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+# Copy in pieces so very large files do not hit per-call limits
+_COPY_CHUNK = 1 << 30
+
+
+def _scan_directory(path: str) -> Tuple[int, Dict[str, List[float]], List[str]]:
+    """
+    List one directory: its mtime, its files with [size, mtime] and its subdirectories.
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    files: Dict[str, List[float]] = {}
+    directories: List[str] = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.name)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = [stat.st_size, stat.st_mtime]
+            except FileNotFoundError:
+                # Removed while we were listing
+                continue
+    return mtime_ns, files, directories
+
+
+def _restat(path: str, names: List[str]) -> Dict[str, List[float]]:
+    files = {}
+    for name in names:
+        try:
+            stat = os.stat(os.path.join(path, name))
+        except FileNotFoundError:
+            continue
+        files[name] = [stat.st_size, stat.st_mtime]
+    return files
+
+
+def copy_file(source: str, destination: str) -> int:
+    """
+    Copy file contents in the kernel where possible: copy_file_range (which
+    can share blocks on filesystems that support it), then sendfile, then a
+    buffered copy.
+
+    Returns:
+        int: Bytes copied.
+    """
+    with open(source, 'rb') as source_file, open(destination, 'wb') as destination_file:
+        size = os.fstat(source_file.fileno()).st_size
+        source_fd, destination_fd = source_file.fileno(), destination_file.fileno()
+        copied = 0
+        for method in ('copy_file_range', 'sendfile'):
+            if not hasattr(os, method) or copied:
+                continue
+            try:
+                while copied < size:
+                    count = min(_COPY_CHUNK, size - copied)
+                    if method == 'copy_file_range':
+                        sent = os.copy_file_range(source_fd, destination_fd, count)
+                    else:
+                        sent = os.sendfile(destination_fd, source_fd, copied, count)
+                    if sent == 0:
+                        break
+                    copied += sent
+            except OSError as e:
+                # Not supported for this pair of files; fall through to the next method
+                if e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF,
+                                   errno.ENOTSUP) or copied:
+                    raise
+            if copied >= size:
+                return copied
+        source_file.seek(copied)
+        destination_file.seek(copied)
+        shutil.copyfileobj(source_file, destination_file, 1 << 20)
+        return max(copied, destination_file.tell())
+
+
+class FileOperationsPlugin(BasePlugin):
+    """
+    File and directory operations for workflows.
+
+    Tasks:
+        list_files: directory, pattern (default *), recursive, index, verify, max_workers.
+            With `index`, a JSON file of paths, sizes and mtimes is kept between runs and
+            directories whose mtime has not changed are not listed again; `verify` (default
+            true) re-reads the sizes and mtimes of their files. The result then also lists
+            files added, modified (only with `verify`) and removed since the last run.
+        setup_directories: directories.
+        cleanup_temp_files: directory, pattern, recursive, older_than (seconds).
+        copy_files / move_files: files, or source_directory with pattern and recursive;
+            destination, overwrite (default true), preserve_metadata (copy only, default true),
+            max_workers.
+    """
+
+    def initialize(self) -> None:
+        pass
+
+    def cleanup(self) -> None:
+        pass
+
+    def get_available_tasks(self) -> List[str]:
+        return ['list_files', 'setup_directories', 'cleanup_temp_files', 'copy_files', 'move_files']
+
+    def execute_task(self, task_name: str, parameters: Dict[str, Any], variables: Dict[str, Any]) -> Any:
+        if task_name == 'list_files':
+            return self.list_files(parameters)
+        if task_name == 'setup_directories':
+            return self.setup_directories(parameters)
+        if task_name == 'cleanup_temp_files':
+            return self.cleanup_temp_files(parameters)
+        if task_name == 'copy_files':
+            return self.transfer_files(parameters, move=False)
+        if task_name == 'move_files':
+            return self.transfer_files(parameters, move=True)
+        raise ValueError(f"Unknown task: {task_name}")
+
+    def list_files(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        directory = parameters['directory']
+        pattern = parameters.get('pattern', '*')
+        recursive = bool(parameters.get('recursive', False))
+        index_path = parameters.get('index')
+        # Files rewritten in place do not change their directory's mtime, so only re-reading them finds the edits
+        verify = bool(parameters.get('verify', True))
+        start_time = time.perf_counter()
+
+        previous = self._load_index(index_path, directory, recursive) if index_path else {}
+        listing, rescanned = self._walk(directory, recursive, previous, verify, int(parameters.get('max_workers', 8)))
+        matches = re.compile(fnmatch.translate(pattern)).match
+
+        files = []
+        total_bytes = 0
+        for relative_directory, entry in listing.items():
+            prefix = directory if relative_directory == '.' else os.path.join(directory, relative_directory)
+            for name, (size, _) in entry['files'].items():
+                if matches(name):
+                    files.append(os.path.join(prefix, name))
+                    total_bytes += size
+        files.sort()
+        result = {'files': files, 'count': len(files), 'total_bytes': total_bytes,
+                  'directories_scanned': rescanned}
+        if index_path:
+            changes = self._changes(directory, previous, listing, matches)
+            unchanged = set(previous) == set(listing) and all(
+                entry['files'] is previous[relative]['files'] for relative, entry in listing.items())
+            if not unchanged:
+                self._save_index(index_path, directory, recursive, listing)
+            if not verify:
+                del changes['modified']
+            result.update(changes)
+        result['seconds'] = time.perf_counter() - start_time
+        logger.info(f"Listed {len(files)} files under {directory}, scanned {rescanned} of {len(listing)} directories")
+        return result
+
+    def _walk(self, directory: str, recursive: bool, previous: Dict[str, Any], verify: bool,
+              max_workers: int) -> Tuple[Dict[str, Any], int]:
+        """
+        Walk the tree a level at a time, listing the directories of each
+        level in parallel. Directories whose mtime matches the index reuse
+        its entries.
+        """
+        listing: Dict[str, Any] = {}
+        rescanned = 0
+        level = ['.']
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='tao-scan') as pool:
+            while level:
+                results = pool.map(lambda relative: (relative, self._list_directory(directory, relative,
+                                                                                    previous.get(relative), verify)),
+                                   level)
+                next_level = []
+                for relative, (entry, scanned) in results:
+                    if entry is None:
+                        continue
+                    listing[relative] = entry
+                    rescanned += scanned
+                    if recursive:
+                        next_level.extend(os.path.normpath(os.path.join(relative, name)) for name in entry['dirs'])
+                level = next_level
+        return listing, rescanned
+
+    @staticmethod
+    def _list_directory(root: str, relative: str, cached: Optional[Dict[str, Any]],
+                        verify: bool) -> Tuple[Optional[Dict[str, Any]], int]:
+        path = os.path.join(root, relative)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            if cached is not None and cached['mtime_ns'] == mtime_ns:
+                # No file was added, removed or renamed here since the index was written
+                files = cached['files']
+                if verify:
+                    restatted = _restat(path, list(files))
+                    # Keep the cached dict when nothing changed, so the index is not rewritten
+                    files = files if restatted == files else restatted
+                return {'mtime_ns': mtime_ns, 'files': files, 'dirs': cached['dirs']}, 0
+            mtime_ns, files, directories = _scan_directory(path)
+        except FileNotFoundError:
+            return None, 0
+        return {'mtime_ns': mtime_ns, 'files': files, 'dirs': directories}, 1
+
+    @staticmethod
+    def _load_index(index_path: str, directory: str, recursive: bool) -> Dict[str, Any]:
+        try:
+            with open(index_path, 'r') as file:
+                index = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable file index {index_path}: {str(e)}")
+            return {}
+        # A non-recursive index has no entries for subdirectories, and a recursive one would report them
+        if index.get('version') != INDEX_VERSION or index.get('root') != os.path.abspath(directory) \
+                or index.get('recursive') != recursive:
+            return {}
+        return index.get('directories', {})
+
+    @staticmethod
+    def _save_index(index_path: str, directory: str, recursive: bool, listing: Dict[str, Any]):
+        index = {'version': INDEX_VERSION, 'root': os.path.abspath(directory), 'recursive': recursive,
+                 'directories': listing}
+        temporary_path = f"{index_path}.tmp"
+        with open(temporary_path, 'w') as file:
+            file.write(json.dumps(index, separators=(',', ':')))
+        os.replace(temporary_path, index_path)
+
+    @staticmethod
+    def _changes(directory: str, previous: Dict[str, Any], listing: Dict[str, Any],
+                 matches) -> Dict[str, List[str]]:
+        added, modified, removed = [], [], []
+        for relative in set(previous) | set(listing):
+            before = previous.get(relative, {}).get('files', {})
+            after = listing.get(relative, {}).get('files', {})
+            if before is after:
+                # Reused from the index unchanged
+                continue
+            prefix = directory if relative == '.' else os.path.join(directory, relative)
+            for name, stat in after.items():
+                if matches(name):
+                    if name not in before:
+                        added.append(os.path.join(prefix, name))
+                    elif before[name] != stat:
+                        modified.append(os.path.join(prefix, name))
+            removed.extend(os.path.join(prefix, name) for name in before if name not in after and matches(name))
+        return {'added': sorted(added), 'modified': sorted(modified), 'removed': sorted(removed)}
+
+    def setup_directories(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        created, existing = [], []
+        for directory in parameters['directories']:
+            if os.path.isdir(directory):
+                existing.append(directory)
+            else:
+                os.makedirs(directory, exist_ok=True)
+                created.append(directory)
+        return {'created': created, 'existing': existing}
+
+    def cleanup_temp_files(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        listing = self.list_files({'directory': parameters['directory'], 'pattern': parameters.get('pattern', '*.tmp'),
+                                   'recursive': parameters.get('recursive', False)})
+        older_than = parameters.get('older_than')
+        cutoff = time.time() - float(older_than) if older_than is not None else None
+        removed = []
+        for path in listing['files']:
+            try:
+                if cutoff is not None and os.stat(path).st_mtime > cutoff:
+                    continue
+                os.remove(path)
+                removed.append(path)
+            except FileNotFoundError:
+                continue
+        return {'removed': removed, 'count': len(removed)}
+
+    def transfer_files(self, parameters: Dict[str, Any], move: bool = False) -> Dict[str, Any]:
+        destination = parameters['destination']
+        os.makedirs(destination, exist_ok=True)
+        overwrite = parameters.get('overwrite', True)
+        preserve_metadata = parameters.get('preserve_metadata', True)
+        pairs = []
+        if parameters.get('files') is not None:
+            for path in parameters['files']:
+                pairs.append((path, os.path.join(destination, os.path.basename(path))))
+        else:
+            source_directory = parameters['source_directory']
+            listing = self.list_files({'directory': source_directory, 'pattern': parameters.get('pattern', '*'),
+                                       'recursive': parameters.get('recursive', False)})
+            for path in listing['files']:
+                pairs.append((path, os.path.join(destination, os.path.relpath(path, source_directory))))
+
+        def transfer(pair: Tuple[str, str]) -> Optional[int]:
+            source, target = pair
+            if not overwrite and os.path.exists(target):
+                return None
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            if move:
+                try:
+                    size = os.stat(source).st_size
+                    os.replace(source, target)
+                    return size
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+            size = copy_file(source, target)
+            if preserve_metadata or move:
+                shutil.copystat(source, target)
+            if move:
+                os.remove(source)
+            return size
+
+        start_time = time.perf_counter()
+        max_workers = max(1, min(int(parameters.get('max_workers', 8)), len(pairs) or 1))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tao-copy') as pool:
+            sizes = list(pool.map(transfer, pairs))
+        done = [target for (_, target), size in zip(pairs, sizes) if size is not None]
+        skipped = [target for (_, target), size in zip(pairs, sizes) if size is None]
+        total_bytes = sum(size for size in sizes if size is not None)
+        seconds = time.perf_counter() - start_time
+        logger.info(f"{'Moved' if move else 'Copied'} {len(done)} files ({total_bytes} bytes) in {seconds:.2f}s")
+        return {'moved' if move else 'copied': done, 'skipped': skipped, 'count': len(done),
+                'bytes': total_bytes, 'seconds': seconds}
@@ -0,0 +1,103 @@
+import math
+import random
+import threading
+import time
+from typing import Dict, Any, List, Union
+from tao.base_plugin import BasePlugin
+
+
+class SyntheticFailure(RuntimeError):
+    pass
+
+
+class SyntheticPlugin(BasePlugin):
+    """
+    Stand-in plugin for load tests and fault injection.
+
+    The `work` task sleeps for a latency drawn from a distribution, burns
+    CPU, fails with a given probability and returns a payload of a given
+    size. `noop` returns immediately.
+
+    Parameters of `work`:
+        latency_ms: A number, or a mapping with `distribution` (constant,
+            uniform, normal, exponential, lognormal or pareto) and its
+            parameters: `mean`, `min`, `max`, `stddev`, `sigma`, `alpha`.
+        cpu_ms: Milliseconds of CPU to burn while holding the GIL.
+        payload_bytes: Size of the `payload` string in the result.
+        failure_rate: Probability of raising SyntheticFailure.
+        seed: Makes the latency and failure draws of the call reproducible.
+            Retries of a call with the same seed make new draws.
+    """
+
+    def initialize(self) -> None:
+        self.random = random.Random()
+        self.attempts: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def cleanup(self) -> None:
+        pass
+
+    def get_available_tasks(self) -> List[str]:
+        return ['work', 'noop']
+
+    def execute_task(self, task_name: str, parameters: Dict[str, Any], variables: Dict[str, Any]) -> Any:
+        if task_name == 'noop':
+            return {'ok': True}
+        if task_name != 'work':
+            raise ValueError(f"Unknown task: {task_name}")
+
+        if 'seed' in parameters:
+            with self._lock:
+                attempt = self.attempts.get(parameters['seed'], 0)
+                self.attempts[parameters['seed']] = attempt + 1
+            rng = random.Random(f"{parameters['seed']}:{attempt}" if attempt else parameters['seed'])
+        else:
+            rng = self.random
+        latency = self.sample_latency_ms(parameters.get('latency_ms', 0), rng) / 1000.0
+        if latency > 0:
+            time.sleep(latency)
+        cpu_ms = float(parameters.get('cpu_ms', 0))
+        if cpu_ms > 0:
+            self._burn_cpu(cpu_ms / 1000.0)
+        if rng.random() < float(parameters.get('failure_rate', 0.0)):
+            raise SyntheticFailure(f"Injected failure after {latency * 1000:.1f} ms")
+        return {
+            'latency_ms': latency * 1000,
+            'cpu_ms': cpu_ms,
+            'payload': 'x' * int(parameters.get('payload_bytes', 0)),
+        }
+
+    @staticmethod
+    def sample_latency_ms(spec: Union[float, Dict[str, Any]], rng: random.Random) -> float:
+        if not isinstance(spec, dict):
+            return max(0.0, float(spec))
+        distribution = spec.get('distribution', 'constant')
+        mean = float(spec.get('mean', 0.0))
+        if distribution == 'constant':
+            value = mean
+        elif distribution == 'uniform':
+            value = rng.uniform(float(spec.get('min', 0.0)), float(spec.get('max', 2 * mean)))
+        elif distribution == 'normal':
+            value = rng.gauss(mean, float(spec.get('stddev', mean / 4)))
+        elif distribution == 'exponential':
+            value = rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        elif distribution == 'lognormal':
+            # Parameterized so the distribution has the requested mean
+            sigma = float(spec.get('sigma', 0.5))
+            value = rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma) if mean > 0 else 0.0
+        elif distribution == 'pareto':
+            value = float(spec.get('min', mean / 2)) * rng.paretovariate(float(spec.get('alpha', 2.0)))
+        else:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        if 'max' in spec and distribution != 'uniform':
+            value = min(value, float(spec['max']))
+        return max(0.0, value)
+
+    @staticmethod
+    def _burn_cpu(seconds: float):
+        deadline = time.perf_counter() + seconds
+        value = 0
+        while time.perf_counter() < deadline:
+            for index in range(1000):
+                value += index * index
+        return value
@@ -1,16 +1,36 @@
 # TAO Agent v2.0
 
-from .workflow_engine import WorkflowEngine
-from .configuration_manager import ConfigurationManager
-from .plugin_system import PluginSystem
-from .ui_manager import UIManager
-from .task_executor import TaskExecutor
-from .variable_manager import VariableManager
-from .conditional_logic import ConditionalLogic
-from .error_handler import ErrorHandler
-from .state_machine import StateMachine
-from .progress_reporter import ProgressReporter
-from .base_plugin import BasePlugin
+import importlib
+
+# Components are imported on first attribute access, so importing the
+# package (e.g. for `tao --help`) does not load rich, jinja2 or pydantic.
+_LAZY_ATTRIBUTES = {
+    'WorkflowEngine': 'workflow_engine',
+    'ConfigurationManager': 'configuration_manager',
+    'PluginSystem': 'plugin_system',
+    'UIManager': 'ui_manager',
+    'TaskExecutor': 'task_executor',
+    'VariableManager': 'variable_manager',
+    'ConditionalLogic': 'conditional_logic',
+    'ErrorHandler': 'error_handler',
+    'StateMachine': 'state_machine',
+    'ProgressReporter': 'progress_reporter',
+    'BasePlugin': 'base_plugin',
+    'MetricsRegistry': 'metrics',
+    'WorkflowMetrics': 'metrics',
+    'MetricsServer': 'metrics',
+}
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 __all__ = [
     'WorkflowEngine',
@@ -24,6 +44,9 @@ __all__ = [
     'StateMachine',
     'ProgressReporter',
     'BasePlugin',
+    'MetricsRegistry',
+    'WorkflowMetrics',
+    'MetricsServer',
 ]
 
 __version__ = '2.0.0'
@@ -49,6 +72,14 @@ def create_workflow_engine(config_file: str):
     Returns:
     WorkflowEngine: An initialized WorkflowEngine instance.
     """
+    from .configuration_manager import ConfigurationManager
+    from .plugin_system import PluginSystem
+    from .ui_manager import UIManager
+    from .variable_manager import VariableManager
+    from .conditional_logic import ConditionalLogic
+    from .error_handler import ErrorHandler
+    from .workflow_engine import WorkflowEngine
+
     logger = initialize_logging()
     
     config_manager = ConfigurationManager(config_file)
@@ -58,7 +89,7 @@ def create_workflow_engine(config_file: str):
     ui_manager = UIManager(config.ui_config, logger)
     variable_manager = VariableManager(config.global_variables)
     conditional_logic = ConditionalLogic()
-    error_handler = ErrorHandler(config.error_handling, logger)
+    error_handler = ErrorHandler(config.error_handling.dict(by_alias=True), logger)
     
     workflow_engine = WorkflowEngine(
         config=config_manager,
@@ -0,0 +1,129 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+
+class BasePlugin(ABC):
+    # Set by PluginSystem before initialize(); see lease()
+    resource_pools = None
+
+    @abstractmethod
+    def initialize(self) -> None:
+        """
+        Initialize the plugin. This method should be called when the plugin is loaded.
+        """
+        pass
+
+    @abstractmethod
+    def execute_task(self, task_name: str, parameters: Dict[str, Any], variables: Dict[str, Any]) -> Any:
+        """
+        Execute a task defined by this plugin.
+
+        Args:
+            task_name (str): The name of the task to execute.
+            parameters (Dict[str, Any]): The parameters for the task.
+            variables (Dict[str, Any]): Task-specific variables.
+
+        Returns:
+            Any: The result of the task execution.
+        """
+        pass
+
+    @abstractmethod
+    def cleanup(self) -> None:
+        """
+        Perform any necessary cleanup operations when the plugin is unloaded.
+        """
+        pass
+
+    def execute_batch(self, task_name: str, parameters_list: List[Dict[str, Any]],
+                      variables: Dict[str, Any]) -> List[Any]:
+        """
+        Execute the same task for several parameter sets in one call.
+
+        Plugins that pay a per-call overhead (a connection, a request) can
+        override this to handle the whole batch at once. The default runs
+        the items one by one.
+
+        Args:
+            task_name (str): The name of the task to execute.
+            parameters_list (List[Dict[str, Any]]): The parameters of each invocation.
+            variables (Dict[str, Any]): Task-specific variables, shared by the batch.
+
+        Returns:
+            List[Any]: One result per item, in order. An item that failed may be
+            returned as an Exception instance to fail only that invocation.
+        """
+        results = []
+        for parameters in parameters_list:
+            try:
+                results.append(self.execute_task(task_name, parameters, variables))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def supports_batching(self) -> bool:
+        """
+        Return True if the plugin overrides execute_batch.
+        """
+        return type(self).execute_batch is not BasePlugin.execute_batch
+
+    def lease(self, pool_name: str, timeout: Optional[float] = None):
+        """
+        Lease a resource from a pool shared by all plugins, such as a database
+        connection or an HTTP session declared in `workflow_engine.resource_pools`.
+
+        Args:
+            pool_name (str): The name of the pool.
+            timeout (Optional[float]): Seconds to wait for a free resource.
+
+        Returns:
+            A context manager yielding the resource and returning it to the pool on exit.
+
+        Raises:
+            KeyError: If the pool is not configured.
+        """
+        if self.resource_pools is None:
+            raise KeyError(f"Resource pool not found: {pool_name}")
+        return self.resource_pools.lease(pool_name, timeout)
+
+    def validate_config(self, config: Dict[str, Any]) -> bool:
+        """
+        Validate the plugin configuration.
+
+        Args:
+            config (Dict[str, Any]): The configuration to validate.
+
+        Returns:
+            bool: True if the configuration is valid, False otherwise.
+        """
+        return True
+
+    def get_available_tasks(self) -> List[str]:
+        """
+        Return a list of available tasks provided by this plugin.
+
+        Returns:
+            List[str]: A list of task names available in this plugin.
+        """
+        return []
+
+    def set_variable(self, name: str, value: Any) -> None:
+        """
+        Set a variable in the plugin's context.
+
+        Args:
+            name (str): The name of the variable.
+            value (Any): The value to set.
+        """
+        pass
+
+    def get_variable(self, name: str) -> Any:
+        """
+        Get the value of a variable from the plugin's context.
+
+        Args:
+            name (str): The name of the variable.
+
+        Returns:
+            Any: The value of the variable, or None if not found.
+        """
+        pass
\ No newline at end of file
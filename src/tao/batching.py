@@ -0,0 +1,101 @@
+import threading
+import time
+from typing import Dict, Any, List, Callable, Optional, Tuple
+import logging
+
+
+class _PendingInvocation:
+    __slots__ = ('parameters', 'variables', 'result', 'error', 'finished', 'promoted', 'event')
+
+    def __init__(self, parameters: Dict[str, Any], variables: Dict[str, Any]):
+        self.parameters = parameters
+        self.variables = variables
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished = False
+        self.promoted = False
+        self.event = threading.Event()
+
+
+class InvocationBatcher:
+    """
+    Coalesces concurrent invocations of the same plugin function into one
+    execute_batch call.
+
+    The first caller for a plugin/function becomes the leader. It waits
+    until max_size invocations are pending or linger_ms has passed, then
+    runs the batch and hands each caller its own result. Invocations left
+    over when a batch is full go to the next leader. Only invocations
+    with equal variables share a batch, because a batch receives one
+    variables mapping.
+    """
+
+    def __init__(self, execute_batch: Callable[[str, str, List[Dict[str, Any]], Dict[str, Any]], List[Any]],
+                 logger: logging.Logger):
+        self.execute_batch = execute_batch
+        self.logger = logger
+        self._pending: Dict[Tuple[str, str], List[_PendingInvocation]] = {}
+        self._condition = threading.Condition()
+
+    def submit(self, plugin_name: str, function_name: str, parameters: Dict[str, Any], variables: Dict[str, Any],
+               max_size: int = 32, linger_ms: float = 5.0) -> Any:
+        key = (plugin_name, function_name)
+        invocation = _PendingInvocation(parameters, variables)
+        with self._condition:
+            pending = self._pending.setdefault(key, [])
+            pending.append(invocation)
+            leader = len(pending) == 1
+            if len(pending) >= max_size:
+                self._condition.notify_all()
+
+        while not leader:
+            invocation.event.wait()
+            invocation.event.clear()
+            if invocation.finished:
+                break
+            leader = invocation.promoted
+
+        if not invocation.finished:
+            self._lead(key, max_size, linger_ms / 1000.0)
+        if invocation.error is not None:
+            raise invocation.error
+        return invocation.result
+
+    def _lead(self, key: Tuple[str, str], max_size: int, linger: float):
+        deadline = time.monotonic() + linger
+        with self._condition:
+            while len(self._pending[key]) < max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            pending = self._pending[key]
+            variables = pending[0].variables
+            batch = [item for item in pending if item.variables == variables][:max_size]
+            batched = set(map(id, batch))
+            remainder = [item for item in pending if id(item) not in batched]
+            if remainder:
+                self._pending[key] = remainder
+                remainder[0].promoted = True
+                remainder[0].event.set()
+            else:
+                del self._pending[key]
+
+        plugin_name, function_name = key
+        self.logger.debug(f"Executing batch of {len(batch)} for '{plugin_name}.{function_name}'")
+        try:
+            results = self.execute_batch(plugin_name, function_name, [item.parameters for item in batch], variables)
+            if len(results) != len(batch):
+                raise ValueError(f"Plugin '{plugin_name}' returned {len(results)} results "
+                                 f"for a batch of {len(batch)}")
+            for item, result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    item.error = result
+                else:
+                    item.result = result
+        except Exception as e:
+            for item in batch:
+                item.error = e
+        for item in batch:
+            item.finished = True
+            item.event.set()
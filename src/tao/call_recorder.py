@@ -0,0 +1,173 @@
+import builtins
+import copy
+import gzip
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Deque, Optional, Tuple
+import logging
+
+FORMAT = 'tao-calls'
+FORMAT_VERSION = 1
+
+
+def call_key(plugin_name: str, task_name: str, parameters: Dict[str, Any]) -> str:
+    """
+    Identify a call by plugin, function and resolved parameters. Workflow
+    variables are left out, since they change as a run progresses.
+    """
+    encoded = json.dumps([plugin_name, task_name, parameters], sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def _open(path: str, mode: str):
+    # Recordings ending in .gz are compressed
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class CallRecorder:
+    """
+    Appends one JSON line per plugin call to a local file: the call's key,
+    its parameters, its result or exception, and how long it took.
+
+    Results are stored as JSON, so values JSON cannot represent are
+    recorded as strings.
+    """
+
+    def __init__(self, path: str, logger: logging.Logger, include_parameters: bool = True):
+        self.path = path
+        self.logger = logger
+        self.include_parameters = include_parameters
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._file = _open(path, 'w')
+        self._write({'format': FORMAT, 'version': FORMAT_VERSION, 'recorded_at': self._started})
+        self.logger.info(f"Recording plugin calls to {path}")
+
+    def record(self, plugin_name: str, task_name: str, parameters: Dict[str, Any], started_at: float,
+               duration: float, result: Any = None, error: Optional[BaseException] = None):
+        entry = {
+            'key': call_key(plugin_name, task_name, parameters),
+            'plugin': plugin_name,
+            'function': task_name,
+            'offset': round(started_at - self._started, 6),
+            'duration': round(duration, 6),
+        }
+        if self.include_parameters:
+            entry['parameters'] = parameters
+        if error is None:
+            entry['result'] = result
+        else:
+            entry['error'] = {'module': type(error).__module__, 'type': type(error).__qualname__,
+                              'args': list(error.args), 'message': str(error)}
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(entry)
+            self.calls += 1
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, default=str, separators=(',', ':')) + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self.logger.info(f"Recorded {self.calls} plugin calls to {self.path}")
+
+
+class RecordedCallError(RuntimeError):
+    """
+    Stands in for a recorded exception whose type is not available.
+    """
+
+
+class CallReplayer:
+    """
+    Serves plugin calls from a recording made by CallRecorder.
+
+    Calls are matched by plugin, function and parameters. Identical calls
+    get their recorded outcomes in order, and the last one is repeated once
+    they run out. Recorded exceptions are raised again; their type is
+    rebuilt when it is a builtin or its module is already imported, and is
+    a RecordedCallError otherwise.
+
+    Args:
+        path (str): The recording.
+        logger (logging.Logger): Logger for replay messages.
+        latency_scale (Optional[float]): Sleep for the recorded duration times this factor before
+            returning, e.g. 1.0 to reproduce the original latencies. None returns immediately.
+        strict (bool): Raise KeyError for calls missing from the recording. Otherwise such calls
+            go to the real plugin.
+    """
+
+    def __init__(self, path: str, logger: logging.Logger, latency_scale: Optional[float] = None,
+                 strict: bool = True):
+        self.path = path
+        self.logger = logger
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+        self._calls: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        with _open(self.path, 'r') as file:
+            header = json.loads(file.readline() or '{}')
+            if header.get('format') != FORMAT:
+                raise ValueError(f"{self.path} is not a plugin call recording")
+            if header.get('version', 0) > FORMAT_VERSION:
+                raise ValueError(f"Recording {self.path} has unsupported version {header.get('version')}")
+            count = 0
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._calls.setdefault(entry['key'], deque()).append(entry)
+                    count += 1
+        self.logger.info(f"Loaded {count} recorded plugin calls from {self.path}")
+
+    def lookup(self, plugin_name: str, task_name: str, parameters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = call_key(plugin_name, task_name, parameters)
+        with self._lock:
+            entries = self._calls.get(key)
+            if not entries:
+                self.misses += 1
+                if self.strict:
+                    raise KeyError(f"No recorded call of {plugin_name}.{task_name} with these parameters "
+                                   f"in {self.path}")
+                return None
+            self.hits += 1
+            return entries.popleft() if len(entries) > 1 else entries[0]
+
+    def replay(self, entry: Dict[str, Any]) -> Any:
+        if self.latency_scale:
+            time.sleep(entry['duration'] * self.latency_scale)
+        if 'error' in entry:
+            raise self._rebuild_error(entry['error'])
+        return copy.deepcopy(entry['result'])
+
+    @staticmethod
+    def _rebuild_error(error: Dict[str, Any]) -> BaseException:
+        # Only look up types that are already loaded; a recording must not trigger imports
+        module = builtins if error['module'] == 'builtins' else sys.modules.get(error['module'])
+        error_type = getattr(module, error['type'], None) if module is not None else None
+        if isinstance(error_type, type) and issubclass(error_type, Exception):
+            try:
+                return error_type(*error['args'])
+            except Exception:
+                pass
+        return RecordedCallError(f"{error['type']}: {error['message']}")
+
+    def get_stats(self) -> Tuple[int, int]:
+        with self._lock:
+            return self.hits, self.misses
+
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, plugin: str, function: str, retry_after: float):
+        self.plugin = plugin
+        self.function = function
+        self.retry_after = retry_after
+        super().__init__(f"Circuit for {plugin}.{function} is open after repeated failures; "
+                         f"next trial call in {retry_after:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker for one plugin function.
+
+    While closed, the outcomes of the last `window` calls are kept and the
+    circuit opens once at least `minimum_calls` of them are recorded and the
+    share of failures reaches `failure_rate`. While open, calls are rejected
+    without reaching the plugin. After `open_seconds` the circuit goes
+    half-open and lets `half_open_calls` trial calls through: if they all
+    succeed it closes, and any failure opens it again.
+    """
+
+    def __init__(self, plugin: str, function: str, failure_rate: float = 0.5, window: int = 20,
+                 minimum_calls: int = 5, open_seconds: float = 30.0, half_open_calls: int = 1):
+        if not 0 < failure_rate <= 1:
+            raise ValueError(f"failure_rate for {plugin}.{function} must be in (0, 1], got {failure_rate}")
+        self.plugin = plugin
+        self.function = function
+        self.failure_rate = failure_rate
+        self.window = max(1, window)
+        self.minimum_calls = max(1, min(minimum_calls, self.window))
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes = deque(maxlen=self.window)
+        self._trials_started = 0
+        self._trials_succeeded = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the call must not go through.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.plugin, self.function, remaining)
+                self.state = HALF_OPEN
+                self._trials_started = 0
+                self._trials_succeeded = 0
+            if self.state == HALF_OPEN:
+                if self._trials_started >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.plugin, self.function, 0.0)
+                self._trials_started += 1
+
+    def record_success(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: The new state if the call changed it.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trials_succeeded += 1
+                if self._trials_succeeded >= self.half_open_calls:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    return CLOSED
+                return None
+            self._outcomes.append(True)
+            return None
+
+    def record_failure(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: The new state if the call changed it.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                return self._open()
+            if self.state == OPEN:
+                return None
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.minimum_calls and failures / len(self._outcomes) >= self.failure_rate:
+                return self._open()
+            return None
+
+    def _open(self) -> str:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._outcomes.clear()
+        return OPEN
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': self._outcomes.count(False),
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+
+
+class CircuitBreakers:
+    """
+    Circuit breakers keyed by plugin and function, created on first use.
+
+    Settings come from the error handling `circuit_breakers` section; entries
+    under `plugins` override them for a plugin (`db_plugin`) or a single
+    function (`db_plugin.query`).
+    """
+
+    SETTINGS = ('failure_rate', 'window', 'minimum_calls', 'open_seconds', 'half_open_calls')
+
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger, metrics=None):
+        self.config = config
+        self.logger = logger
+        self.metrics = metrics
+        self.breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, plugin: str, function: str) -> CircuitBreaker:
+        key = (plugin, function)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(plugin, function, **self._settings(plugin, function))
+                    self.breakers[key] = breaker
+        return breaker
+
+    def _settings(self, plugin: str, function: str) -> Dict[str, Any]:
+        overrides = self.config.get('plugins', {})
+        settings = {name: self.config[name] for name in self.SETTINGS if name in self.config}
+        settings.update(overrides.get(plugin, {}))
+        settings.update(overrides.get(f"{plugin}.{function}", {}))
+        return {name: value for name, value in settings.items() if name in self.SETTINGS}
+
+    def before_call(self, plugin: str, function: str):
+        try:
+            self.get(plugin, function).before_call()
+        except CircuitOpenError:
+            if self.metrics is not None:
+                self.metrics.record_circuit_rejection(plugin, function)
+            raise
+
+    def record_success(self, plugin: str, function: str):
+        self._transition(plugin, function, self.get(plugin, function).record_success())
+
+    def record_failure(self, plugin: str, function: str):
+        self._transition(plugin, function, self.get(plugin, function).record_failure())
+
+    def _transition(self, plugin: str, function: str, state: Optional[str]):
+        if state is None:
+            return
+        if state == OPEN:
+            breaker = self.get(plugin, function)
+            self.logger.warning(f"Circuit for {plugin}.{function} opened; failing calls fast for "
+                                f"{breaker.open_seconds:.0f}s")
+        else:
+            self.logger.info(f"Circuit for {plugin}.{function} closed after a successful trial call")
+        if self.metrics is not None:
+            self.metrics.record_circuit_state(plugin, function, state == OPEN)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {f"{plugin}.{function}": breaker.get_stats() for (plugin, function), breaker in self.breakers.items()}
@@ -1,122 +1,204 @@
-import yaml
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional, Union
-
-class VariableConfig(BaseModel):
-    name: str
-    value: Any
-    type: Optional[str] = None
-    description: Optional[str] = None
-
-class ConditionConfig(BaseModel):
-    type: str
-    expression: str
-    true_branch: str
-    false_branch: str
-
-class StepConfig(BaseModel):
-    name: str
-    description: Optional[str] = None
-    function: str
-    parameters: Dict[str, Any]
-    timeout: Optional[int] = None
-    on_success: Optional[Dict[str, Any]] = None
-    on_failure: Optional[Dict[str, Any]] = None
-    conditions: Optional[List[ConditionConfig]] = None
-    variables: Optional[Dict[str, Any]] = None
-    set_variables: Optional[Dict[str, str]] = None
-
-class TaskConfig(BaseModel):
-    name: str
-    description: Optional[str] = None
-    plugin: str
-    function: str
-    parameters: Dict[str, Any]
-    dependencies: Optional[List[str]] = None
-    timeout: Optional[int] = None
-    retry: Optional[Dict[str, int]] = None
-    on_success: Optional[Dict[str, Any]] = None
-    on_failure: Optional[Dict[str, Any]] = None
-    steps: Optional[List[StepConfig]] = None
-    variables: Optional[Dict[str, Any]] = None
-    set_variables: Optional[Dict[str, str]] = None
-    conditional_logic: Optional[Union[str, Dict[str, Any]]] = None
-
-class PluginConfig(BaseModel):
-    name: str
-    module: str
-    description: Optional[str] = None
-
-class WorkflowConfig(BaseModel):
-    name: str
-    description: Optional[str] = None
-    flags: Optional[List[str]] = None
-    variables: Dict[str, Any] = Field(default_factory=dict)
-    data_flow: Optional[List[Dict[str, str]]] = None
-    tasks: List[TaskConfig]
-
-class LoggingConfig(BaseModel):
-    level: str
-    file: str
-    format: str
-
-class ErrorHandlingConfig(BaseModel):
-    on_task_error: str
-    on_workflow_failure: str
-
-class ConfigModel(BaseModel):
-    config_version: str
-    name: str
-    description: Optional[str] = None
-    global_variables: Dict[str, Any] = Field(default_factory=dict)
-    workflow_engine: Dict[str, Any]
-    logging: LoggingConfig
-    plugins: List[PluginConfig]
-    workflow: WorkflowConfig
-    error_handling: ErrorHandlingConfig
-    on_workflow_complete: List[Dict[str, Any]]
-    on_workflow_failure: List[Dict[str, Any]]
-
-class ConfigurationManager:
-    def __init__(self, config_file: str):
-        self.config_file = config_file
-        self.config: Optional[ConfigModel] = None
-
-    def load_config(self) -> ConfigModel:
-        with open(self.config_file, 'r') as file:
-            config_data = yaml.safe_load(file)
+import ast
+import json
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Union
+import logging
+from tao.metrics import WorkflowMetrics
+
+SAFE_BUILTINS = {
+    'len': len, 'min': min, 'max': max, 'sum': sum, 'abs': abs, 'any': any, 'all': all,
+    'round': round, 'int': int, 'float': float, 'str': str, 'bool': bool, 'sorted': sorted,
+    'set': set, 'list': list, 'dict': dict, 'tuple': tuple,
+}
+
+_MISSING = object()
+
+
+def strip_template_braces(expression: str) -> str:
+    expression = expression.strip()
+    if expression.startswith('{{') and expression.endswith('}}'):
+        return expression[2:-2].strip()
+    return expression
+
+
+class CompiledCondition:
+    """
+    A condition compiled once into Python bytecode (or a tree of them for
+    'and'/'or' blocks), together with the variable names it reads.
+    """
+    __slots__ = ('source', 'mode', 'code', 'children', 'dependencies', 'true_branch', 'false_branch', '_cached')
+
+    def __init__(self, source: str, mode: str, code=None, children: Optional[List['CompiledCondition']] = None,
+                 dependencies: Tuple[str, ...] = (), true_branch: Optional[str] = None,
+                 false_branch: Optional[str] = None):
+        self.source = source
+        self.mode = mode
+        self.code = code
+        self.children = children or []
+        self.dependencies = dependencies
+        self.true_branch = true_branch
+        self.false_branch = false_branch
+        self._cached: Optional[Tuple[Tuple[int, ...], bool]] = None
+
+    @property
+    def has_branches(self) -> bool:
+        return bool(self.true_branch or self.false_branch)
+
+    def evaluate(self, namespace: Dict[str, Any]) -> bool:
+        if self.mode == 'expression':
+            return bool(eval(self.code, {'__builtins__': SAFE_BUILTINS}, namespace))
+        if self.mode == 'or':
+            return any(child.evaluate(namespace) for child in self.children)
+        return all(child.evaluate(namespace) for child in self.children)
+
+
+class ConditionalLogic:
+    def __init__(self, logger: Optional[logging.Logger] = None, metrics: Optional[WorkflowMetrics] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.metrics = metrics
+        self.context: Dict[str, Any] = {}
+        self._compiled: Dict[str, CompiledCondition] = {}
+        self._lock = threading.Lock()
+
+    def compile(self, condition: Union[str, Dict[str, Any], List[Any], Any]) -> CompiledCondition:
+        """
+        Compile a condition, reusing the compiled form for identical definitions.
+
+        Accepts expression strings (with or without surrounding '{{ }}'),
+        ConditionConfig models or dicts with an 'expression' or 'condition'
+        key, 'and'/'or' blocks with a 'conditions' list, and plain lists,
+        which must all hold.
+
+        Args:
+            condition: The condition definition.
+
+        Returns:
+            CompiledCondition: The compiled condition.
+
+        Raises:
+            ValueError: If the condition is malformed or not a valid expression.
+        """
+        if isinstance(condition, CompiledCondition):
+            return condition
+        if hasattr(condition, 'dict'):
+            condition = condition.dict()
+        key = condition if isinstance(condition, str) else json.dumps(condition, sort_keys=True, default=str)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._compile(condition)
+            with self._lock:
+                compiled = self._compiled.setdefault(key, compiled)
+        return compiled
+
+    def _compile(self, condition: Any) -> CompiledCondition:
+        if isinstance(condition, str):
+            return self._compile_expression(condition)
+        if isinstance(condition, list):
+            children = [self.compile(item) for item in condition]
+            return CompiledCondition(str(condition), 'and', children=children,
+                                     dependencies=self._merge_dependencies(children))
+        if not isinstance(condition, dict):
+            raise ValueError(f"Unsupported condition: {condition!r}")
+
+        condition_type = str(condition.get('type', 'expression')).lower()
+        if condition_type in ('and', 'or') and 'conditions' in condition:
+            children = [self.compile(item) for item in condition['conditions']]
+            compiled = CompiledCondition(json.dumps(condition, default=str), condition_type, children=children,
+                                         dependencies=self._merge_dependencies(children))
+        else:
+            expression = condition.get('expression', condition.get('condition'))
+            if expression is None:
+                raise ValueError(f"Condition has no expression: {condition!r}")
+            compiled = self._compile_expression(str(expression))
+            compiled = CompiledCondition(compiled.source, 'expression', code=compiled.code,
+                                         dependencies=compiled.dependencies)
+        compiled.true_branch = condition.get('true_branch')
+        compiled.false_branch = condition.get('false_branch')
+        return compiled
+
+    def _compile_expression(self, expression: str) -> CompiledCondition:
+        source = strip_template_braces(expression)
         try:
-            self.config = ConfigModel(**config_data)
-            return self.config
-        except ValueError as e:
-            raise ValueError(f"Configuration validation failed: {e}")
-
-    def get_plugin_config(self, plugin_name: str) -> Optional[PluginConfig]:
-        if self.config:
-            for plugin in self.config.plugins:
-                if plugin.name == plugin_name:
-                    return plugin
-        return None
-
-    def get_task_config(self, task_name: str) -> Optional[TaskConfig]:
-        if self.config:
-            for task in self.config.workflow.tasks:
-                if task.name == task_name:
-                    return task
-        return None
-
-    def get_global_variables(self) -> Dict[str, Any]:
-        return self.config.global_variables if self.config else {}
-
-    def get_workflow_variables(self) -> Dict[str, Any]:
-        return self.config.workflow.variables if self.config else {}
-
-    def get_error_handling_config(self) -> ErrorHandlingConfig:
-        return self.config.error_handling if self.config else ErrorHandlingConfig(on_task_error="log_and_continue", on_workflow_failure="notify_admin")
-
-    def get_logging_config(self) -> LoggingConfig:
-        return self.config.logging if self.config else LoggingConfig(level="INFO", file="tao.log", format="%(asctime)s - %(levelname)s - %(message)s")
-
-    def validate_config(self) -> bool:
-        # Implement additional validation logic here
-        return True if self.config else False
\ No newline at end of file
+            tree = ast.parse(source, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid condition expression '{expression}': {str(e)}")
+        bound = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)}
+        dependencies = sorted({
+            node.id for node in ast.walk(tree)
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)
+            and node.id not in SAFE_BUILTINS and node.id not in bound
+        })
+        return CompiledCondition(source, 'expression', code=compile(tree, '<condition>', 'eval'),
+                                 dependencies=tuple(dependencies))
+
+    @staticmethod
+    def _merge_dependencies(children: List[CompiledCondition]) -> Tuple[str, ...]:
+        return tuple(sorted({name for child in children for name in child.dependencies}))
+
+    def get_dependencies(self, condition: Any) -> Tuple[str, ...]:
+        return self.compile(condition).dependencies
+
+    def update_context(self, variables: Dict[str, Any]):
+        self.context = variables
+
+    def evaluate(self, condition: Any, variables: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Evaluate a condition against an explicit variable mapping (or the
+        context set by update_context). Results are not cached.
+        """
+        compiled = self.compile(condition)
+        return self._safe_evaluate(compiled, variables if variables is not None else self.context)
+
+    def evaluate_with(self, condition: Any, variable_manager) -> bool:
+        """
+        Evaluate a condition against a VariableManager, caching the result
+        until one of the variables the condition reads changes.
+
+        Args:
+            condition: The condition definition or a CompiledCondition.
+            variable_manager (VariableManager): The source of variable values and versions.
+
+        Returns:
+            bool: The condition result. Undefined variables make the condition false.
+        """
+        compiled = self.compile(condition)
+        versions = (id(variable_manager),) + tuple(variable_manager.get_version(name) for name in compiled.dependencies)
+        cached = compiled._cached
+        if cached is not None and cached[0] == versions:
+            if self.metrics is not None:
+                self.metrics.record_cache('condition', True)
+            return cached[1]
+        if self.metrics is not None:
+            self.metrics.record_cache('condition', False)
+
+        namespace = {}
+        for name in compiled.dependencies:
+            value = variable_manager.lookup(name, _MISSING)
+            if value is not _MISSING:
+                namespace[name] = value
+        result = self._safe_evaluate(compiled, namespace)
+        compiled._cached = (versions, result)
+        return result
+
+    def _safe_evaluate(self, compiled: CompiledCondition, namespace: Dict[str, Any]) -> bool:
+        try:
+            return compiled.evaluate(namespace)
+        except NameError as e:
+            self.logger.warning(f"Condition '{compiled.source}' references an undefined variable: {str(e)}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Error evaluating condition '{compiled.source}': {str(e)}")
+            return False
+
+    def select_branch(self, condition: Any, outcome: bool) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Return the (taken, not_taken) branch names of a condition for the given outcome.
+        """
+        compiled = self.compile(condition)
+        if outcome:
+            return compiled.true_branch, compiled.false_branch
+        return compiled.false_branch, compiled.true_branch
+
+    def clear_cache(self):
+        with self._lock:
+            self._compiled.clear()
@@ -17,8 +17,12 @@ class ConditionConfig(BaseModel):
 class StepConfig(BaseModel):
     name: str
     description: Optional[str] = None
+    plugin: Optional[str] = None
     function: str
     parameters: Dict[str, Any]
+    depends_on: Optional[List[str]] = None
+    outputs: Optional[List[str]] = None
+    each: Optional[str] = None
     timeout: Optional[int] = None
     on_success: Optional[Dict[str, Any]] = None
     on_failure: Optional[Dict[str, Any]] = None
@@ -29,10 +33,14 @@ class StepConfig(BaseModel):
 class TaskConfig(BaseModel):
     name: str
     description: Optional[str] = None
-    plugin: str
-    function: str
-    parameters: Dict[str, Any]
+    plugin: Optional[str] = None
+    function: Optional[str] = None
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+    workflow: Optional[str] = None
+    inputs: Optional[Dict[str, Any]] = None
+    outputs: Optional[Dict[str, str]] = None
     dependencies: Optional[List[str]] = None
+    after: Optional[List[str]] = None
     timeout: Optional[int] = None
     retry: Optional[Dict[str, int]] = None
     on_success: Optional[Dict[str, Any]] = None
@@ -41,11 +49,20 @@ class TaskConfig(BaseModel):
     variables: Optional[Dict[str, Any]] = None
     set_variables: Optional[Dict[str, str]] = None
     conditional_logic: Optional[Union[str, Dict[str, Any]]] = None
+    conditions: Optional[List[ConditionConfig]] = None
+    resources: Optional[Dict[str, float]] = None
+    max_memory_mb: Optional[float] = None
+    isolated: Optional[bool] = None
 
 class PluginConfig(BaseModel):
     name: str
     module: str
     description: Optional[str] = None
+    batching: Optional[Dict[str, Any]] = None
+    max_concurrency: Optional[int] = None
+    rate_limit: Optional[float] = None
+    burst: Optional[int] = None
+    function_limits: Optional[Dict[str, Dict[str, Any]]] = None
 
 class WorkflowConfig(BaseModel):
     name: str
@@ -63,6 +80,10 @@ class LoggingConfig(BaseModel):
 class ErrorHandlingConfig(BaseModel):
     on_task_error: str
     on_workflow_failure: str
+    global_: Dict[str, Any] = Field(default_factory=dict, alias='global')
+    tasks: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    circuit_breakers: Optional[Dict[str, Any]] = None
+    traceback_sample_every: Optional[int] = None
 
 class ConfigModel(BaseModel):
     config_version: str
@@ -76,6 +97,7 @@ class ConfigModel(BaseModel):
     error_handling: ErrorHandlingConfig
     on_workflow_complete: List[Dict[str, Any]]
     on_workflow_failure: List[Dict[str, Any]]
+    triggers: List[Dict[str, Any]] = Field(default_factory=list)
 
 class ConfigurationManager:
     def __init__(self, config_file: str):
@@ -105,6 +127,14 @@ class ConfigurationManager:
                     return task
         return None
 
+    def get_workflow_config(self) -> WorkflowConfig:
+        if self.config is None:
+            self.load_config()
+        return self.config.workflow
+
+    def get_engine_config(self) -> Dict[str, Any]:
+        return self.config.workflow_engine if self.config else {}
+
     def get_global_variables(self) -> Dict[str, Any]:
         return self.config.global_variables if self.config else {}
 
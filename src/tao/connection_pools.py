@@ -0,0 +1,244 @@
+import importlib
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional
+import logging
+
+
+class PoolTimeoutError(TimeoutError):
+    pass
+
+
+class _Waiter:
+    __slots__ = ('event', 'resource')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.resource: Any = None
+
+
+class ConnectionPool:
+    """
+    A bounded pool of reusable resources (connections, sessions, clients).
+
+    At most max_size resources exist at once. Callers that find none idle
+    wait in FIFO order, and a released resource is handed directly to the
+    longest-waiting caller.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], max_size: int = 5, timeout: float = 30.0,
+                 close: Optional[Callable[[Any], None]] = None, logger: Optional[logging.Logger] = None):
+        self.name = name
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.close_resource = close or (lambda resource: getattr(resource, 'close', lambda: None)())
+        self.logger = logger or logging.getLogger(__name__)
+        self._idle: deque = deque()
+        self._waiters: deque = deque()
+        self._created = 0
+        self._leased = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Pool '{self.name}' is closed")
+            if self._idle and not self._waiters:
+                self._leased += 1
+                return self._idle.pop()
+            if self._created < self.max_size:
+                self._created += 1
+                self._leased += 1
+                create = True
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+                create = False
+
+        if create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._leased -= 1
+                raise
+
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                if not waiter.event.is_set():
+                    self._waiters.remove(waiter)
+                    raise PoolTimeoutError(f"Timed out after {timeout}s waiting for pool '{self.name}'")
+        return waiter.resource
+
+    def release(self, resource: Any, discard: bool = False):
+        with self._lock:
+            self._leased -= 1
+            if discard or self._closed:
+                self._created -= 1
+            elif self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.resource = resource
+                self._leased += 1
+                waiter.event.set()
+                return
+            else:
+                self._idle.append(resource)
+                return
+        self._close_quietly(resource)
+        if not self._closed:
+            self._wake_waiter_for_new_resource()
+
+    def _wake_waiter_for_new_resource(self):
+        # A discarded resource frees a slot; create a replacement for the next waiter
+        with self._lock:
+            if not self._waiters or self._created >= self.max_size:
+                return
+            waiter = self._waiters.popleft()
+            self._created += 1
+            self._leased += 1
+        try:
+            waiter.resource = self.factory()
+        except Exception as e:
+            self.logger.error(f"Error creating resource for pool '{self.name}': {str(e)}")
+            with self._lock:
+                self._created -= 1
+                self._leased -= 1
+                self._waiters.appendleft(waiter)
+            return
+        waiter.event.set()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        resource = self.acquire(timeout)
+        try:
+            yield resource
+        except Exception:
+            # The resource may be in a broken state, e.g. an aborted transaction
+            self.release(resource, discard=True)
+            raise
+        else:
+            self.release(resource)
+
+    def _close_quietly(self, resource: Any):
+        try:
+            self.close_resource(resource)
+        except Exception as e:
+            self.logger.warning(f"Error closing resource from pool '{self.name}': {str(e)}")
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._created -= len(idle)
+        for resource in idle:
+            self._close_quietly(resource)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'created': self._created,
+                'idle': len(self._idle),
+                'leased': self._leased,
+                'waiting': len(self._waiters),
+            }
+
+
+def _sqlite_factory(options: Dict[str, Any]) -> Callable[[], Any]:
+    database = options['database']
+    return lambda: sqlite3.connect(database, check_same_thread=False, timeout=options.get('busy_timeout', 5.0))
+
+
+def _http_factory(options: Dict[str, Any]) -> Callable[[], Any]:
+    import requests
+
+    def create():
+        session = requests.Session()
+        session.headers.update(options.get('headers', {}))
+        return session
+    return create
+
+
+def _callable_factory(options: Dict[str, Any]) -> Callable[[], Any]:
+    module_name, _, function_name = options['factory'].partition(':')
+    function = getattr(importlib.import_module(module_name), function_name)
+    arguments = options.get('options', {})
+    return lambda: function(**arguments)
+
+
+POOL_FACTORIES: Dict[str, Callable[[Dict[str, Any]], Callable[[], Any]]] = {
+    'sqlite': _sqlite_factory,
+    'http': _http_factory,
+    'callable': _callable_factory,
+}
+
+
+class PoolRegistry:
+    """
+    Named connection pools shared by all plugins of a PluginSystem. Pools
+    outlive individual runs; reconfiguring a pool with changed settings
+    replaces it.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.pools: Dict[str, ConnectionPool] = {}
+        self._settings: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, pools_config: Dict[str, Dict[str, Any]]):
+        for name, settings in pools_config.items():
+            with self._lock:
+                if self._settings.get(name) == settings:
+                    continue
+                pool_type = settings.get('type')
+                if pool_type not in POOL_FACTORIES:
+                    raise ValueError(f"Unknown type '{pool_type}' for resource pool '{name}'")
+                pool = ConnectionPool(name, POOL_FACTORIES[pool_type](settings), max_size=settings.get('max_size', 5),
+                                      timeout=settings.get('timeout', 30.0), logger=self.logger)
+                previous = self.pools.get(name)
+                self.pools[name] = pool
+                self._settings[name] = settings
+            if previous is not None:
+                previous.close()
+            self.logger.info(f"Configured resource pool '{name}' ({pool_type}, max {pool.max_size})")
+
+    def register(self, pool: ConnectionPool):
+        with self._lock:
+            self.pools[pool.name] = pool
+            self._settings.pop(pool.name, None)
+
+    def remove(self, name: str):
+        with self._lock:
+            pool = self.pools.pop(name, None)
+            self._settings.pop(name, None)
+        if pool is not None:
+            pool.close()
+            self.logger.info(f"Removed resource pool '{name}'")
+
+    def get(self, name: str) -> ConnectionPool:
+        pool = self.pools.get(name)
+        if pool is None:
+            raise KeyError(f"Resource pool not found: {name}")
+        return pool
+
+    def lease(self, name: str, timeout: Optional[float] = None):
+        return self.get(name).lease(timeout)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: pool.get_stats() for name, pool in self.pools.items()}
+
+    def close_all(self):
+        with self._lock:
+            pools = list(self.pools.values())
+            self.pools.clear()
+            self._settings.clear()
+        for pool in pools:
+            pool.close()
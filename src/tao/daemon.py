@@ -0,0 +1,317 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import uuid
+from collections import deque, OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import logging
+from tao.configuration_manager import ConfigurationManager
+from tao.plugin_system import PluginSystem
+from tao.workflow_engine import build_workflow_engine
+from tao.task_statistics import TaskStatistics
+from tao.run_history import RunHistoryStore
+from tao.metrics import WorkflowMetrics
+
+DEFAULT_PORT = 8765
+
+
+class FairRunQueue:
+    """
+    Run queue that serves clients round-robin, so one client submitting many
+    runs cannot starve the others.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, deque] = {}
+        self._clients: deque = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def put(self, client: str, item: Any):
+        with self._condition:
+            queue = self._queues.get(client)
+            if queue is None:
+                queue = self._queues[client] = deque()
+                self._clients.append(client)
+            queue.append(item)
+            self._condition.notify()
+
+    def get(self) -> Optional[Any]:
+        with self._condition:
+            while not self._clients and not self._closed:
+                self._condition.wait()
+            if not self._clients:
+                return None
+            client = self._clients.popleft()
+            queue = self._queues[client]
+            item = queue.popleft()
+            if queue:
+                self._clients.append(client)
+            else:
+                del self._queues[client]
+            return item
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+
+class RunRecord:
+    def __init__(self, run_id: str, client: str, config_file: str, variables: Dict[str, Any]):
+        self.run_id = run_id
+        self.client = client
+        self.config_file = config_file
+        self.variables = variables
+        self.status = 'queued'
+        self.success: Optional[bool] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = None
+        if self.started_at is not None and self.finished_at is not None:
+            duration = self.finished_at - self.started_at
+        return {
+            'run_id': self.run_id,
+            'client': self.client,
+            'config_file': self.config_file,
+            'status': self.status,
+            'success': self.success,
+            'error': self.error,
+            'queued_seconds': (self.started_at - self.submitted_at) if self.started_at else None,
+            'duration_seconds': duration,
+        }
+
+
+class WorkflowDaemon:
+    def __init__(self, logger: logging.Logger, max_concurrent_runs: int = 4,
+                 metrics: Optional[WorkflowMetrics] = None, max_finished_runs: int = 1000,
+                 watch_plugins: bool = False):
+        self.logger = logger
+        self.watch_plugins = watch_plugins
+        self.max_concurrent_runs = max_concurrent_runs
+        self.metrics = metrics
+        self.max_finished_runs = max_finished_runs
+        self.plugin_systems: Dict[str, PluginSystem] = {}
+        self.task_statistics: Dict[str, TaskStatistics] = {}
+        self.run_histories: Dict[str, RunHistoryStore] = {}
+        self._configs: Dict[str, Tuple[float, ConfigurationManager]] = {}
+        self._runs: "OrderedDict[str, RunRecord]" = OrderedDict()
+        self._queue = FairRunQueue()
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def start(self):
+        for index in range(self.max_concurrent_runs):
+            worker = threading.Thread(target=self._worker_loop, name=f"tao-run-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        self.logger.info(f"Workflow daemon started with {self.max_concurrent_runs} run slots")
+
+    def stop(self):
+        self._queue.close()
+        for worker in self._workers:
+            worker.join()
+        self._workers.clear()
+        for plugin_directory, plugin_system in self.plugin_systems.items():
+            self.logger.info(f"Cleaning up plugins from {plugin_directory}")
+            plugin_system.cleanup_plugins()
+        self.plugin_systems.clear()
+        for run_history in self.run_histories.values():
+            run_history.close()
+        self.run_histories.clear()
+
+    def get_config(self, config_file: str) -> ConfigurationManager:
+        """
+        Return the parsed configuration for a file, reusing the cached copy
+        until the file changes on disk.
+        """
+        path = os.path.abspath(config_file)
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._configs.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        config_manager = ConfigurationManager(path)
+        config_manager.load_config()
+        with self._lock:
+            self._configs[path] = (mtime, config_manager)
+        self.logger.info(f"Loaded configuration: {path}")
+        return config_manager
+
+    def get_plugin_system(self, plugin_directory: str) -> PluginSystem:
+        with self._lock:
+            plugin_system = self.plugin_systems.get(plugin_directory)
+            if plugin_system is None:
+                plugin_system = PluginSystem(plugin_directory, self.logger, self.metrics)
+                plugin_system.load_plugins()
+                if self.watch_plugins:
+                    plugin_system.watch_plugins()
+                self.plugin_systems[plugin_directory] = plugin_system
+            return plugin_system
+
+    def get_task_statistics(self, engine_config: Dict[str, Any]) -> TaskStatistics:
+        # Shared across runs so estimates keep improving while the daemon is up
+        path = engine_config.get('statistics_file')
+        with self._lock:
+            task_statistics = self.task_statistics.get(path or '')
+            if task_statistics is None:
+                task_statistics = TaskStatistics(path, logger=self.logger)
+                self.task_statistics[path or ''] = task_statistics
+            return task_statistics
+
+    def get_run_history(self, engine_config: Dict[str, Any]) -> Optional[RunHistoryStore]:
+        path = engine_config.get('history_database')
+        if not path:
+            return None
+        with self._lock:
+            run_history = self.run_histories.get(path)
+            if run_history is None:
+                run_history = self.run_histories[path] = RunHistoryStore(path, self.logger)
+            return run_history
+
+    def preload(self, config_file: str):
+        config_manager = self.get_config(config_file)
+        self.get_plugin_system(config_manager.config.workflow_engine.get('plugin_directory', './plugins'))
+
+    def submit(self, config_file: str, variables: Optional[Dict[str, Any]] = None,
+               client: str = 'default') -> RunRecord:
+        record = RunRecord(uuid.uuid4().hex, client, config_file, variables or {})
+        with self._lock:
+            self._runs[record.run_id] = record
+            while len(self._runs) > self.max_finished_runs:
+                oldest_id, oldest = next(iter(self._runs.items()))
+                if not oldest.done.is_set():
+                    break
+                del self._runs[oldest_id]
+        self._queue.put(client, record)
+        self.logger.info(f"Queued run {record.run_id} for client '{client}': {config_file}")
+        return record
+
+    def get_run(self, run_id: str) -> Optional[RunRecord]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def _worker_loop(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            self._execute_run(record)
+
+    def _execute_run(self, record: RunRecord):
+        record.status = 'running'
+        record.started_at = time.time()
+        try:
+            config_manager = self.get_config(record.config_file)
+            config = config_manager.config
+            plugin_system = self.get_plugin_system(config.workflow_engine.get('plugin_directory', './plugins'))
+            engine = build_workflow_engine(config_manager, plugin_system, self.logger,
+                                           variables=record.variables, metrics=self.metrics,
+                                           task_statistics=self.get_task_statistics(config.workflow_engine),
+                                           run_history=self.get_run_history(config.workflow_engine))
+            record.success = engine.execute_workflow()
+            actions = config.on_workflow_complete if record.success else config.on_workflow_failure
+            for action in actions:
+                engine.execute_action(action)
+            record.status = 'completed' if record.success else 'failed'
+        except Exception as e:
+            self.logger.error(f"Run {record.run_id} failed: {str(e)}")
+            record.success = False
+            record.error = str(e)
+            record.status = 'failed'
+        finally:
+            record.finished_at = time.time()
+            record.done.set()
+            self.logger.info(f"Run {record.run_id} finished with status '{record.status}'")
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        action = request.get('action')
+        if action == 'ping':
+            return {'ok': True, 'queued_runs': len(self._queue)}
+        if action == 'submit':
+            record = self.submit(request['config_file'], request.get('variables'), request.get('client', 'default'))
+            if request.get('wait', True):
+                record.done.wait(request.get('timeout'))
+            return {'ok': True, **record.to_dict()}
+        if action == 'status':
+            record = self.get_run(request['run_id'])
+            if record is None:
+                return {'ok': False, 'error': f"Unknown run: {request['run_id']}"}
+            return {'ok': True, **record.to_dict()}
+        return {'ok': False, 'error': f"Unknown action: {action}"}
+
+
+class _SubmissionHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.daemon.handle_request(json.loads(line))
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write((json.dumps(response, default=str) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+
+class _UnixSubmissionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPSubmissionServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve(daemon: WorkflowDaemon, socket_path: Optional[str] = None, port: Optional[int] = None):
+    """
+    Serve JSON-lines submissions on a Unix socket, or on a localhost TCP port
+    when no socket path is given. Blocks until interrupted.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixSubmissionServer(socket_path, _SubmissionHandler)
+        address = socket_path
+    else:
+        server = _TCPSubmissionServer(('127.0.0.1', port or DEFAULT_PORT), _SubmissionHandler)
+        address = f"127.0.0.1:{server.server_address[1]}"
+    server.daemon = daemon
+    daemon.start()
+    daemon.logger.info(f"Accepting submissions on {address}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        daemon.stop()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def send_request(request: Dict[str, Any], socket_path: Optional[str] = None,
+                 port: Optional[int] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+    if socket_path:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(timeout)
+        connection.connect(socket_path)
+    else:
+        connection = socket.create_connection(('127.0.0.1', port or DEFAULT_PORT), timeout=timeout)
+    with connection, connection.makefile('rwb') as stream:
+        stream.write((json.dumps(request) + '\n').encode('utf-8'))
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise ConnectionError("Daemon closed the connection without a response")
+    return json.loads(line)
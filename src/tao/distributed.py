@@ -0,0 +1,465 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Set, Tuple
+import logging
+from tao.plugin_system import PluginSystem
+
+DEFAULT_COORDINATOR_PORT = 8766
+
+
+class RemoteTaskError(Exception):
+    pass
+
+
+def _send(stream, lock: threading.Lock, message: Dict[str, Any]):
+    data = (json.dumps(message, default=str) + '\n').encode('utf-8')
+    with lock:
+        stream.write(data)
+        stream.flush()
+
+
+class RemoteCall:
+    def __init__(self, plugin_name: str, task_name: str, parameters: Dict[str, Any],
+                 variables: Dict[str, Any], locality: List[str]):
+        self.call_id = uuid.uuid4().hex
+        self.plugin_name = plugin_name
+        self.task_name = task_name
+        self.parameters = parameters
+        self.variables = variables
+        self.locality = locality
+        self.attempts = 0
+        self.worker_id: Optional[str] = None
+        self.queued_at: Optional[float] = None
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    def to_message(self) -> Dict[str, Any]:
+        return {
+            'type': 'execute',
+            'call_id': self.call_id,
+            'plugin': self.plugin_name,
+            'task': self.task_name,
+            'parameters': self.parameters,
+            'variables': self.variables,
+        }
+
+
+class WorkerHandle:
+    def __init__(self, worker_id: str, plugins: List[str], capacity: int, artifacts: List[str], stream,
+                 connection: Optional[socket.socket] = None):
+        self.worker_id = worker_id
+        self.plugins = set(plugins)
+        self.capacity = max(1, capacity)
+        self.artifacts: Set[str] = set(artifacts)
+        self.stream = stream
+        self.connection = connection
+        self.write_lock = threading.Lock()
+        self.in_flight: Dict[str, RemoteCall] = {}
+        self.last_heartbeat = time.monotonic()
+        self.alive = True
+
+    @property
+    def free_slots(self) -> int:
+        return self.capacity - len(self.in_flight)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'worker_id': self.worker_id,
+            'plugins': sorted(self.plugins),
+            'capacity': self.capacity,
+            'in_flight': len(self.in_flight),
+            'artifacts': len(self.artifacts),
+        }
+
+
+class Coordinator:
+    """
+    Dispatches plugin calls to worker agents connected over TCP.
+
+    Workers register with the plugins they have loaded and a capacity, then
+    send heartbeats. A call goes to a live worker that has the plugin and a
+    free slot, preferring workers that already hold the artifacts the call
+    refers to. Calls in flight on a worker that disconnects or misses its
+    heartbeats are dispatched again, up to max_attempts times.
+
+    A call fails at once when no registered worker has its plugin, and after
+    `queue_timeout` seconds (default heartbeat_timeout * max_attempts) when
+    it is still waiting for a free worker.
+    """
+
+    def __init__(self, logger: logging.Logger, host: str = '127.0.0.1', port: int = DEFAULT_COORDINATOR_PORT,
+                 heartbeat_timeout: float = 10.0, max_attempts: int = 3, queue_timeout: Optional[float] = None):
+        self.logger = logger
+        self.host = host
+        self.port = port
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.queue_timeout = queue_timeout if queue_timeout is not None else heartbeat_timeout * max_attempts
+        self.workers: Dict[str, WorkerHandle] = {}
+        self._backlog: deque = deque()
+        self._lock = threading.RLock()
+        self._server: Optional[socketserver.TCPServer] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._server = _CoordinatorServer((self.host, self.port), _WorkerConnectionHandler)
+        self._server.coordinator = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='tao-coordinator', daemon=True).start()
+        threading.Thread(target=self._monitor_heartbeats, name='tao-heartbeats', daemon=True).start()
+        self.logger.info(f"Coordinator listening for workers on {self.host}:{self.port}")
+
+    def stop(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        with self._lock:
+            for worker in list(self.workers.values()):
+                self._remove_worker(worker, "coordinator stopped", redispatch=False)
+            while self._backlog:
+                self._fail(self._backlog.popleft(), "coordinator stopped")
+
+    def wait_for_workers(self, count: int, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self.workers) < count:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def can_execute(self, plugin_name: str) -> bool:
+        with self._lock:
+            return any(plugin_name in worker.plugins for worker in self.workers.values())
+
+    def execute(self, plugin_name: str, task_name: str, parameters: Dict[str, Any], variables: Dict[str, Any],
+                locality: Optional[List[str]] = None, timeout: Optional[float] = None) -> Any:
+        """
+        Run a plugin call on a worker and wait for its result.
+
+        Args:
+            locality (Optional[List[str]]): Artifacts the call reads. Defaults to the
+                string parameters, so workers that produced those paths are preferred.
+
+            timeout (Optional[float]): Seconds to wait for the result. None waits as long as the
+                call is running on a live worker.
+
+        Raises:
+            RemoteTaskError: If no worker has the plugin, or the call failed on the worker or
+                could not be completed.
+        """
+        if locality is None:
+            locality = [value for value in parameters.values() if isinstance(value, str)]
+        call = RemoteCall(plugin_name, task_name, parameters, variables, locality)
+        with self._lock:
+            sends = self._dispatch(call)
+        self._send_calls(sends)
+        if not call.done.wait(timeout):
+            raise RemoteTaskError(f"Timed out waiting for remote task '{task_name}'")
+        if call.error is not None:
+            raise RemoteTaskError(call.error)
+        return call.result
+
+    def _select_worker(self, call: RemoteCall) -> Optional[WorkerHandle]:
+        candidates = [worker for worker in self.workers.values()
+                      if worker.alive and call.plugin_name in worker.plugins and worker.free_slots > 0]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda worker: (len(worker.artifacts.intersection(call.locality)),
+                                                   worker.free_slots))
+
+    def _dispatch(self, call: RemoteCall) -> List[Tuple[WorkerHandle, RemoteCall]]:
+        # Called with the lock held; assigns the call and returns what to send once it is released
+        worker = self._select_worker(call)
+        if worker is None:
+            if not any(worker.alive and call.plugin_name in worker.plugins for worker in self.workers.values()):
+                self._fail(call, f"No worker has plugin '{call.plugin_name}' for task '{call.task_name}'")
+                return []
+            if call.queued_at is None:
+                call.queued_at = time.monotonic()
+            self._backlog.append(call)
+            return []
+        call.attempts += 1
+        call.worker_id = worker.worker_id
+        call.queued_at = None
+        worker.in_flight[call.call_id] = call
+        return [(worker, call)]
+
+    def _send_calls(self, sends: List[Tuple[WorkerHandle, RemoteCall]]):
+        while sends:
+            worker, call = sends.pop(0)
+            try:
+                _send(worker.stream, worker.write_lock, call.to_message())
+                self.logger.debug(f"Dispatched '{call.task_name}' to worker {worker.worker_id}")
+            except (OSError, ValueError) as e:
+                with self._lock:
+                    if worker.in_flight.pop(call.call_id, None) is None:
+                        continue
+                    call.attempts -= 1
+                    sends.extend(self._remove_worker(worker, f"send failed: {str(e)}"))
+                    sends.extend(self._dispatch(call))
+
+    def _drain_backlog(self) -> List[Tuple[WorkerHandle, RemoteCall]]:
+        sends = []
+        for _ in range(len(self._backlog)):
+            sends.extend(self._dispatch(self._backlog.popleft()))
+        return sends
+
+    def _expire_backlog(self, now: float):
+        for _ in range(len(self._backlog)):
+            call = self._backlog.popleft()
+            if now - call.queued_at > self.queue_timeout:
+                self._fail(call, f"No worker free for task '{call.task_name}' within {self.queue_timeout}s")
+            else:
+                self._backlog.append(call)
+
+    def _fail(self, call: RemoteCall, error: str):
+        call.error = error
+        call.done.set()
+
+    def register_worker(self, message: Dict[str, Any], stream,
+                        connection: Optional[socket.socket] = None) -> WorkerHandle:
+        worker = WorkerHandle(message.get('worker_id') or uuid.uuid4().hex[:8], message.get('plugins', []),
+                              int(message.get('capacity', 1)), message.get('artifacts', []), stream, connection)
+        with self._lock:
+            previous = self.workers.get(worker.worker_id)
+            sends = []
+            if previous is not None:
+                # Its calls wait in the backlog for the new registration
+                self._remove_worker(previous, "replaced by a new registration", redispatch=False, requeue=True)
+            self.workers[worker.worker_id] = worker
+            sends.extend(self._drain_backlog())
+        self._send_calls(sends)
+        self.logger.info(f"Worker {worker.worker_id} registered with plugins {sorted(worker.plugins)} "
+                         f"and capacity {worker.capacity}")
+        return worker
+
+    def handle_message(self, worker: WorkerHandle, message: Dict[str, Any]):
+        worker.last_heartbeat = time.monotonic()
+        message_type = message.get('type')
+        if message_type == 'heartbeat':
+            return
+        if message_type != 'result':
+            self.logger.warning(f"Unexpected message from worker {worker.worker_id}: {message_type}")
+            return
+        for line in message.get('logs', []):
+            self.logger.info(f"[worker {worker.worker_id}] {line}")
+        with self._lock:
+            call = worker.in_flight.pop(message['call_id'], None)
+            worker.artifacts.update(message.get('artifacts', []))
+            sends = self._drain_backlog()
+        self._send_calls(sends)
+        if call is None:
+            return
+        if message.get('ok'):
+            call.result = message.get('result')
+            call.done.set()
+        else:
+            self._fail(call, f"Task '{call.task_name}' failed on worker {worker.worker_id}: {message.get('error')}")
+
+    def worker_disconnected(self, worker: WorkerHandle):
+        sends = []
+        with self._lock:
+            if self.workers.get(worker.worker_id) is worker:
+                sends = self._remove_worker(worker, "connection closed")
+        self._send_calls(sends)
+
+    def _remove_worker(self, worker: WorkerHandle, reason: str, redispatch: bool = True,
+                       requeue: bool = False) -> List[Tuple[WorkerHandle, RemoteCall]]:
+        # Called with the lock held; returns the re-dispatched calls to send once it is released
+        worker.alive = False
+        if self.workers.get(worker.worker_id) is worker:
+            del self.workers[worker.worker_id]
+        self.logger.warning(f"Worker {worker.worker_id} lost: {reason}")
+        if worker.connection is not None:
+            try:
+                worker.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        calls = list(worker.in_flight.values())
+        worker.in_flight.clear()
+        sends = []
+        for call in calls:
+            if requeue and call.attempts < self.max_attempts:
+                call.queued_at = time.monotonic()
+                self._backlog.append(call)
+            elif not redispatch or call.attempts >= self.max_attempts:
+                self._fail(call, f"Task '{call.task_name}' lost with worker {worker.worker_id}: {reason}")
+            else:
+                self.logger.info(f"Re-dispatching task '{call.task_name}' from lost worker {worker.worker_id}")
+                sends.extend(self._dispatch(call))
+        return sends
+
+    def _monitor_heartbeats(self):
+        while not self._stopped.wait(self.heartbeat_timeout / 4):
+            now = time.monotonic()
+            sends = []
+            with self._lock:
+                for worker in list(self.workers.values()):
+                    if now - worker.last_heartbeat > self.heartbeat_timeout:
+                        sends.extend(self._remove_worker(worker, f"no heartbeat for {self.heartbeat_timeout}s"))
+                self._expire_backlog(now)
+            self._send_calls(sends)
+
+    def get_workers(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [worker.to_dict() for worker in self.workers.values()]
+
+
+class _WorkerConnectionHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        coordinator: Coordinator = self.server.coordinator
+        line = self.rfile.readline()
+        if not line:
+            return
+        message = json.loads(line)
+        if message.get('type') != 'register':
+            return
+        worker = coordinator.register_worker(message, self.wfile, self.connection)
+        try:
+            for line in self.rfile:
+                if line.strip():
+                    coordinator.handle_message(worker, json.loads(line))
+        except (OSError, ValueError) as e:
+            coordinator.logger.warning(f"Error reading from worker {worker.worker_id}: {str(e)}")
+        finally:
+            coordinator.worker_disconnected(worker)
+
+
+class _CoordinatorServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _CallLogHandler(logging.Handler):
+    """
+    Collects the log records emitted by the threads that are running calls,
+    so they can be returned to the coordinator with the result.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.buffers: Dict[int, List[str]] = {}
+        self.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+
+    def emit(self, record: logging.LogRecord):
+        buffer = self.buffers.get(record.thread)
+        if buffer is not None:
+            buffer.append(self.format(record))
+
+
+class WorkerAgent:
+    """
+    Executes plugin calls dispatched by a Coordinator, reconnecting with a
+    growing delay when the connection drops.
+    """
+
+    def __init__(self, plugin_system: PluginSystem, logger: logging.Logger, host: str = '127.0.0.1',
+                 port: int = DEFAULT_COORDINATOR_PORT, worker_id: Optional[str] = None,
+                 capacity: Optional[int] = None, heartbeat_interval: float = 2.0,
+                 artifacts: Optional[List[str]] = None):
+        self.plugin_system = plugin_system
+        self.logger = logger
+        self.host = host
+        self.port = port
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.capacity = capacity or os.cpu_count() or 1
+        self.heartbeat_interval = heartbeat_interval
+        self.artifacts: Set[str] = set(artifacts or [])
+        self._executor = ThreadPoolExecutor(max_workers=self.capacity, thread_name_prefix='tao-worker')
+        self._log_handler = _CallLogHandler()
+        self._stopped = threading.Event()
+        self._connection: Optional[socket.socket] = None
+
+    def run(self, max_reconnect_delay: float = 30.0):
+        logging.getLogger().addHandler(self._log_handler)
+        delay = 0.5
+        try:
+            while not self._stopped.is_set():
+                try:
+                    self._serve_connection()
+                    delay = 0.5
+                except OSError as e:
+                    self.logger.warning(f"Connection to coordinator {self.host}:{self.port} failed: {str(e)}")
+                if self._stopped.wait(delay):
+                    break
+                delay = min(delay * 2, max_reconnect_delay)
+        finally:
+            logging.getLogger().removeHandler(self._log_handler)
+            self._executor.shutdown(wait=True)
+
+    def stop(self):
+        self._stopped.set()
+        if self._connection is not None:
+            try:
+                self._connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _serve_connection(self):
+        self._connection = socket.create_connection((self.host, self.port))
+        write_lock = threading.Lock()
+        with self._connection, self._connection.makefile('rwb') as stream:
+            _send(stream, write_lock, {
+                'type': 'register',
+                'worker_id': self.worker_id,
+                'plugins': sorted(self.plugin_system.plugins),
+                'capacity': self.capacity,
+                'artifacts': sorted(self.artifacts),
+            })
+            self.logger.info(f"Worker {self.worker_id} registered with coordinator {self.host}:{self.port}")
+            connected = threading.Event()
+            connected.set()
+            heartbeat = threading.Thread(target=self._send_heartbeats, args=(stream, write_lock, connected),
+                                         name='tao-worker-heartbeat', daemon=True)
+            heartbeat.start()
+            try:
+                for line in stream:
+                    if self._stopped.is_set():
+                        break
+                    if not line.strip():
+                        continue
+                    message = json.loads(line)
+                    if message.get('type') == 'execute':
+                        self._executor.submit(self._execute, message, stream, write_lock)
+            finally:
+                connected.clear()
+
+    def _send_heartbeats(self, stream, write_lock: threading.Lock, connected: threading.Event):
+        while connected.is_set() and not self._stopped.wait(self.heartbeat_interval):
+            try:
+                _send(stream, write_lock, {'type': 'heartbeat', 'worker_id': self.worker_id})
+            except (OSError, ValueError):
+                return
+
+    def _execute(self, message: Dict[str, Any], stream, write_lock: threading.Lock):
+        thread_id = threading.get_ident()
+        self._log_handler.buffers[thread_id] = []
+        response = {'type': 'result', 'call_id': message['call_id']}
+        try:
+            result = self.plugin_system.execute_task(message['plugin'], message['task'],
+                                                     message.get('parameters') or {}, message.get('variables') or {})
+            response.update(ok=True, result=result, artifacts=self._find_artifacts(result))
+        except Exception as e:
+            response.update(ok=False, error=str(e))
+        finally:
+            response['logs'] = self._log_handler.buffers.pop(thread_id, [])
+        try:
+            _send(stream, write_lock, response)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not return result of '{message['task']}': {str(e)}")
+
+    def _find_artifacts(self, result: Any) -> List[str]:
+        # Paths in the result that exist here become locality hints for later calls
+        values = result.values() if isinstance(result, dict) else [result]
+        artifacts = [value for value in values if isinstance(value, str) and os.path.exists(value)]
+        self.artifacts.update(artifacts)
+        return artifacts
@@ -1,42 +1,178 @@
+import hashlib
 import logging
-from typing import Dict, Any, Optional
+import re
+import threading
+import time
+import traceback
+from typing import Dict, Any, List, Optional, Set, Tuple
 from rich.console import Console
 from rich.panel import Panel
-from rich.traceback import Traceback
+from tao.metrics import WorkflowMetrics
+from tao.event_bus import TASK_ERROR
+from tao.circuit_breaker import CircuitBreakers, CircuitOpenError
+
+# Numbers and addresses vary between otherwise identical errors
+_VOLATILE_PATTERN = re.compile(r"0x[0-9a-fA-F]+|\d+(?:\.\d+)?")
+
+
+def error_fingerprint(error: BaseException) -> str:
+    """
+    Identify errors of the same type, raised from the same place, whose
+    messages differ only in numbers or addresses.
+    """
+    frames = traceback.extract_tb(error.__traceback__)
+    location = f"{frames[-1].filename}:{frames[-1].lineno}" if frames else ''
+    message = _VOLATILE_PATTERN.sub('#', str(error))
+    key = f"{type(error).__module__}.{type(error).__qualname__}|{location}|{message}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
 
 class ErrorHandler:
-    def __init__(self, config: Dict[str, Any], logger: logging.Logger):
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger, metrics: Optional[WorkflowMetrics] = None,
+                 circuit_breakers: Optional[CircuitBreakers] = None):
         self.config = config
         self.logger = logger
+        self.metrics = metrics
+        self.event_bus = None
         self.console = Console()
         self.error_count: Dict[str, int] = {}
-        self.global_max_retries = config.get('global', {}).get('max_retries', 3)
-        self.global_retry_delay = config.get('global', {}).get('retry_delay', 60)
+        self.last_error: Dict[str, str] = {}
+        self.retry_count: Dict[str, int] = {}
+        # Tasks whose last error asked for a retry that take_retry() has not started yet
+        self._retry_requested: Set[str] = set()
+        self.error_groups: Dict[str, Dict[str, Any]] = {}
+        # Failures are not retried unless configured, so calls bound to fail are not repeated
+        self.global_max_retries = config.get('global', {}).get('max_retries', 0)
+        self.global_retry_delay = config.get('global', {}).get('retry_delay', 1.0)
+        # Full tracebacks are rendered for the first occurrence of an error and every Nth repeat
+        self.traceback_sample_every = int(config.get('traceback_sample_every') or 100)
+        # Shared breakers (see PluginSystem.get_circuit_breakers) keep their state across runs
+        breaker_config = config.get('circuit_breakers')
+        if circuit_breakers is None and breaker_config is not None and breaker_config.get('enabled', True):
+            circuit_breakers = CircuitBreakers(breaker_config, logger, metrics)
+        self.circuit_breakers = circuit_breakers
+        self._lock = threading.Lock()
 
-    def handle_error(self, error: Exception, task: str, context: Dict[str, Any]) -> bool:
-        self.error_count[task] = self.error_count.get(task, 0) + 1
+    def handle_error(self, error: Exception, task: str, context: Dict[str, Any], plugin: Optional[str] = None,
+                     function: Optional[str] = None, retryable: bool = True) -> bool:
+        """
+        Record and report an error. Returns whether the task should be
+        retried; the caller starts the retry with take_retry(). Errors of
+        steps are not retryable on their own.
+        """
+        with self._lock:
+            self.error_count[task] = self.error_count.get(task, 0) + 1
+            self.last_error[task] = str(error)
+            attempt = self.error_count[task]
+            fingerprint, occurrence, render_traceback = self._aggregate(error, task)
         
         task_config = self.config.get('tasks', {}).get(task, {})
         max_retries = task_config.get('max_retries', self.global_max_retries)
-        retry_delay = task_config.get('retry_delay', self.global_retry_delay)
+        retry_delay = self.get_retry_delay(task)
+
+        circuit_open = isinstance(error, CircuitOpenError)
+        if self.circuit_breakers is not None and plugin and function and not circuit_open:
+            self.circuit_breakers.record_failure(plugin, function)
+
+        if self.metrics is not None:
+            self.metrics.record_failure(task)
+            self.metrics.record_error(fingerprint)
+
+        # Retrying against an open circuit would only fail fast again
+        retrying = retryable and attempt <= max_retries and not circuit_open
+        if retrying:
+            with self._lock:
+                self._retry_requested.add(task)
+        if self.event_bus is not None:
+            # Logging and rendering the traceback happen on the bus subscribers' threads
+            self.event_bus.publish(TASK_ERROR, task, error=error, context=context, attempt=attempt,
+                                   max_retries=max_retries, retrying=retrying, retryable=retryable,
+                                   retry_delay=retry_delay, fingerprint=fingerprint, occurrence=occurrence,
+                                   traceback=render_traceback)
+            return retrying
 
         error_message = f"Error in task '{task}': {str(error)}"
-        self.logger.error(error_message, exc_info=True, extra={'context': context})
+        if render_traceback:
+            self.logger.error(error_message, exc_info=True, extra={'context': context})
 
-        self.console.print(Panel.fit(
-            Traceback.from_exception(type(error), error, error.__traceback__),
-            title=f"Error in task '{task}'",
-            border_style="bold red"
-        ))
+            from rich.traceback import Traceback
+            self.console.print(Panel.fit(
+                Traceback.from_exception(type(error), error, error.__traceback__),
+                title=f"Error in task '{task}'" + (f" (seen {occurrence} times)" if occurrence > 1 else ""),
+                border_style="bold red"
+            ))
+        else:
+            self.logger.error(f"{error_message} (occurrence {occurrence} of error {fingerprint})",
+                              extra={'context': context})
 
-        if self.error_count[task] <= max_retries:
-            self.console.print(f"Retrying... (Attempt {self.error_count[task]}/{max_retries})")
-            self.logger.info(f"Retrying task '{task}' (Attempt {self.error_count[task]}/{max_retries})")
+        if retrying:
+            self.console.print(f"Retrying in {retry_delay:g}s... (Attempt {self.error_count[task]}/{max_retries})")
+            self.logger.info(f"Retrying task '{task}' in {retry_delay:g}s "
+                             f"(Attempt {self.error_count[task]}/{max_retries})")
             return True
-        else:
+        elif circuit_open:
+            self.logger.error(f"Not retrying task '{task}' while the circuit for {error.plugin}.{error.function} is open")
+            return False
+        elif retryable and max_retries:
             self.console.print(f"Max retries reached for task '{task}'. Aborting.")
             self.logger.error(f"Max retries reached for task '{task}'. Aborting.")
-            return False
+        return False
+
+    def take_retry(self, task: str) -> Optional[float]:
+        """
+        Start the retry that the task's last error asked for.
+
+        Returns:
+            Optional[float]: Seconds to wait before running the task again, or
+            None if the task should not be retried.
+        """
+        with self._lock:
+            if task not in self._retry_requested:
+                return None
+            self._retry_requested.discard(task)
+            self.retry_count[task] = self.retry_count.get(task, 0) + 1
+        if self.metrics is not None:
+            self.metrics.record_retry(task)
+        return self.get_retry_delay(task)
+
+    def get_retry_delay(self, task: str) -> float:
+        """
+        Seconds to wait before retrying the task after handle_error() asked for a retry.
+        """
+        return float(self.config.get('tasks', {}).get(task, {}).get('retry_delay', self.global_retry_delay))
+
+    def _aggregate(self, error: Exception, task: str) -> Tuple[str, int, bool]:
+        fingerprint = error_fingerprint(error)
+        group = self.error_groups.get(fingerprint)
+        if group is None:
+            group = {'fingerprint': fingerprint, 'type': type(error).__name__, 'message': str(error), 'count': 0,
+                     'tasks': set(), 'first_seen': time.time()}
+            self.error_groups[fingerprint] = group
+        group['count'] += 1
+        group['tasks'].add(task)
+        group['last_seen'] = time.time()
+        occurrence = group['count']
+        render_traceback = occurrence == 1 or (self.traceback_sample_every > 0
+                                               and occurrence % self.traceback_sample_every == 0)
+        return fingerprint, occurrence, render_traceback
+
+    def check_circuit(self, plugin: str, function: str):
+        """
+        Raise CircuitOpenError if the circuit breaker of the plugin function is open.
+        """
+        if self.circuit_breakers is not None:
+            self.circuit_breakers.before_call(plugin, function)
+
+    def record_success(self, plugin: str, function: str):
+        if self.circuit_breakers is not None:
+            self.circuit_breakers.record_success(plugin, function)
+
+    def set_event_bus(self, event_bus):
+        """
+        Publish errors as TASK_ERROR events (e.g. to a tao.event_bus.EventBus)
+        instead of logging and rendering them inline. Pass None to go back.
+        """
+        self.event_bus = event_bus
 
     def log_warning(self, message: str, task: Optional[str] = None, context: Optional[Dict[str, Any]] = None):
         log_message = f"Warning: {message}"
@@ -57,14 +193,35 @@ class ErrorHandler:
     def reset_error_count(self, task: Optional[str] = None):
         if task:
             self.error_count[task] = 0
+            self.retry_count[task] = 0
+            self._retry_requested.discard(task)
         else:
             self.error_count.clear()
+            self.retry_count.clear()
+            self._retry_requested.clear()
+
+    def get_last_error(self, task: str) -> Optional[str]:
+        return self.last_error.get(task)
 
     def get_error_count(self, task: str) -> int:
         return self.error_count.get(task, 0)
 
+    def get_retry_count(self, task: str) -> int:
+        return self.retry_count.get(task, 0)
+
     def should_abort_workflow(self) -> bool:
         return any(count > self.global_max_retries for count in self.error_count.values())
 
     def get_error_summary(self) -> Dict[str, int]:
-        return self.error_count.copy()
\ No newline at end of file
+        return self.error_count.copy()
+
+    def get_error_groups(self) -> List[Dict[str, Any]]:
+        """
+        Distinct errors seen so far, most frequent first.
+        """
+        with self._lock:
+            groups = [dict(group, tasks=sorted(group['tasks'])) for group in self.error_groups.values()]
+        return sorted(groups, key=lambda group: group['count'], reverse=True)
+
+    def get_circuit_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self.circuit_breakers.get_stats() if self.circuit_breakers is not None else {}
@@ -0,0 +1,188 @@
+import threading
+import time
+from typing import Dict, Any, Callable, Iterable, List, Optional
+import logging
+
+WORKFLOW_STARTED = 'workflow_started'
+TASK_QUEUED = 'task_queued'
+TASK_STARTED = 'task_started'
+STEP_FINISHED = 'step_finished'
+TASK_FINISHED = 'task_finished'
+TASK_ERROR = 'task_error'
+TASK_FAILED = 'task_failed'
+TASK_SKIPPED = 'task_skipped'
+WORKFLOW_FINISHED = 'workflow_finished'
+
+EVENT_TYPES = (WORKFLOW_STARTED, TASK_QUEUED, TASK_STARTED, STEP_FINISHED, TASK_FINISHED, TASK_ERROR,
+               TASK_FAILED, TASK_SKIPPED, WORKFLOW_FINISHED)
+
+DROP = 'drop'
+BLOCK = 'block'
+
+
+class WorkflowEvent:
+    __slots__ = ('event_type', 'task', 'timestamp', 'data')
+
+    def __init__(self, event_type: str, task: Optional[str], data: Dict[str, Any]):
+        self.event_type = event_type
+        self.task = task
+        self.timestamp = time.time()
+        self.data = data
+
+    def __repr__(self) -> str:
+        return f"WorkflowEvent({self.event_type!r}, task={self.task!r})"
+
+
+class Subscription:
+    def __init__(self, name: str, handler: Callable[[WorkflowEvent], None], policy: str,
+                 event_types: Optional[Iterable[str]], cursor: int, never_drop: Optional[Iterable[str]] = None):
+        if policy not in (DROP, BLOCK):
+            raise ValueError(f"Unknown policy '{policy}' for subscriber '{name}', expected '{DROP}' or '{BLOCK}'")
+        self.name = name
+        self.handler = handler
+        self.policy = policy
+        self.event_types = frozenset(event_types) if event_types is not None else None
+        # Event types a 'drop' subscriber still receives when it falls behind
+        self.never_drop = frozenset(never_drop or ())
+        self.rescued: List[WorkflowEvent] = []
+        # Sequence number of the next event this subscriber will read
+        self.cursor = cursor
+        # End of the batch being handled; events before it are already out of the buffer
+        self.delivering_until = cursor
+        self.delivered = 0
+        self.dropped = 0
+        self.thread: Optional[threading.Thread] = None
+
+
+class EventBus:
+    """
+    Delivers engine events to subscribers on their own threads.
+
+    Events go into a fixed-size ring buffer and publishing only holds a lock
+    long enough to store one slot. Each subscriber reads the buffer at its
+    own pace. When a subscriber falls a full buffer behind, a 'drop'
+    subscriber skips the events it missed, except those of its `never_drop`
+    types, and a 'block' subscriber makes publishers wait until it catches up.
+    """
+
+    def __init__(self, logger: logging.Logger, capacity: int = 1024):
+        if capacity < 1:
+            raise ValueError(f"Event buffer capacity must be at least 1, got {capacity}")
+        self.logger = logger
+        self.capacity = capacity
+        self._buffer: List[Optional[WorkflowEvent]] = [None] * capacity
+        self._sequence = 0
+        self._subscriptions: List[Subscription] = []
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def subscribe(self, name: str, handler: Callable[[WorkflowEvent], None], policy: str = BLOCK,
+                  event_types: Optional[Iterable[str]] = None,
+                  never_drop: Optional[Iterable[str]] = None) -> Subscription:
+        """
+        Start delivering events published from now on to `handler`, on a
+        dedicated thread. Limit delivery to some event types by listing them.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Event bus is closed")
+            subscription = Subscription(name, handler, policy, event_types, self._sequence, never_drop)
+            self._subscriptions.append(subscription)
+        subscription.thread = threading.Thread(target=self._consume, args=(subscription,),
+                                               name=f"tao-events-{name}", daemon=True)
+        subscription.thread.start()
+        return subscription
+
+    def publish(self, event_type: str, task: Optional[str] = None, **data: Any):
+        event = WorkflowEvent(event_type, task, data)
+        with self._condition:
+            if self._closed:
+                return
+            while self._sequence - self._slowest_blocking_cursor() >= self.capacity:
+                self._condition.wait()
+            if self._sequence >= self.capacity:
+                self._rescue(self._sequence - self.capacity)
+            self._buffer[self._sequence % self.capacity] = event
+            self._sequence += 1
+            self._condition.notify_all()
+
+    def _rescue(self, sequence: int):
+        # The event at `sequence` is about to be overwritten; keep it for lagging subscribers that must see it
+        evicted = self._buffer[sequence % self.capacity]
+        for subscription in self._subscriptions:
+            if subscription.delivering_until <= sequence and evicted.event_type in subscription.never_drop:
+                subscription.rescued.append(evicted)
+
+    def _slowest_blocking_cursor(self) -> int:
+        cursors = [subscription.cursor for subscription in self._subscriptions if subscription.policy == BLOCK]
+        return min(cursors) if cursors else self._sequence
+
+    def _consume(self, subscription: Subscription):
+        while True:
+            with self._condition:
+                while subscription.cursor == self._sequence and not self._closed:
+                    self._condition.wait()
+                if subscription.cursor == self._sequence:
+                    return
+                missed = self._sequence - subscription.cursor - self.capacity
+                # Rescued events all come from the overwritten range, so they are not lost
+                events = subscription.rescued
+                subscription.rescued = []
+                if missed > 0:
+                    dropped = missed - len(events)
+                    subscription.cursor += missed
+                    if dropped:
+                        subscription.dropped += dropped
+                        self.logger.warning(f"Event subscriber '{subscription.name}' fell behind and dropped "
+                                            f"{dropped} events")
+                end = self._sequence
+                subscription.delivering_until = end
+                events += [self._buffer[sequence % self.capacity] for sequence in range(subscription.cursor, end)]
+
+            for event in events:
+                if subscription.event_types is not None and event.event_type not in subscription.event_types:
+                    continue
+                try:
+                    subscription.handler(event)
+                    subscription.delivered += 1
+                except Exception as e:
+                    self.logger.error(f"Event subscriber '{subscription.name}' failed on {event.event_type}: {str(e)}")
+
+            with self._condition:
+                subscription.cursor = end
+                self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every subscriber has handled all published events.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while any(subscription.cursor < self._sequence for subscription in self._subscriptions):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Stop accepting events and wait for subscribers to drain the buffer.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for subscription in self._subscriptions:
+            subscription.thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._condition:
+            return {
+                subscription.name: {
+                    'policy': subscription.policy,
+                    'delivered': subscription.delivered,
+                    'dropped': subscription.dropped,
+                    'lag': self._sequence - subscription.cursor,
+                }
+                for subscription in self._subscriptions
+            }
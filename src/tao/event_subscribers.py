@@ -0,0 +1,179 @@
+from typing import Dict, Any, Optional
+import logging
+from tao.event_bus import (EventBus, WorkflowEvent, DROP, BLOCK, TASK_STARTED, TASK_FINISHED, TASK_ERROR,
+                           TASK_FAILED, WORKFLOW_FINISHED)
+from tao.circuit_breaker import CircuitOpenError
+from tao.metrics import WorkflowMetrics
+from tao.run_history import RunHistoryStore
+from tao.ui_manager import UIManager
+
+# Dropping UI updates is preferable to slowing dispatch; the other consumers must see every event
+DEFAULT_EVENT_POLICIES = {'ui': DROP, 'logging': BLOCK, 'metrics': BLOCK, 'history': BLOCK}
+# ...but errors and the final summary always reach the screen
+UI_NEVER_DROP = (TASK_ERROR, TASK_FAILED, WORKFLOW_FINISHED)
+
+
+class _EventSubscriber:
+    def __call__(self, event: WorkflowEvent):
+        handler = getattr(self, f"on_{event.event_type}", None)
+        if handler is not None:
+            handler(event)
+
+
+class UIEventSubscriber(_EventSubscriber):
+    def __init__(self, ui_manager: UIManager):
+        self.ui_manager = ui_manager
+
+    def on_workflow_started(self, event: WorkflowEvent):
+        self.ui_manager.display_welcome()
+        self.ui_manager.display_task_tree(event.data['tasks'], event.data.get('estimates'),
+                                          event.data.get('estimated_time'), event.data.get('estimated_time_p95'))
+        self.ui_manager.start_progress()
+
+    def on_step_finished(self, event: WorkflowEvent):
+        self.ui_manager.display_progress(event.task, event.data['progress'], step_name=event.data['step'])
+
+    def on_task_finished(self, event: WorkflowEvent):
+        self.ui_manager.display_task_result(event.task, event.data['result'])
+        self.ui_manager.display_progress(event.task, 100)
+
+    def on_task_error(self, event: WorkflowEvent):
+        # Repeats of an error already on screen only show up in the summary
+        if event.data.get('traceback', True):
+            self.ui_manager.display_exception(event.data['error'], event.task)
+
+    def on_task_failed(self, event: WorkflowEvent):
+        if event.data.get('raised'):
+            self.ui_manager.display_error(event.data['error'], event.task)
+        self.ui_manager.display_progress(event.task, 100)
+
+    def on_task_skipped(self, event: WorkflowEvent):
+        self.ui_manager.display_progress(event.task, 100, branch_taken="skipped")
+
+    def on_workflow_finished(self, event: WorkflowEvent):
+        status = event.data['status']
+        if status == 'aborted':
+            self.ui_manager.display_error("Workflow aborted due to excessive errors")
+        elif status == 'error':
+            self.ui_manager.display_error(f"Unexpected error in workflow execution: {event.data['error']}")
+        else:
+            self.ui_manager.display_workflow_summary(event.data['summary'])
+        self.ui_manager.stop_progress()
+
+
+class LoggingEventSubscriber(_EventSubscriber):
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def on_task_queued(self, event: WorkflowEvent):
+        self.logger.debug(f"Queued task: {event.task}")
+
+    def on_task_started(self, event: WorkflowEvent):
+        self.logger.info(f"Starting task: {event.task}")
+
+    def on_task_error(self, event: WorkflowEvent):
+        error = event.data['error']
+        if event.data.get('traceback', True):
+            self.logger.error(f"Error in task '{event.task}': {str(error)}",
+                              exc_info=(type(error), error, error.__traceback__),
+                              extra={'context': event.data.get('context')})
+        else:
+            self.logger.error(f"Error in task '{event.task}': {str(error)} (occurrence {event.data['occurrence']} "
+                              f"of error {event.data['fingerprint']})", extra={'context': event.data.get('context')})
+        attempt, max_retries = event.data['attempt'], event.data['max_retries']
+        if event.data['retrying']:
+            self.logger.info(f"Retrying task '{event.task}' in {event.data['retry_delay']:g}s "
+                             f"(Attempt {attempt}/{max_retries})")
+        elif isinstance(error, CircuitOpenError):
+            self.logger.error(f"Not retrying task '{event.task}' while the circuit for {error.plugin}."
+                              f"{error.function} is open")
+        elif event.data.get('retryable', True) and max_retries:
+            self.logger.error(f"Max retries reached for task '{event.task}'. Aborting.")
+
+    def on_task_failed(self, event: WorkflowEvent):
+        if event.data.get('raised'):
+            self.logger.error(f"Error in task {event.task}: {event.data['error']}")
+
+    def on_task_skipped(self, event: WorkflowEvent):
+        if event.data.get('reason'):
+            self.logger.info(f"Skipping task {event.task} due to {event.data['reason']}")
+
+    def on_workflow_finished(self, event: WorkflowEvent):
+        status = event.data['status']
+        if status == 'aborted':
+            self.logger.error("Workflow aborted due to excessive errors")
+        elif status == 'error':
+            self.logger.error(f"Unexpected error in workflow execution: {event.data['error']}")
+        else:
+            self.logger.info(f"Workflow finished with status '{status}'")
+
+
+class MetricsEventSubscriber(_EventSubscriber):
+    def __init__(self, metrics: WorkflowMetrics):
+        self.metrics = metrics
+
+    def on_task_started(self, event: WorkflowEvent):
+        self.metrics.tasks_in_flight.inc()
+
+    def on_task_finished(self, event: WorkflowEvent):
+        self.metrics.tasks_in_flight.dec()
+        self.metrics.tasks_completed.inc()
+
+    def on_task_failed(self, event: WorkflowEvent):
+        self.metrics.tasks_in_flight.dec()
+
+
+class HistoryEventSubscriber(_EventSubscriber):
+    def __init__(self, run_history: RunHistoryStore, run_id: str, workflow: str):
+        self.run_history = run_history
+        self.run_id = run_id
+        self.workflow = workflow
+
+    def on_task_finished(self, event: WorkflowEvent):
+        self.run_history.record_attempt(self.run_id, self.workflow, event.task, event.data['started_at'],
+                                        event.data['duration'], 'completed', result=event.data['result'],
+                                        retries=event.data['retries'])
+
+    def on_task_failed(self, event: WorkflowEvent):
+        self.run_history.record_attempt(self.run_id, self.workflow, event.task,
+                                        event.data.get('started_at') or event.timestamp, event.data.get('duration'),
+                                        'failed', error=event.data['error'], retries=event.data['retries'])
+
+    def on_workflow_finished(self, event: WorkflowEvent):
+        counts = event.data['counts']
+        self.run_history.finish_run(self.run_id, event.data['status'], counts['total'], counts['completed'],
+                                    counts['failed'], counts['skipped'])
+
+
+def create_event_bus(events_config: Dict[str, Any], logger: logging.Logger, ui_manager: UIManager,
+                     metrics: Optional[WorkflowMetrics] = None, run_history: Optional[RunHistoryStore] = None,
+                     run_id: Optional[str] = None, workflow: Optional[str] = None) -> EventBus:
+    """
+    Create an event bus for one run with the standard consumers subscribed.
+
+    Args:
+        events_config (Dict[str, Any]): The engine's `events` settings: `buffer_size` and
+            per-consumer `policies` ('drop' or 'block').
+        logger (logging.Logger): Logger for engine messages.
+        ui_manager (UIManager): The run's UI; not subscribed when headless.
+        metrics (Optional[WorkflowMetrics]): Metrics updated from task events.
+        run_history (Optional[RunHistoryStore]): Store that records task attempts.
+        run_id (Optional[str]): The run_history run the attempts belong to.
+        workflow (Optional[str]): The workflow name recorded with attempts.
+
+    Returns:
+        EventBus: The running event bus.
+    """
+    policies = dict(DEFAULT_EVENT_POLICIES)
+    policies.update(events_config.get('policies', {}))
+    event_bus = EventBus(logger, int(events_config.get('buffer_size', 1024)))
+    event_bus.subscribe('logging', LoggingEventSubscriber(logger), policies['logging'])
+    if not ui_manager.headless:
+        event_bus.subscribe('ui', UIEventSubscriber(ui_manager), policies['ui'], never_drop=UI_NEVER_DROP)
+    if metrics is not None:
+        event_bus.subscribe('metrics', MetricsEventSubscriber(metrics), policies['metrics'],
+                            (TASK_STARTED, TASK_FINISHED, TASK_FAILED))
+    if run_history is not None and run_id is not None:
+        event_bus.subscribe('history', HistoryEventSubscriber(run_history, run_id, workflow), policies['history'],
+                            (TASK_FINISHED, TASK_FAILED, WORKFLOW_FINISHED))
+    return event_bus
@@ -0,0 +1,137 @@
+import fnmatch
+import os
+import threading
+import time
+from typing import Dict, Callable, Iterable, Set, Tuple
+import logging
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: 'FileWatcher'):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        # Ignore opened/closed-without-write events, which reading a file produces
+        if event.is_directory or event.event_type not in ('created', 'modified', 'moved', 'deleted'):
+            return
+        self.watcher.notify(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self.watcher.notify(dest_path)
+
+
+class FileWatcher:
+    """
+    Watches a directory and calls back with the set of changed paths once
+    changes have settled for `debounce` seconds.
+
+    Uses watchdog when it is installed and falls back to polling
+    modification times every `poll_interval` seconds otherwise.
+    """
+
+    def __init__(self, directory: str, callback: Callable[[Set[str]], None], logger: logging.Logger,
+                 patterns: Iterable[str] = ('*',), recursive: bool = False, debounce: float = 0.5,
+                 poll_interval: float = 1.0, use_polling: bool = False):
+        self.directory = os.path.abspath(directory)
+        self.callback = callback
+        self.logger = logger
+        self.patterns = tuple(patterns)
+        self.recursive = recursive
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_polling = use_polling or Observer is None
+        self._changed: Set[str] = set()
+        self._last_change = 0.0
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._threads = []
+
+    def matches(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def notify(self, path: str):
+        if not self.matches(path):
+            return
+        with self._condition:
+            self._changed.add(os.path.abspath(path))
+            self._last_change = time.monotonic()
+            self._condition.notify()
+
+    def start(self):
+        if self.use_polling:
+            self._start_thread(self._poll, 'tao-watch-poll')
+        else:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.directory, recursive=self.recursive)
+            self._observer.daemon = True
+            self._observer.start()
+        self._start_thread(self._dispatch, 'tao-watch-dispatch')
+        self.logger.info(f"Watching {self.directory} for changes ({'polling' if self.use_polling else 'events'})")
+
+    def _start_thread(self, target: Callable, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    def _dispatch(self):
+        while not self._stopped.is_set():
+            with self._condition:
+                while not self._changed and not self._stopped.is_set():
+                    self._condition.wait()
+                if self._stopped.is_set():
+                    return
+                quiet_for = time.monotonic() - self._last_change
+                if quiet_for < self.debounce:
+                    self._condition.wait(self.debounce - quiet_for)
+                    continue
+                changed, self._changed = self._changed, set()
+            try:
+                self.callback(changed)
+            except Exception as e:
+                self.logger.error(f"Error handling changes in {self.directory}: {str(e)}")
+
+    def _snapshot(self) -> Dict[str, Tuple[float, int]]:
+        snapshot = {}
+        for root, directories, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if self.matches(path):
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_mtime, stat.st_size)
+            if not self.recursive:
+                break
+        return snapshot
+
+    def _poll(self):
+        previous = self._snapshot()
+        while not self._stopped.wait(self.poll_interval):
+            current = self._snapshot()
+            for path in current.keys() | previous.keys():
+                if current.get(path) != previous.get(path):
+                    self.notify(path)
+            previous = current
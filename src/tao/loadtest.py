@@ -0,0 +1,187 @@
+import math
+import random
+import threading
+import time
+from typing import Dict, Any, List, Optional
+import logging
+from tao.configuration_manager import ConfigurationManager, ConfigModel
+from tao.plugin_system import PluginSystem
+from tao.workflow_engine import build_workflow_engine
+from tao.event_bus import WorkflowEvent, WORKFLOW_STARTED, TASK_STARTED, TASK_FINISHED, TASK_FAILED
+from tao.metrics import WorkflowMetrics
+
+SHAPES = ('independent', 'chain', 'fanout', 'layered')
+
+
+def generate_dependencies(tasks: int, shape: str, width: int = 10, seed: int = 0) -> List[List[str]]:
+    """
+    Dependency lists for a generated workflow of `tasks` tasks named t0, t1, ...
+
+    independent: no dependencies. chain: each task depends on the previous one.
+    fanout: one root, every middle task depends on it and a final task depends
+    on all of them. layered: layers of `width` tasks, each depending on one to
+    three tasks of the previous layer.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown workflow shape '{shape}', expected one of {', '.join(SHAPES)}")
+    names = [f"t{index}" for index in range(tasks)]
+    if shape == 'independent':
+        return [[] for _ in names]
+    if shape == 'chain':
+        return [[] if index == 0 else [names[index - 1]] for index in range(tasks)]
+    if shape == 'fanout':
+        if tasks < 3:
+            return [[] if index == 0 else [names[0]] for index in range(tasks)]
+        return [[]] + [[names[0]] for _ in range(tasks - 2)] + [names[1:-1]]
+    rng = random.Random(seed)
+    width = max(1, width)
+    dependencies = []
+    for index in range(tasks):
+        layer_start = (index // width) * width
+        previous_layer = names[max(0, layer_start - width):layer_start]
+        dependencies.append(sorted(rng.sample(previous_layer, min(len(previous_layer), rng.randint(1, 3)))))
+    return dependencies
+
+
+def generate_config(tasks: int = 1000, shape: str = 'independent', width: int = 10, max_parallel_tasks: int = 16,
+                    parameters: Optional[Dict[str, Any]] = None, plugin_directory: str = './plugins',
+                    seed: int = 0, max_retries: int = 0, retry_delay: float = 0.0) -> Dict[str, Any]:
+    """
+    Build a workflow configuration whose tasks all call the synthetic plugin's
+    `work` function with the given parameters, retrying failed calls up to
+    max_retries times.
+    """
+    task_configs = []
+    for index, dependencies in enumerate(generate_dependencies(tasks, shape, width, seed)):
+        task_parameters = dict(parameters or {})
+        task_parameters['seed'] = seed * 1000003 + index
+        task_configs.append({'name': f"t{index}", 'plugin': 'synthetic_plugin', 'function': 'work',
+                             'parameters': task_parameters, 'dependencies': dependencies})
+    return {
+        'config_version': '2.0',
+        'name': 'loadtest',
+        'workflow_engine': {'plugin_directory': plugin_directory, 'max_parallel_tasks': max_parallel_tasks},
+        'logging': {'level': 'WARNING', 'file': 'loadtest.log', 'format': '%(message)s'},
+        'plugins': [],
+        'workflow': {'name': f"loadtest-{shape}-{tasks}", 'tasks': task_configs},
+        'error_handling': {'on_task_error': 'log', 'on_workflow_failure': 'log',
+                           'global': {'max_retries': max_retries, 'retry_delay': retry_delay}},
+        'on_workflow_complete': [],
+        'on_workflow_failure': [],
+    }
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+class _LoadTestCollector:
+    """
+    Event subscriber that records task latencies and scheduling delays. A
+    task's queueing delay is the time from when its last dependency finished
+    (or the run started) until it started running.
+    """
+
+    def __init__(self, dependencies: Dict[str, List[str]]):
+        self.dependencies = dependencies
+        self.workflow_started: Optional[float] = None
+        self.started: Dict[str, float] = {}
+        self.finished: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.queue_delays: List[float] = []
+        self.failed = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, event: WorkflowEvent):
+        with self._lock:
+            if event.event_type == WORKFLOW_STARTED:
+                self.workflow_started = event.timestamp
+            elif event.event_type == TASK_STARTED:
+                if event.task in self.started:
+                    # A retry; its wait is the retry delay, not queueing
+                    return
+                self.started[event.task] = event.timestamp
+                ready_at = max([self.finished.get(name, self.workflow_started)
+                                for name in self.dependencies.get(event.task, [])] or [self.workflow_started])
+                self.queue_delays.append(max(0.0, event.timestamp - ready_at))
+            elif event.event_type in (TASK_FINISHED, TASK_FAILED):
+                self.finished[event.task] = event.timestamp
+                self.retries += event.data.get('retries') or 0
+                if event.event_type == TASK_FAILED:
+                    self.failed += 1
+                elif event.data.get('duration') is not None:
+                    self.latencies.append(event.data['duration'])
+
+
+class LoadTest:
+    """
+    Drives generated workflows of synthetic tasks through the real
+    WorkflowEngine and reports throughput, task latency percentiles and the
+    scheduler's queueing delay.
+    """
+
+    def __init__(self, plugin_system: PluginSystem, logger: logging.Logger, tasks: int = 1000,
+                 shape: str = 'independent', width: int = 10, max_parallel_tasks: int = 16,
+                 parameters: Optional[Dict[str, Any]] = None, seed: int = 0,
+                 metrics: Optional[WorkflowMetrics] = None, max_retries: int = 0, retry_delay: float = 0.0):
+        self.plugin_system = plugin_system
+        self.logger = logger
+        self.tasks = tasks
+        self.shape = shape
+        self.width = width
+        self.max_parallel_tasks = max_parallel_tasks
+        self.parameters = parameters or {}
+        self.seed = seed
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    def run(self, runs: int = 1) -> List[Dict[str, Any]]:
+        if 'synthetic_plugin' not in self.plugin_system.plugins:
+            raise ValueError(f"synthetic_plugin is not loaded from {self.plugin_system.plugin_directory}")
+        return [self.run_once(self.seed + index) for index in range(runs)]
+
+    def run_once(self, seed: int) -> Dict[str, Any]:
+        config_data = generate_config(self.tasks, self.shape, self.width, self.max_parallel_tasks, self.parameters,
+                                      self.plugin_system.plugin_directory, seed, self.max_retries,
+                                      self.retry_delay)
+        config_manager = ConfigurationManager('<loadtest>')
+        config_manager.config = ConfigModel(**config_data)
+        collector = _LoadTestCollector({task['name']: task['dependencies']
+                                        for task in config_data['workflow']['tasks']})
+
+        engine = build_workflow_engine(config_manager, self.plugin_system, self.logger, metrics=self.metrics)
+        engine.add_event_subscriber('loadtest', collector, event_types=(WORKFLOW_STARTED, TASK_STARTED,
+                                                                        TASK_FINISHED, TASK_FAILED))
+        start_time = time.perf_counter()
+        success = engine.execute_workflow()
+        wall_time = time.perf_counter() - start_time
+
+        completed = len(collector.latencies)
+        finished = completed + collector.failed
+        report = {
+            'seed': seed,
+            'tasks': self.tasks,
+            'shape': self.shape,
+            'max_parallel_tasks': self.max_parallel_tasks,
+            'success': success,
+            'completed': completed,
+            'failed': collector.failed,
+            'skipped': self.tasks - finished,
+            'retries': collector.retries,
+            'wall_seconds': wall_time,
+            'throughput_per_second': finished / wall_time if wall_time > 0 else 0.0,
+        }
+        for label, values in (('latency', collector.latencies), ('queue_delay', collector.queue_delays)):
+            for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+                report[f"{label}_{name}_ms"] = _milliseconds(percentile(values, fraction))
+            report[f"{label}_max_ms"] = _milliseconds(max(values) if values else None)
+        return report
+
+
+def _milliseconds(seconds: Optional[float]) -> Optional[float]:
+    return seconds * 1000 if seconds is not None else None
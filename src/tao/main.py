@@ -1,17 +1,12 @@
 import typer
-import yaml
 from rich.console import Console
 from rich.panel import Panel
 import logging
 from pathlib import Path
+from typing import List, Optional
 
-from tao.workflow_engine import WorkflowEngine
-from tao.configuration_manager import ConfigurationManager
-from tao.plugin_system import PluginSystem
-from tao.ui_manager import UIManager
-from tao.variable_manager import VariableManager
-from tao.conditional_logic import ConditionalLogic
-from tao.error_handler import ErrorHandler
+# Engine components are imported inside the commands that use them, so
+# `tao --help` and light commands such as `tao submit` start quickly.
 
 app = typer.Typer()
 console = Console()
@@ -25,12 +20,88 @@ def setup_logging(config):
     )
     return logging.getLogger(__name__)
 
+def setup_metrics(config, logger, metrics_port: Optional[int] = None):
+    metrics_config = config.workflow_engine.get('metrics', {})
+    if not metrics_config.get('enabled', False) and metrics_port is None:
+        return None, None
+    from tao.metrics import WorkflowMetrics, MetricsServer
+    metrics = WorkflowMetrics()
+    server = MetricsServer(
+        metrics.registry,
+        host=metrics_config.get('host', '127.0.0.1'),
+        port=metrics_port if metrics_port is not None else metrics_config.get('port', 9464),
+        logger=logger
+    )
+    server.start()
+    return metrics, server
+
+def setup_run_history(config, logger):
+    history_database = config.workflow_engine.get('history_database')
+    if not history_database:
+        return None
+    from tao.run_history import RunHistoryStore
+    return RunHistoryStore(history_database, logger)
+
+def setup_call_recording(plugin_system, logger, record: Optional[Path] = None, replay: Optional[Path] = None,
+                         replay_latency: Optional[float] = None, replay_misses_live: bool = False):
+    """
+    Attach a call replayer and/or recorder to the plugin system. Returns the recorder, which must be closed.
+    """
+    if record is None and replay is None:
+        return None
+    from tao.call_recorder import CallRecorder, CallReplayer
+    if replay is not None:
+        plugin_system.set_call_replayer(CallReplayer(str(replay), logger, replay_latency, strict=not replay_misses_live))
+    if record is None:
+        return None
+    call_recorder = CallRecorder(str(record), logger)
+    plugin_system.set_call_recorder(call_recorder)
+    return call_recorder
+
+def setup_coordinator(config, plugin_system, logger):
+    distributed_config = config.workflow_engine.get('distributed', {})
+    if not distributed_config.get('enabled', False):
+        return None
+    from tao.distributed import Coordinator, DEFAULT_COORDINATOR_PORT
+    coordinator = Coordinator(
+        logger,
+        host=distributed_config.get('host', '127.0.0.1'),
+        port=distributed_config.get('port', DEFAULT_COORDINATOR_PORT),
+        heartbeat_timeout=distributed_config.get('heartbeat_timeout', 10.0),
+        max_attempts=distributed_config.get('max_attempts', 3),
+        queue_timeout=distributed_config.get('queue_timeout')
+    )
+    coordinator.start()
+    min_workers = distributed_config.get('min_workers', 0)
+    if min_workers and not coordinator.wait_for_workers(min_workers, distributed_config.get('worker_wait_timeout', 60)):
+        logger.warning(f"Starting with fewer than {min_workers} workers")
+    plugin_system.set_remote_executor(coordinator)
+    return coordinator
+
 @app.command()
-def run(config_file: Path = typer.Option("config.yaml", help="Path to the configuration file")):
+def run(config_file: Path = typer.Option("config.yaml", help="Path to the configuration file"),
+        metrics_port: Optional[int] = typer.Option(None, help="Serve Prometheus metrics on this localhost port"),
+        record: Optional[Path] = typer.Option(None, help="Record plugin calls to this file (.gz to compress)"),
+        replay: Optional[Path] = typer.Option(None, help="Serve plugin calls from this recording"),
+        replay_latency: Optional[float] = typer.Option(None, help="Reproduce recorded latencies scaled by this factor"),
+        replay_misses_live: bool = typer.Option(False, help="Call the real plugin for calls missing from the recording")):
     """
     Run the TAO Agent v2.0 workflow.
     """
+    from tao.workflow_engine import WorkflowEngine
+    from tao.configuration_manager import ConfigurationManager
+    from tao.plugin_system import PluginSystem
+    from tao.ui_manager import UIManager
+    from tao.variable_manager import VariableManager
+    from tao.conditional_logic import ConditionalLogic
+    from tao.error_handler import ErrorHandler
+    from tao.task_statistics import TaskStatistics
+
     console.print(Panel.fit("TAO Agent v2.0", title="Welcome", border_style="bold blue"))
+    metrics_server = None
+    coordinator = None
+    run_history = None
+    call_recorder = None
     
     try:
         # Load configuration
@@ -40,31 +111,50 @@ def run(config_file: Path = typer.Option("config.yaml", help="Path to the config
         # Setup logging
         logger = setup_logging(config)
         
+        # Start the optional metrics endpoint
+        metrics, metrics_server = setup_metrics(config, logger, metrics_port)
+        
         # Initialize error handler
-        error_handler = ErrorHandler(config.error_handling, logger)
+        error_handler = ErrorHandler(config.error_handling.dict(by_alias=True), logger, metrics)
         
         # Initialize plugin system
-        plugin_system = PluginSystem(config.workflow_engine.plugin_directory)
-        plugins = plugin_system.load_plugins()
+        plugin_system = PluginSystem(config.workflow_engine.get('plugin_directory', './plugins'), logger, metrics)
+        plugin_system.load_plugins()
+        if config.workflow_engine.get('hot_reload', False):
+            plugin_system.watch_plugins()
+        call_recorder = setup_call_recording(plugin_system, logger, record, replay, replay_latency,
+                                             replay_misses_live)
+        
+        # Dispatch tasks to remote workers when distributed execution is enabled
+        coordinator = setup_coordinator(config, plugin_system, logger)
         
         # Initialize UI Manager
-        ui_manager = UIManager(config.ui_config)
+        ui_manager = UIManager(config.workflow_engine.get('ui', {}), logger)
         
         # Initialize Variable Manager
-        variable_manager = VariableManager(config.global_variables)
+        variable_manager = VariableManager({**config.global_variables, **config.workflow.variables})
         
         # Initialize Conditional Logic
-        conditional_logic = ConditionalLogic()
+        conditional_logic = ConditionalLogic(logger, metrics)
+        
+        # Load task duration statistics from previous runs
+        task_statistics = TaskStatistics(config.workflow_engine.get('statistics_file'), logger=logger)
+        
+        # Record runs and task attempts in the history database
+        run_history = setup_run_history(config, logger)
         
         # Initialize and run workflow engine
         workflow_engine = WorkflowEngine(
-            config=config,
-            plugins=plugins,
+            config=config_manager,
+            plugins=plugin_system,
             ui_manager=ui_manager,
             variable_manager=variable_manager,
             conditional_logic=conditional_logic,
             error_handler=error_handler,
-            logger=logger
+            logger=logger,
+            metrics=metrics,
+            task_statistics=task_statistics,
+            run_history=run_history
         )
         
         result = workflow_engine.execute_workflow()
@@ -82,6 +172,333 @@ def run(config_file: Path = typer.Option("config.yaml", help="Path to the config
         console.print(Panel.fit(f"An error occurred: {str(e)}", title="Error", border_style="bold red"))
         logger.exception("Unhandled exception in main execution")
         raise typer.Exit(code=1)
+    
+    finally:
+        if call_recorder:
+            call_recorder.close()
+        if run_history:
+            run_history.close()
+        if coordinator:
+            coordinator.stop()
+        if metrics_server:
+            metrics_server.stop()
+
+@app.command()
+def sweep(config_file: Path = typer.Argument(..., help="Path to the configuration file"),
+          vars_file: Path = typer.Option(..., "--vars", help="CSV, JSON or YAML file with one variable set per instance"),
+          max_parallel: int = typer.Option(4, help="Maximum number of instances running at once"),
+          collect: List[str] = typer.Option([], help="Variable to report per instance (repeatable)"),
+          output: Optional[Path] = typer.Option(None, help="Write per-instance results as JSON to this file")):
+    """
+    Run one workflow for many variable sets in a single process.
+    """
+    import json
+    from rich.table import Table
+    from tao.configuration_manager import ConfigurationManager
+    from tao.plugin_system import PluginSystem
+    from tao.ui_manager import UIManager
+    from tao.sweep import ParameterSweep, load_sweep_variables
+
+    console.print(Panel.fit("TAO Agent v2.0", title="Sweep", border_style="bold blue"))
+    config_manager = ConfigurationManager(config_file)
+    config = config_manager.load_config()
+    logger = setup_logging(config)
+    metrics, metrics_server = setup_metrics(config, logger)
+
+    plugin_system = PluginSystem(config.workflow_engine.get('plugin_directory', './plugins'), logger, metrics)
+    plugin_system.load_plugins()
+    runner = None
+    try:
+        runner = ParameterSweep(config_manager, plugin_system, logger, max_parallel=max_parallel,
+                                collect_variables=collect, metrics=metrics)
+        results = runner.run(load_sweep_variables(str(vars_file)))
+    finally:
+        if runner is not None:
+            runner.close()
+        plugin_system.cleanup_plugins()
+        if metrics_server:
+            metrics_server.stop()
+
+    table = Table(title="Sweep Results")
+    table.add_column("#", style="cyan")
+    table.add_column("Variables", style="magenta")
+    table.add_column("Status")
+    table.add_column("Duration")
+    for name in collect:
+        table.add_column(name)
+    for result in results:
+        status = "[green]ok[/green]" if result.success else f"[red]failed[/red] {result.error or ''}"
+        table.add_row(str(result.index), json.dumps(result.variables, default=str), status,
+                      f"{result.duration:.2f}s", *[str(result.outputs.get(name)) for name in collect])
+    console.print(table)
+    UIManager({}, logger).display_workflow_summary(ParameterSweep.summarize(results))
+
+    if output:
+        output.write_text(json.dumps([result.to_dict() for result in results], indent=2, default=str))
+    if not all(result.success for result in results):
+        raise typer.Exit(code=1)
+
+@app.command()
+def serve(socket_path: Optional[str] = typer.Option(None, "--socket", help="Unix socket to listen on"),
+          port: Optional[int] = typer.Option(None, help="Localhost TCP port to listen on when no socket is given"),
+          preload: List[Path] = typer.Option([], help="Configuration files to load and warm up at start-up"),
+          max_concurrent_runs: int = typer.Option(4, help="Number of runs executed concurrently"),
+          watch_plugins: bool = typer.Option(False, help="Reload plugins when their files change"),
+          metrics_port: Optional[int] = typer.Option(None, help="Serve Prometheus metrics on this localhost port"),
+          log_file: str = typer.Option("tao_daemon.log", help="Daemon log file")):
+    """
+    Run TAO as a long-lived daemon that keeps plugins and configurations warm.
+    """
+    from tao.daemon import WorkflowDaemon, serve as serve_daemon
+    from tao.metrics import WorkflowMetrics, MetricsServer
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        filename=log_file, filemode='a')
+    logger = logging.getLogger('tao.daemon')
+    metrics, metrics_server = None, None
+    if metrics_port is not None:
+        metrics = WorkflowMetrics()
+        metrics_server = MetricsServer(metrics.registry, port=metrics_port, logger=logger)
+        metrics_server.start()
+
+    daemon = WorkflowDaemon(logger, max_concurrent_runs=max_concurrent_runs, metrics=metrics,
+                            watch_plugins=watch_plugins)
+    for config_file in preload:
+        daemon.preload(str(config_file))
+    console.print(Panel.fit(f"TAO daemon listening on {socket_path or f'127.0.0.1:{port or 8765}'}",
+                            title="Serve", border_style="bold blue"))
+    try:
+        serve_daemon(daemon, socket_path=socket_path, port=port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if metrics_server:
+            metrics_server.stop()
+
+@app.command()
+def watch(config_files: List[Path] = typer.Argument(..., help="Configuration files whose triggers to run"),
+          max_concurrent_runs: int = typer.Option(4, help="Number of runs executed concurrently"),
+          polling: bool = typer.Option(False, help="Poll for changes instead of using inotify"),
+          log_file: str = typer.Option("tao_watch.log", help="Watcher log file")):
+    """
+    Start workflow runs when the files their triggers watch change.
+    """
+    import threading
+    from tao.daemon import WorkflowDaemon
+    from tao.triggers import TriggerManager
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        filename=log_file, filemode='a')
+    logger = logging.getLogger('tao.watch')
+    daemon = WorkflowDaemon(logger, max_concurrent_runs=max_concurrent_runs)
+    triggers = TriggerManager(logger, daemon.submit, use_polling=polling)
+    for config_file in config_files:
+        daemon.preload(str(config_file))
+        triggers.add_workflow(daemon.get_config(str(config_file)), str(config_file))
+    if not triggers.triggers:
+        console.print("[bold red]No triggers defined in the given configuration files[/bold red]")
+        raise typer.Exit(code=1)
+
+    daemon.start()
+    triggers.start()
+    console.print(Panel.fit("\n".join(f"{trigger.name}: {trigger.directory} -> {trigger.workflow}"
+                                      for trigger in triggers.triggers),
+                            title="Watching", border_style="bold blue"))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        triggers.stop()
+        daemon.stop()
+
+@app.command()
+def submit(config_file: Path = typer.Argument(..., help="Path to the configuration file"),
+           var: List[str] = typer.Option([], help="Variable override as name=value (repeatable)"),
+           socket_path: Optional[str] = typer.Option(None, "--socket", help="Unix socket of the daemon"),
+           port: Optional[int] = typer.Option(None, help="Localhost TCP port of the daemon"),
+           client: str = typer.Option("default", help="Client name used for fair scheduling"),
+           wait: bool = typer.Option(True, help="Wait for the run to finish")):
+    """
+    Submit a workflow run to a running TAO daemon.
+    """
+    import yaml
+    from tao.daemon import send_request
+
+    variables = {}
+    for item in var:
+        name, _, value = item.partition('=')
+        variables[name] = yaml.safe_load(value)
+    response = send_request({
+        'action': 'submit',
+        'config_file': str(config_file.resolve()),
+        'variables': variables,
+        'client': client,
+        'wait': wait,
+    }, socket_path=socket_path, port=port)
+    console.print_json(data=response)
+    if not response.get('ok') or response.get('status') == 'failed':
+        raise typer.Exit(code=1)
+
+@app.command()
+def history(report: str = typer.Argument("runs", help="Report to show: runs, slow, failures or trend"),
+            database: str = typer.Option("./logs/tao_history.db", help="Run history database"),
+            workflow: Optional[str] = typer.Option(None, help="Only include this workflow"),
+            task: Optional[str] = typer.Option(None, help="Task for the trend report"),
+            days: Optional[float] = typer.Option(None, help="Only include the last N days"),
+            limit: int = typer.Option(20, help="Maximum number of rows")):
+    """
+    Query the run history: recent runs, slow tasks, failure rates or duration trends.
+    """
+    import time
+    from datetime import datetime
+    from rich.table import Table
+    from tao.run_history import RunHistoryStore
+
+    if not Path(database).exists():
+        console.print(f"[red]No run history database at {database}[/red]")
+        raise typer.Exit(code=1)
+    store = RunHistoryStore(database)
+    since = time.time() - days * 86400 if days is not None else None
+    try:
+        if report == "runs":
+            rows = store.recent_runs(workflow, limit)
+        elif report == "slow":
+            rows = store.slow_tasks(workflow, since, limit)
+        elif report == "failures":
+            rows = store.failure_rates(workflow, since, limit)
+        elif report == "trend":
+            if not workflow or not task:
+                console.print("[red]The trend report needs --workflow and --task[/red]")
+                raise typer.Exit(code=1)
+            rows = store.duration_trend(workflow, task, since)
+        else:
+            console.print(f"[red]Unknown report: {report}[/red]")
+            raise typer.Exit(code=1)
+    finally:
+        store.close()
+
+    table = Table(title=f"Run History: {report}")
+    columns = list(rows[0].keys()) if rows else []
+    for column in columns:
+        table.add_column(column, style="cyan" if column in ("workflow", "task", "run_id") else None)
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row[column]
+            if column in ("started_at", "bucket") and value is not None:
+                value = datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+            elif isinstance(value, float):
+                value = f"{value:.3f}"
+            cells.append(str(value))
+        table.add_row(*cells)
+    console.print(table)
+
+@app.command()
+def worker(host: str = typer.Option("127.0.0.1", help="Coordinator host"),
+           port: int = typer.Option(8766, help="Coordinator port"),
+           plugin_directory: str = typer.Option("./plugins", help="Directory of plugins to load"),
+           capacity: Optional[int] = typer.Option(None, help="Concurrent tasks (default: number of cores)"),
+           worker_id: Optional[str] = typer.Option(None, help="Worker name (default: host-pid)"),
+           artifact: List[str] = typer.Option([], help="Path already available on this worker (repeatable)"),
+           log_file: str = typer.Option("tao_worker.log", help="Worker log file")):
+    """
+    Run a worker agent that executes tasks dispatched by a coordinating engine.
+    """
+    from tao.distributed import WorkerAgent
+    from tao.plugin_system import PluginSystem
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        filename=log_file, filemode='a')
+    logger = logging.getLogger('tao.worker')
+    plugin_system = PluginSystem(plugin_directory, logger)
+    plugin_system.load_plugins()
+    agent = WorkerAgent(plugin_system, logger, host=host, port=port, worker_id=worker_id,
+                        capacity=capacity, artifacts=artifact)
+    console.print(Panel.fit(f"TAO worker {agent.worker_id} connecting to {host}:{port}",
+                            title="Worker", border_style="bold blue"))
+    try:
+        agent.run()
+    except KeyboardInterrupt:
+        agent.stop()
+    finally:
+        plugin_system.cleanup_plugins()
+
+@app.command()
+def loadtest(tasks: int = typer.Option(1000, help="Number of tasks in the generated workflow"),
+             shape: str = typer.Option("independent", help="Workflow shape: independent, chain, fanout or layered"),
+             width: int = typer.Option(10, help="Layer width for the layered shape"),
+             max_parallel: int = typer.Option(16, help="max_parallel_tasks for the engine"),
+             latency: str = typer.Option("10", help="Task latency in ms: a number or distribution:mean[:spread], "
+                                                    "e.g. lognormal:20:0.8 or uniform:5:50"),
+             cpu_ms: float = typer.Option(0.0, help="CPU burned per task in ms"),
+             payload_bytes: int = typer.Option(0, help="Result payload size per task"),
+             failure_rate: float = typer.Option(0.0, help="Probability that a task fails"),
+             retries: int = typer.Option(0, help="Retries of a failed task before it counts as failed"),
+             retry_delay: float = typer.Option(0.0, help="Seconds to wait before each retry"),
+             runs: int = typer.Option(1, help="Number of runs, each with its own seed"),
+             seed: int = typer.Option(0, help="Seed of the first run"),
+             plugin_directory: str = typer.Option("./plugins", help="Directory containing synthetic_plugin.py"),
+             log_file: str = typer.Option("tao_loadtest.log", help="Log file"),
+             output: Optional[Path] = typer.Option(None, help="Write the reports as JSON to this file")):
+    """
+    Run generated workflows of synthetic tasks through the engine and report
+    throughput, latency percentiles and queueing delay.
+    """
+    import json
+    from rich.table import Table
+    from tao.plugin_system import PluginSystem
+    from tao.loadtest import LoadTest
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        filename=log_file, filemode='a')
+    logger = logging.getLogger('tao.loadtest')
+    parameters = {'latency_ms': parse_latency(latency), 'cpu_ms': cpu_ms, 'payload_bytes': payload_bytes,
+                  'failure_rate': failure_rate}
+
+    plugin_system = PluginSystem(plugin_directory, logger)
+    plugin_system.load_plugins()
+    try:
+        reports = LoadTest(plugin_system, logger, tasks=tasks, shape=shape, width=width,
+                           max_parallel_tasks=max_parallel, parameters=parameters, seed=seed,
+                           max_retries=retries, retry_delay=retry_delay).run(runs)
+    except ValueError as e:
+        console.print(f"[red]{str(e)}[/red]")
+        raise typer.Exit(code=1)
+    finally:
+        plugin_system.cleanup_plugins()
+
+    table = Table(title=f"Load Test: {tasks} {shape} tasks, {max_parallel} parallel")
+    columns = [('seed', "Seed"), ('completed', "Done"), ('failed', "Failed"), ('skipped', "Skipped"),
+               ('retries', "Retries"), ('wall_seconds', "Wall s"),
+               ('throughput_per_second', "Tasks/s"), ('latency_p50_ms', "p50 ms"), ('latency_p99_ms', "p99 ms"),
+               ('queue_delay_p50_ms', "Queue p50"), ('queue_delay_p99_ms', "Queue p99"),
+               ('queue_delay_max_ms', "Queue max")]
+    for key, header in columns:
+        table.add_column(header, style="cyan" if key == 'seed' else None)
+    for report in reports:
+        table.add_row(*[f"{report[key]:.1f}" if isinstance(report[key], float) else str(report[key])
+                        for key, _ in columns])
+    console.print(table)
+    if output:
+        output.write_text(json.dumps(reports, indent=2))
+
+def parse_latency(latency: str):
+    """
+    Parse a --latency value: "10" for a constant, or "distribution:mean[:spread]"
+    where spread is the stddev (normal), sigma (lognormal), alpha (pareto) or
+    the maximum (uniform, whose mean is then the minimum).
+    """
+    parts = latency.split(':')
+    if len(parts) == 1:
+        return float(parts[0])
+    distribution, mean = parts[0], float(parts[1])
+    if distribution == 'uniform':
+        return {'distribution': 'uniform', 'min': mean, 'max': float(parts[2]) if len(parts) > 2 else 2 * mean}
+    spec = {'distribution': distribution, 'mean': mean}
+    if len(parts) > 2:
+        spec[{'normal': 'stddev', 'lognormal': 'sigma', 'pareto': 'alpha'}.get(distribution, 'max')] = float(parts[2])
+    return spec
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
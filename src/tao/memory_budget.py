@@ -0,0 +1,314 @@
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional, Set, Tuple
+import logging
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+# How often run_isolated checks that the child is still alive while it waits for its result
+_POLL_INTERVAL = 0.5
+
+
+class MemoryBudgetExceeded(MemoryError):
+    def __init__(self, task: str, limit_mb: float, peak_mb: Optional[float], isolated: bool):
+        self.task = task
+        self.limit_mb = limit_mb
+        self.peak_mb = peak_mb
+        self.isolated = isolated
+        how = "in an isolated process" if isolated else "in-process (sampled RSS)"
+        peak = f": peak {peak_mb:.1f} MB" if peak_mb is not None else ""
+        super().__init__(f"Task '{task}' exceeded its memory budget of {limit_mb:.0f} MB {how}{peak}")
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    Resident set size of this process in MB, or None if it cannot be read.
+    """
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * _PAGE_SIZE / MB
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / MB
+    return None
+
+
+def _virtual_memory_mb() -> Optional[float]:
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[0]) * _PAGE_SIZE / MB
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _isolated_main(function: Callable[[], Any], max_memory_mb: Optional[float], connection):
+    baseline = current_rss_mb() or 0.0
+    if max_memory_mb and resource is not None:
+        address_space = _virtual_memory_mb()
+        if address_space is not None:
+            _, hard = resource.getrlimit(resource.RLIMIT_AS)
+            limit = int((address_space + max_memory_mb) * MB)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    try:
+        message = ('ok', function())
+    except MemoryError:
+        message = ('memory', None)
+    except BaseException as e:
+        message = ('error', e)
+    peak = _peak_rss_mb()
+    peak = max(0.0, peak - baseline) if peak is not None else None
+    try:
+        connection.send(message + (peak,))
+    except Exception as e:
+        # The result or exception could not be pickled
+        connection.send(('error', RuntimeError(f"Could not return result from isolated process: {str(e)}"), peak))
+    connection.close()
+
+
+def run_isolated(function: Callable[[], Any], max_memory_mb: Optional[float] = None,
+                 timeout: Optional[float] = None) -> Tuple[str, Any, Optional[float]]:
+    """
+    Run `function` in a forked child process with its address space capped
+    at its current size plus max_memory_mb. The function is usually a
+    closure over the plugin call and cannot be pickled, hence fork. A child
+    forked while another thread held a lock can hang, so it is killed when
+    it has not reported back after timeout seconds.
+
+    Returns:
+        Tuple[str, Any, Optional[float]]: ('ok', result, peak_mb), ('error', exception, peak_mb),
+        or ('memory', None, peak_mb) when the child ran out of its budget.
+    """
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_isolated_main, args=(function, max_memory_mb, sender), daemon=True)
+    process.start()
+    sender.close()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    try:
+        while not receiver.poll(_POLL_INTERVAL):
+            # Children forked in parallel inherit the pipe, so EOF may not arrive when this one exits
+            if not process.is_alive():
+                if receiver.poll(0):
+                    break
+                return _exit_status(process)
+            if deadline is not None and time.monotonic() >= deadline:
+                process.kill()
+                process.join()
+                return 'error', TimeoutError(f"Isolated process did not finish within {timeout:g}s"), None
+        status, payload, peak = receiver.recv()
+    except EOFError:
+        return _exit_status(process)
+    finally:
+        receiver.close()
+    process.join()
+    return status, payload, peak
+
+
+def _exit_status(process) -> Tuple[str, Any, Optional[float]]:
+    process.join()
+    # Killed without reporting back, most likely by the kernel's OOM killer
+    if process.exitcode is not None and process.exitcode < 0:
+        return 'memory', None, None
+    return 'error', RuntimeError(f"Isolated process exited with code {process.exitcode}"), None
+
+
+class _MemoryTracker:
+    def __init__(self, monitor: 'MemoryMonitor', task: str, limit_mb: Optional[float], isolated: bool = False,
+                 timeout: Optional[float] = None):
+        self.monitor = monitor
+        self.task = task
+        self.limit_mb = limit_mb
+        self.isolated = isolated
+        self.timeout = timeout
+        self.baseline_mb = current_rss_mb()
+        self.peak_mb = 0.0
+        self.exceeded = False
+        # Another in-process task ran at the same time, so RSS growth cannot be attributed to this one
+        self.shared = False
+        self.unattributed = False
+
+    def sample(self, rss_mb: float):
+        """
+        Update the peak from a process RSS reading. Called with the monitor's lock held.
+        """
+        if self.baseline_mb is None:
+            return
+        self.peak_mb = max(self.peak_mb, rss_mb - self.baseline_mb)
+        if self.limit_mb is None or self.peak_mb <= self.limit_mb or self.exceeded or self.unattributed:
+            return
+        if self.shared:
+            self.unattributed = True
+            self.monitor.logger.warning(f"Process memory grew by {self.peak_mb:.1f} MB while task '{self.task}' ran "
+                                        f"next to other tasks, over its budget of {self.limit_mb:.0f} MB; not "
+                                        f"counted as an overrun of the task")
+            return
+        self.exceeded = True
+        self.monitor.overruns[self.task] = self.monitor.overruns.get(self.task, 0) + 1
+        self.monitor.logger.warning(f"Task '{self.task}' is using {self.peak_mb:.1f} MB, over its "
+                                    f"budget of {self.limit_mb:.0f} MB")
+
+    def run(self, function: Callable[[], Any]) -> Any:
+        """
+        Run one of the task's plugin calls under the budget: in an isolated
+        process if the task is isolated or has overrun its budget before,
+        otherwise in-process, raising MemoryBudgetExceeded before the result
+        is returned if the task went over its budget while it ran.
+        """
+        if not self.isolated and self.monitor.should_isolate(self.task):
+            self.monitor.logger.info(f"Running task {self.task} in an isolated process after a memory overrun")
+            self.isolated = True
+        if self.isolated:
+            return self.run_isolated(function)
+        result = function()
+        rss_mb = current_rss_mb()
+        with self.monitor._lock:
+            if rss_mb is not None:
+                self.sample(rss_mb)
+            exceeded, self.exceeded = self.exceeded, False
+        if exceeded:
+            raise MemoryBudgetExceeded(self.task, self.limit_mb, self.peak_mb, isolated=False)
+        return result
+
+    def run_isolated(self, function: Callable[[], Any]) -> Any:
+        """
+        Run the task's plugin call in a child process under the budget.
+        """
+        status, payload, peak = run_isolated(function, self.limit_mb, self.timeout)
+        if peak is not None:
+            self.peak_mb = max(self.peak_mb, peak)
+        if status == 'memory':
+            # The allocation that would have crossed the limit failed, so the task peaked at the limit
+            self.peak_mb = max(self.peak_mb, self.limit_mb or 0.0)
+            with self.monitor._lock:
+                self.monitor.overruns[self.task] = self.monitor.overruns.get(self.task, 0) + 1
+            raise MemoryBudgetExceeded(self.task, self.limit_mb, None, isolated=True)
+        if status == 'error':
+            raise payload
+        return payload
+
+
+class MemoryMonitor:
+    """
+    Tracks memory used by the tasks of one run.
+
+    Tasks running in-process are measured by sampling the process RSS from
+    a background thread; the growth over the RSS at task start counts
+    against the task. A running thread cannot be stopped, so in-process
+    budgets are advisory: a task found over its budget fails when its
+    plugin call returns, before the result is used, and the memory is only
+    released once the call ends. Growth while other tasks run in-process at
+    the same time cannot be attributed and is not counted. A task that has
+    gone over its budget `isolate_after` times, in this run or earlier
+    ones, runs its next calls, including retries, in an isolated process
+    where the budget is a hard address-space limit.
+    """
+
+    def __init__(self, logger: logging.Logger, sample_interval: float = 0.1, isolate_after: int = 1,
+                 previous_overruns: Optional[Dict[str, int]] = None, isolated_timeout: Optional[float] = 3600.0):
+        self.logger = logger
+        self.sample_interval = sample_interval
+        self.isolate_after = isolate_after
+        self.isolated_timeout = isolated_timeout
+        self.previous_overruns = dict(previous_overruns or {})
+        self.overruns: Dict[str, int] = {}
+        self.peaks: Dict[str, float] = {}
+        self._active: Set[_MemoryTracker] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._sampler: Optional[threading.Thread] = None
+        self._stopped = False
+        if current_rss_mb() is None:
+            self.logger.warning("Process memory cannot be read on this platform; memory budgets are only "
+                                "enforced for isolated tasks")
+
+    def should_isolate(self, task: str) -> bool:
+        with self._lock:
+            overruns = self.previous_overruns.get(task, 0) + self.overruns.get(task, 0)
+        return self.isolate_after > 0 and overruns >= self.isolate_after
+
+    @contextmanager
+    def track(self, task: str, limit_mb: Optional[float] = None, isolated: bool = False,
+              timeout: Optional[float] = None):
+        """
+        Measure a task's memory while the block runs. Plugin calls run
+        through tracker.run raise MemoryBudgetExceeded when the task went
+        over limit_mb. Isolated calls are stopped after timeout seconds,
+        isolated_timeout by default.
+        """
+        tracker = _MemoryTracker(self, task, limit_mb, isolated, timeout or self.isolated_timeout)
+        if not isolated:
+            self._add(tracker)
+        try:
+            yield tracker
+        finally:
+            if not isolated:
+                self._remove(tracker)
+            self._record(tracker)
+
+    def _record(self, tracker: _MemoryTracker):
+        with self._lock:
+            self.peaks[tracker.task] = max(self.peaks.get(tracker.task, 0.0), tracker.peak_mb)
+
+    def _add(self, tracker: _MemoryTracker):
+        with self._lock:
+            if self._active:
+                tracker.shared = True
+                for other in self._active:
+                    other.shared = True
+            self._active.add(tracker)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name='tao-memory', daemon=True)
+                self._sampler.start()
+            self._wake.notify()
+
+    def _remove(self, tracker: _MemoryTracker):
+        with self._lock:
+            self._active.discard(tracker)
+
+    def _sample_loop(self):
+        with self._lock:
+            while not self._stopped:
+                if not self._active:
+                    self._wake.wait()
+                    continue
+                rss_mb = current_rss_mb()
+                if rss_mb is not None:
+                    for tracker in self._active:
+                        tracker.sample(rss_mb)
+                self._wake.wait(self.sample_interval)
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._wake.notify_all()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def get_peaks(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.peaks)
+
@@ -0,0 +1,325 @@
+import bisect
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ('_lock', 'value')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ('_lock', 'value')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ('_lock', '_upper_bounds', 'bucket_counts', 'count', 'sum')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._upper_bounds = upper_bounds
+        self.bucket_counts = [0] * (len(upper_bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *labelvalues: str):
+        child = self._children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"Metric '{self.name}' expects labels {self.labelnames}, got {labelvalues}")
+            with self._lock:
+                child = self._children.setdefault(labelvalues, self._new_child())
+        return child
+
+    def _snapshot(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return [(tuple(str(v) for v in labelvalues), child) for labelvalues, child in self._children.items()]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for labelvalues, child in self._snapshot():
+            lines.extend(self._render_child(labelvalues, child))
+        return lines
+
+    def _render_child(self, labelvalues: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(child.value)}"]
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _render_child(self, labelvalues: Tuple[str, ...], child) -> List[str]:
+        with child._lock:
+            bucket_counts = list(child.bucket_counts)
+            count, total = child.count, child.sum
+        lines = []
+        cumulative = 0
+        for upper_bound, bucket_count in zip(self.upper_bounds + (float('inf'),), bucket_counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(upper_bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+        label_str = _format_labels(self.labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+        lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric '{metric.name}' already registered with a different definition")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get_metric(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        Render all registered metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text, terminated by a newline.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class WorkflowMetrics:
+    """
+    The standard set of engine metrics, registered once so the hot path only
+    touches pre-resolved metric children.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        self.task_duration = self.registry.histogram(
+            'tao_task_duration_seconds', 'Plugin call latency per plugin and function.', ('plugin', 'function'))
+        self.task_retries = self.registry.counter(
+            'tao_task_retries_total', 'Retries requested by the error handler.', ('task',))
+        self.task_failures = self.registry.counter(
+            'tao_task_failures_total', 'Task failures reported to the error handler.', ('task',))
+        self.tasks_completed = self.registry.counter(
+            'tao_tasks_completed_total', 'Tasks that completed successfully.')
+        self.ready_queue_depth = self.registry.gauge(
+            'tao_ready_queue_depth', 'Tasks waiting to be dispatched.')
+        self.tasks_in_flight = self.registry.gauge(
+            'tao_tasks_in_flight', 'Tasks currently executing.')
+        self.queue_wait = self.registry.histogram(
+            'tao_plugin_queue_wait_seconds', 'Time calls waited for plugin concurrency and rate limits.',
+            ('plugin', 'function'))
+        self.cache_requests = self.registry.counter(
+            'tao_cache_requests_total', 'Cache lookups by cache name and result.', ('cache', 'result'))
+        self.circuit_open = self.registry.gauge(
+            'tao_circuit_open', 'Whether the circuit breaker of a plugin function is open (1) or not (0).',
+            ('plugin', 'function'))
+        self.circuit_rejections = self.registry.counter(
+            'tao_circuit_rejections_total', 'Calls failed fast by an open circuit breaker.', ('plugin', 'function'))
+        self.errors = self.registry.counter(
+            'tao_errors_total', 'Errors reported to the error handler by error fingerprint.', ('fingerprint',))
+
+    def observe_task(self, plugin_name: str, function_name: str, seconds: float):
+        self.task_duration.labels(plugin_name, function_name).observe(seconds)
+
+    def observe_queue_wait(self, plugin_name: str, function_name: str, seconds: float):
+        self.queue_wait.labels(plugin_name, function_name).observe(seconds)
+
+    def record_retry(self, task_name: str):
+        self.task_retries.labels(task_name).inc()
+
+    def record_failure(self, task_name: str):
+        self.task_failures.labels(task_name).inc()
+
+    def record_circuit_state(self, plugin_name: str, function_name: str, is_open: bool):
+        self.circuit_open.labels(plugin_name, function_name).set(1 if is_open else 0)
+
+    def record_circuit_rejection(self, plugin_name: str, function_name: str):
+        self.circuit_rejections.labels(plugin_name, function_name).inc()
+
+    def record_error(self, fingerprint: str):
+        self.errors.labels(fingerprint).inc()
+
+    def record_cache(self, cache_name: str, hit: bool):
+        self.cache_requests.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+    def get_cache_hit_rates(self) -> Dict[str, float]:
+        totals: Dict[str, List[float]] = {}
+        for (cache_name, result), child in self.cache_requests._snapshot():
+            hits_and_total = totals.setdefault(cache_name, [0.0, 0.0])
+            if result == 'hit':
+                hits_and_total[0] += child.value
+            hits_and_total[1] += child.value
+        return {name: (hits / total if total else 0.0) for name, (hits, total) in totals.items()}
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9464,
+                 logger: Optional[logging.Logger] = None):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.logger = logger or logging.getLogger(__name__)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        handler = type('MetricsRequestHandler', (_MetricsRequestHandler,), {'registry': self.registry})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='tao-metrics', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self.logger.info("Metrics server stopped")
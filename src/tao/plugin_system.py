@@ -1,14 +1,42 @@
 import importlib
 import os
-from typing import Dict, Any, List
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
 import logging
 from tao.base_plugin import BasePlugin
+from tao.metrics import WorkflowMetrics
+from tao.batching import InvocationBatcher
+from tao.connection_pools import PoolRegistry
+from tao.rate_limiter import PluginLimits
+from tao.circuit_breaker import CircuitBreakers
+from tao.file_watcher import FileWatcher
 
 class PluginSystem:
-    def __init__(self, plugin_directory: str, logger: logging.Logger):
+    def __init__(self, plugin_directory: str, logger: logging.Logger, metrics: Optional[WorkflowMetrics] = None):
         self.plugin_directory = plugin_directory
         self.plugins: Dict[str, BasePlugin] = {}
         self.logger = logger
+        self.metrics = metrics
+        self.remote_executor = None
+        self.call_recorder = None
+        self.call_replayer = None
+        # plugin name -> {'max_size': ..., 'linger_ms': ..., 'functions': [...] or None}
+        self.batching: Dict[str, Dict[str, Any]] = {}
+        self.batcher = InvocationBatcher(self._execute_batch, logger)
+        self.resource_pools = PoolRegistry(logger)
+        self.limits = PluginLimits(logger)
+        # configuration source -> the pools, batching and limits it configured
+        self._configured: Dict[str, Dict[str, Set[Any]]] = {}
+        self._configure_lock = threading.Lock()
+        # configuration source -> (circuit breaker settings, breakers); kept across runs
+        self._circuit_breakers: Dict[str, Tuple[Dict[str, Any], CircuitBreakers]] = {}
+        # id(plugin instance) -> number of calls currently running on it
+        self._in_flight: Dict[int, int] = {}
+        self._calls = threading.Condition()
+        self._watcher: Optional[FileWatcher] = None
+        self._retiring: List[threading.Thread] = []
 
     def load_plugins(self) -> Dict[str, BasePlugin]:
         self.logger.info(f"Loading plugins from directory: {self.plugin_directory}")
@@ -17,34 +45,236 @@ class PluginSystem:
                 plugin_name = filename[:-3]
                 try:
                     module = importlib.import_module(f"plugins.{plugin_name}")
-                    for item_name in dir(module):
-                        item = getattr(module, item_name)
-                        if isinstance(item, type) and issubclass(item, BasePlugin) and item is not BasePlugin:
-                            plugin_instance = item()
-                            self.logger.info(f"Initializing plugin: {plugin_name}")
-                            plugin_instance.initialize()
-                            self.plugins[plugin_name] = plugin_instance
-                            self.logger.info(f"Successfully loaded plugin: {plugin_name}")
+                    plugin_instance = self._create_instance(plugin_name, module)
+                    if plugin_instance is not None:
+                        self.plugins[plugin_name] = plugin_instance
+                        self.logger.info(f"Successfully loaded plugin: {plugin_name}")
                 except Exception as e:
                     self.logger.error(f"Error loading plugin {plugin_name}: {str(e)}")
         return self.plugins
 
+    def _create_instance(self, plugin_name: str, module) -> Optional[BasePlugin]:
+        for item_name in dir(module):
+            item = getattr(module, item_name)
+            if isinstance(item, type) and issubclass(item, BasePlugin) and item is not BasePlugin \
+                    and item.__module__ == module.__name__:
+                plugin_instance = item()
+                plugin_instance.resource_pools = self.resource_pools
+                self.logger.info(f"Initializing plugin: {plugin_name}")
+                plugin_instance.initialize()
+                return plugin_instance
+        return None
+
     def get_plugin(self, plugin_name: str) -> BasePlugin:
         plugin = self.plugins.get(plugin_name)
         if plugin is None:
             raise ValueError(f"Plugin not found: {plugin_name}")
         return plugin
 
-    def execute_task(self, plugin_name: str, task_name: str, parameters: Dict[str, Any], variables: Dict[str, Any]) -> Any:
-        plugin = self.get_plugin(plugin_name)
-        self.logger.info(f"Executing task '{task_name}' with plugin '{plugin_name}'")
+    def set_remote_executor(self, remote_executor):
+        """
+        Send calls to remote workers (e.g. a tao.distributed.Coordinator) when
+        a registered worker has the plugin.
+        """
+        self.remote_executor = remote_executor
+
+    def set_call_recorder(self, call_recorder):
+        """
+        Record every plugin call (e.g. with a tao.call_recorder.CallRecorder). Pass None to stop.
+        """
+        self.call_recorder = call_recorder
+
+    def set_call_replayer(self, call_replayer):
+        """
+        Serve plugin calls from a recording (a tao.call_recorder.CallReplayer) instead of
+        invoking plugins. Pass None to go back to live calls.
+        """
+        self.call_replayer = call_replayer
+
+    def lease(self, pool_name: str, timeout: Optional[float] = None):
+        """
+        Lease a resource from a shared pool, as a context manager.
+        """
+        return self.resource_pools.lease(pool_name, timeout)
+
+    def configure_batching(self, plugin_name: str, max_size: int = 32, linger_ms: float = 5.0,
+                           functions: Optional[List[str]] = None):
+        """
+        Coalesce concurrent calls to a plugin into execute_batch calls of at
+        most max_size items, waiting up to linger_ms for a batch to fill.
+        Limit batching to some functions by listing them.
+        """
+        self.batching[plugin_name] = {'max_size': max_size, 'linger_ms': linger_ms, 'functions': functions}
+
+    def configure_limits(self, plugin_name: str, max_concurrency: Optional[int] = None,
+                         rate_limit: Optional[float] = None, burst: Optional[int] = None,
+                         functions: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Limit concurrent calls to a plugin and the rate at which they start
+        (calls per second, with bursts of up to `burst`). `functions` maps
+        function names to their own max_concurrency/rate_limit/burst, which
+        apply in addition to the plugin limits.
+        """
+        self.limits.configure(plugin_name, max_concurrency, rate_limit, burst, functions)
+
+    def apply_configuration(self, source: str, plugin_configs: List[Any], pools_config: Dict[str, Dict[str, Any]]):
+        """
+        Apply the resource pools, batching and limits of a configuration.
+        Whatever an earlier version of the same `source` configured but this
+        one no longer declares is removed, so an edited configuration takes
+        full effect in a long-lived process.
+        """
+        declared: Dict[str, Set[Any]] = {'pools': set(pools_config), 'batching': set(), 'limits': set()}
+        with self._configure_lock:
+            self.resource_pools.configure(pools_config)
+            for plugin_config in plugin_configs:
+                if plugin_config.batching:
+                    self.configure_batching(plugin_config.name, **plugin_config.batching)
+                    declared['batching'].add(plugin_config.name)
+                if plugin_config.max_concurrency or plugin_config.rate_limit or plugin_config.function_limits:
+                    self.configure_limits(plugin_config.name, plugin_config.max_concurrency, plugin_config.rate_limit,
+                                          plugin_config.burst, plugin_config.function_limits)
+                    declared['limits'].add((plugin_config.name, None))
+                    declared['limits'].update((plugin_config.name, function_name)
+                                              for function_name in plugin_config.function_limits or {})
+            previous = self._configured.get(source)
+            if previous is not None:
+                for name in previous['pools'] - declared['pools']:
+                    self.resource_pools.remove(name)
+                for name in previous['batching'] - declared['batching']:
+                    self.batching.pop(name, None)
+                for plugin_name, function_name in previous['limits'] - declared['limits']:
+                    self.limits.remove(plugin_name, function_name)
+            self._configured[source] = declared
+
+    def get_circuit_breakers(self, source: str, config: Optional[Dict[str, Any]]) -> Optional[CircuitBreakers]:
+        """
+        Circuit breakers for the runs of a configuration. They outlive a run,
+        so a plugin function whose circuit opened stays open for the next run
+        instead of being called again. Changed settings start new breakers.
+        """
+        with self._configure_lock:
+            if config is None or not config.get('enabled', True):
+                self._circuit_breakers.pop(source, None)
+                return None
+            entry = self._circuit_breakers.get(source)
+            if entry is None or entry[0] != config:
+                entry = (config, CircuitBreakers(config, self.logger, self.metrics))
+                self._circuit_breakers[source] = entry
+            return entry[1]
+
+    def _limited(self, plugin_name: str, task_name: str):
+        limit = self.limits.limit(plugin_name, task_name)
+        if self.metrics is None:
+            return limit
+        return self._observing_wait(limit, plugin_name, task_name)
+
+    @contextmanager
+    def _observing_wait(self, limit, plugin_name: str, task_name: str):
+        with limit as waited:
+            self.metrics.observe_queue_wait(plugin_name, task_name, waited)
+            yield waited
+
+    def _batching_for(self, plugin: BasePlugin, plugin_name: str, task_name: str) -> Optional[Dict[str, Any]]:
+        settings = self.batching.get(plugin_name)
+        if settings is None or settings['max_size'] <= 1 or not plugin.supports_batching():
+            return None
+        if settings['functions'] is not None and task_name not in settings['functions']:
+            return None
+        return settings
+
+    def _execute_batch(self, plugin_name: str, task_name: str, parameters_list: List[Dict[str, Any]],
+                       variables: Dict[str, Any]) -> List[Any]:
+        # A batch is one downstream call, so it takes one slot and one token
+        with self._limited(plugin_name, task_name):
+            plugin = self._checkout(plugin_name)
+            try:
+                return plugin.execute_batch(task_name, parameters_list, variables)
+            finally:
+                self._checkin(plugin)
+
+    def _checkout(self, plugin_name: str) -> BasePlugin:
+        # Look up and count the call under one lock, so a reload cannot retire the instance in between
+        with self._calls:
+            plugin = self.get_plugin(plugin_name)
+            self._in_flight[id(plugin)] = self._in_flight.get(id(plugin), 0) + 1
+            return plugin
+
+    def _checkin(self, plugin: BasePlugin):
+        with self._calls:
+            remaining = self._in_flight[id(plugin)] - 1
+            if remaining:
+                self._in_flight[id(plugin)] = remaining
+            else:
+                del self._in_flight[id(plugin)]
+                self._calls.notify_all()
+
+    def get_in_flight(self, plugin_name: str) -> int:
+        with self._calls:
+            plugin = self.plugins.get(plugin_name)
+            return self._in_flight.get(id(plugin), 0) if plugin is not None else 0
+
+    def _use_remote(self, plugin_name: str) -> bool:
+        return self.remote_executor is not None and self.remote_executor.can_execute(plugin_name)
+
+    def execute_task(self, plugin_name: str, task_name: str, parameters: Dict[str, Any], variables: Dict[str, Any],
+                     runner: Optional[Callable[[Callable[[], Any]], Any]] = None) -> Any:
+        """
+        Execute a plugin function. A runner, e.g. one that forks an isolated
+        process, receives the local plugin call as a callable and returns its
+        result; such calls are not batched or sent to remote workers.
+        """
+        if self.call_replayer is not None:
+            entry = self.call_replayer.lookup(plugin_name, task_name, parameters)
+            if entry is not None:
+                return self._replay(plugin_name, task_name, entry)
+        remote = runner is None and self._use_remote(plugin_name)
+        batching = None if remote or runner is not None else \
+            self._batching_for(self.get_plugin(plugin_name), plugin_name, task_name)
+        self.logger.info(f"Executing task '{task_name}' with plugin '{plugin_name}'{' remotely' if remote else ''}")
+        started_at = time.time()
+        start_time = time.perf_counter()
         try:
-            result = plugin.execute_task(task_name, parameters, variables)
+            if batching is not None:
+                result = self.batcher.submit(plugin_name, task_name, parameters, variables,
+                                             batching['max_size'], batching['linger_ms'])
+            else:
+                with self._limited(plugin_name, task_name):
+                    if remote:
+                        result = self.remote_executor.execute(plugin_name, task_name, parameters, variables)
+                    else:
+                        plugin = self._checkout(plugin_name)
+                        try:
+                            if runner is not None:
+                                result = runner(lambda: plugin.execute_task(task_name, parameters, variables))
+                            else:
+                                result = plugin.execute_task(task_name, parameters, variables)
+                        finally:
+                            self._checkin(plugin)
             self.logger.info(f"Task '{task_name}' executed successfully")
+            if self.call_recorder is not None:
+                self.call_recorder.record(plugin_name, task_name, parameters, started_at,
+                                          time.perf_counter() - start_time, result=result)
             return result
         except Exception as e:
             self.logger.error(f"Error executing task '{task_name}' with plugin '{plugin_name}': {str(e)}")
+            if self.call_recorder is not None:
+                self.call_recorder.record(plugin_name, task_name, parameters, started_at,
+                                          time.perf_counter() - start_time, error=e)
             raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_task(plugin_name, task_name, time.perf_counter() - start_time)
+
+    def _replay(self, plugin_name: str, task_name: str, entry: Dict[str, Any]) -> Any:
+        # Recorded durations already include batching and rate-limit waits, so neither applies here
+        self.logger.info(f"Replaying task '{task_name}' with plugin '{plugin_name}'")
+        start_time = time.perf_counter()
+        try:
+            return self.call_replayer.replay(entry)
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_task(plugin_name, task_name, time.perf_counter() - start_time)
 
     def get_available_tasks(self, plugin_name: str) -> List[str]:
         plugin = self.get_plugin(plugin_name)
@@ -55,6 +285,12 @@ class PluginSystem:
         return plugin.validate_config(config)
 
     def cleanup_plugins(self):
+        self.stop_watching()
+        # Joined outside the lock: retiring threads take it to wait for their calls to drain
+        with self._calls:
+            retiring, self._retiring = self._retiring, []
+        for thread in retiring:
+            thread.join()
         for plugin_name, plugin in self.plugins.items():
             self.logger.info(f"Cleaning up plugin: {plugin_name}")
             try:
@@ -62,29 +298,85 @@ class PluginSystem:
                 self.logger.info(f"Successfully cleaned up plugin: {plugin_name}")
             except Exception as e:
                 self.logger.error(f"Error cleaning up plugin {plugin_name}: {str(e)}")
+        self.resource_pools.close_all()
 
-    def reload_plugin(self, plugin_name: str):
-        if plugin_name in self.plugins:
-            self.logger.info(f"Reloading plugin: {plugin_name}")
-            old_plugin = self.plugins[plugin_name]
-            try:
-                old_plugin.cleanup()
-                module = importlib.import_module(f"plugins.{plugin_name}")
-                importlib.reload(module)
-                for item_name in dir(module):
-                    item = getattr(module, item_name)
-                    if isinstance(item, type) and issubclass(item, BasePlugin) and item is not BasePlugin:
-                        new_plugin = item()
-                        new_plugin.initialize()
-                        self.plugins[plugin_name] = new_plugin
-                        self.logger.info(f"Successfully reloaded plugin: {plugin_name}")
-                        return
-            except Exception as e:
-                self.logger.error(f"Error reloading plugin {plugin_name}: {str(e)}")
-                # Restore old plugin instance
-                self.plugins[plugin_name] = old_plugin
-        else:
-            self.logger.error(f"Cannot reload non-existent plugin: {plugin_name}")
+    def reload_plugin(self, plugin_name: str, drain_timeout: float = 300.0, wait: bool = False) -> bool:
+        """
+        Reload a plugin without interrupting calls in progress.
+
+        The new instance is built and initialized next to the old one, and
+        new calls go to it from then on. The old instance is cleaned up once
+        its in-flight calls have finished, or after drain_timeout seconds.
+        A plugin that fails to load or initialize leaves the old instance
+        in place.
+
+        Args:
+            plugin_name (str): The plugin (module name in the plugin directory).
+            drain_timeout (float): Longest time to wait for in-flight calls on the old instance.
+            wait (bool): Block until the old instance has been retired.
+
+        Returns:
+            bool: True if the new instance is now serving calls.
+        """
+        self.logger.info(f"Reloading plugin: {plugin_name}")
+        try:
+            module = importlib.import_module(f"plugins.{plugin_name}")
+            module = importlib.reload(module)
+            new_plugin = self._create_instance(plugin_name, module)
+        except Exception as e:
+            self.logger.error(f"Error reloading plugin {plugin_name}, keeping the running version: {str(e)}")
+            return False
+        if new_plugin is None:
+            self.logger.info(f"No plugin class found in plugins.{plugin_name}, nothing to reload")
+            return False
+
+        with self._calls:
+            old_plugin = self.plugins.get(plugin_name)
+            self.plugins[plugin_name] = new_plugin
+        self.logger.info(f"Successfully reloaded plugin: {plugin_name}")
+
+        if old_plugin is not None:
+            retire = threading.Thread(target=self._retire, args=(plugin_name, old_plugin, drain_timeout),
+                                      name=f"tao-retire-{plugin_name}", daemon=True)
+            retire.start()
+            with self._calls:
+                self._retiring = [thread for thread in self._retiring if thread.is_alive()] + [retire]
+            if wait:
+                retire.join()
+        return True
+
+    def _retire(self, plugin_name: str, plugin: BasePlugin, drain_timeout: float):
+        with self._calls:
+            drained = self._calls.wait_for(lambda: id(plugin) not in self._in_flight, drain_timeout)
+        if not drained:
+            self.logger.warning(f"Retiring old instance of plugin {plugin_name} with calls still in flight")
+        try:
+            plugin.cleanup()
+            self.logger.info(f"Retired old instance of plugin: {plugin_name}")
+        except Exception as e:
+            self.logger.error(f"Error cleaning up old instance of plugin {plugin_name}: {str(e)}")
+
+    def watch_plugins(self, debounce: float = 0.5, poll_interval: float = 1.0):
+        """
+        Reload plugins automatically when their files in the plugin directory change.
+        """
+        if self._watcher is not None:
+            return
+        self._watcher = FileWatcher(self.plugin_directory, self._on_plugin_files_changed, self.logger,
+                                    patterns=('*.py',), debounce=debounce, poll_interval=poll_interval)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def _on_plugin_files_changed(self, paths):
+        for path in sorted(paths):
+            plugin_name = os.path.splitext(os.path.basename(path))[0]
+            if plugin_name.startswith('__') or not os.path.exists(path):
+                continue
+            self.reload_plugin(plugin_name)
 
     def __del__(self):
         self.cleanup_plugins()
\ No newline at end of file
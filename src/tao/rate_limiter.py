@@ -0,0 +1,144 @@
+import threading
+import time
+from contextlib import contextmanager, ExitStack
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` calls per second with bursts of up to
+    `burst` calls.
+
+    Callers reserve a token and sleep until it is due rather than polling,
+    so waiting callers are served in the order they arrived.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError(f"Rate limit must be positive, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        if self.capacity < 1:
+            raise ValueError(f"Burst must be at least 1, got {burst}")
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens, going into debt if necessary.
+
+        Returns:
+            float: Seconds the caller must wait before the tokens are due.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class CallLimiter:
+    """
+    Limits how many calls run at once and how often they start.
+    """
+
+    def __init__(self, name: str, max_concurrency: Optional[int] = None, rate_limit: Optional[float] = None,
+                 burst: Optional[int] = None):
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(f"max_concurrency for '{name}' must be at least 1, got {max_concurrency}")
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit else None
+
+    def acquire(self):
+        if self.semaphore is not None:
+            self.semaphore.acquire()
+        if self.bucket is not None:
+            try:
+                self.bucket.acquire()
+            except BaseException:
+                self.release()
+                raise
+
+    def release(self):
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+
+class PluginLimits:
+    """
+    Concurrency and rate limits per plugin and per plugin function.
+
+    A call waits for its function limit first and then for its plugin limit.
+    Always acquiring in that order means two calls can never hold each
+    other's slots.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.limiters: Dict[Tuple[str, Optional[str]], CallLimiter] = {}
+        self._settings: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, plugin_name: str, max_concurrency: Optional[int] = None, rate_limit: Optional[float] = None,
+                  burst: Optional[int] = None, functions: Optional[Dict[str, Dict[str, Any]]] = None):
+        self._set((plugin_name, None), max_concurrency, rate_limit, burst)
+        for function_name, limits in (functions or {}).items():
+            self._set((plugin_name, function_name), limits.get('max_concurrency'), limits.get('rate_limit'),
+                      limits.get('burst'))
+
+    def _set(self, key: Tuple[str, Optional[str]], max_concurrency: Optional[int], rate_limit: Optional[float],
+             burst: Optional[int]):
+        settings = {'max_concurrency': max_concurrency, 'rate_limit': rate_limit, 'burst': burst}
+        with self._lock:
+            # Keep the existing limiter, and the calls it is tracking, while the settings are unchanged
+            if self._settings.get(key) == settings:
+                return
+            if max_concurrency is None and rate_limit is None:
+                self.limiters.pop(key, None)
+                self._settings.pop(key, None)
+                return
+            name = key[0] if key[1] is None else f"{key[0]}.{key[1]}"
+            self.limiters[key] = CallLimiter(name, max_concurrency, rate_limit, burst)
+            self._settings[key] = settings
+        self.logger.info(f"Limiting '{name}' to {max_concurrency or 'unlimited'} concurrent calls"
+                         f"{f' and {rate_limit}/s (burst {burst})' if rate_limit else ''}")
+
+    def remove(self, plugin_name: str, function_name: Optional[str] = None):
+        with self._lock:
+            self.limiters.pop((plugin_name, function_name), None)
+            self._settings.pop((plugin_name, function_name), None)
+
+    def _limiters_for(self, plugin_name: str, function_name: str) -> List[CallLimiter]:
+        limiters = []
+        for key in ((plugin_name, function_name), (plugin_name, None)):
+            limiter = self.limiters.get(key)
+            if limiter is not None:
+                limiters.append(limiter)
+        return limiters
+
+    @contextmanager
+    def limit(self, plugin_name: str, function_name: str):
+        """
+        Hold the plugin and function limits for the duration of a call.
+        Yields the seconds spent waiting for them.
+        """
+        limiters = self._limiters_for(plugin_name, function_name)
+        if not limiters:
+            yield 0.0
+            return
+        start_time = time.perf_counter()
+        with ExitStack() as stack:
+            for limiter in limiters:
+                limiter.acquire()
+                stack.callback(limiter.release)
+            yield time.perf_counter() - start_time
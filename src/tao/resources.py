@@ -0,0 +1,93 @@
+import os
+import threading
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+DEFAULT_TASK_RESOURCES = {'cpu': 1}
+
+_shared_pools: Dict[Tuple[Tuple[str, float], ...], 'ResourcePool'] = {}
+_shared_pools_lock = threading.Lock()
+
+
+class ResourcePool:
+    """
+    Host-level capacities (cpu, memory_mb, gpu_slots or any custom token)
+    that running tasks consume. Resources without a declared capacity are
+    unbounded, except `cpu` which defaults to the number of cores.
+    """
+
+    def __init__(self, capacities: Optional[Dict[str, float]] = None, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.capacities: Dict[str, float] = {'cpu': os.cpu_count() or 1}
+        self.capacities.update(capacities or {})
+        self.available: Dict[str, float] = dict(self.capacities)
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    @classmethod
+    def from_config(cls, engine_config: Dict[str, Any], logger: Optional[logging.Logger] = None) -> 'ResourcePool':
+        return cls(engine_config.get('resources'), logger)
+
+    def clamp(self, request: Dict[str, float]) -> Dict[str, float]:
+        """
+        Limit a request to the pool capacity so a task asking for more than
+        the host has can still run, alone, instead of waiting forever.
+        """
+        clamped = {}
+        for name, amount in request.items():
+            capacity = self.capacities.get(name)
+            if capacity is None or not amount:
+                continue
+            if amount > capacity:
+                self.logger.warning(f"Resource request {name}={amount} exceeds capacity {capacity}, clamping")
+                amount = capacity
+            clamped[name] = amount
+        return clamped
+
+    def try_acquire(self, request: Dict[str, float]) -> bool:
+        """
+        Reserve a clamped request if all of it is currently available.
+        """
+        with self._lock:
+            if any(self.available[name] < amount for name, amount in request.items()):
+                return False
+            for name, amount in request.items():
+                self.available[name] -= amount
+            return True
+
+    def release(self, request: Dict[str, float]):
+        with self._lock:
+            for name, amount in request.items():
+                self.available[name] = min(self.capacities[name], self.available[name] + amount)
+            self._released.notify_all()
+
+    def wait_for_release(self, timeout: Optional[float] = None):
+        """
+        Block until some capacity is returned to the pool, e.g. by another
+        run sharing it, or until the timeout passes.
+        """
+        with self._lock:
+            self._released.wait(timeout)
+
+    def get_usage(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: self.capacities[name] - self.available[name] for name in self.capacities}
+
+
+def shared_resource_pool(engine_config: Dict[str, Any],
+                         logger: Optional[logging.Logger] = None) -> Optional[ResourcePool]:
+    """
+    The process-wide pool for the capacities in `engine_config`, so runs
+    executing side by side (in `tao serve` or a sweep) share the host's
+    capacity instead of each getting all of it. Returns None when the
+    configuration declares no resources.
+    """
+    if 'resources' not in engine_config:
+        return None
+    capacities = engine_config.get('resources') or {}
+    key = tuple(sorted(capacities.items()))
+    with _shared_pools_lock:
+        pool = _shared_pools.get(key)
+        if pool is None:
+            pool = _shared_pools[key] = ResourcePool.from_config(engine_config, logger)
+        return pool
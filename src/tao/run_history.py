@@ -0,0 +1,225 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+import logging
+from tao.task_statistics import TaskStatistics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    workflow TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT NOT NULL,
+    total_tasks INTEGER,
+    completed_tasks INTEGER,
+    failed_tasks INTEGER,
+    skipped_tasks INTEGER
+);
+CREATE TABLE IF NOT EXISTS task_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    workflow TEXT NOT NULL,
+    task TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL,
+    status TEXT NOT NULL,
+    result_size INTEGER,
+    error TEXT,
+    retries INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_runs_workflow_started ON runs (workflow, started_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_task_started ON task_attempts (workflow, task, started_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_run ON task_attempts (run_id);
+CREATE INDEX IF NOT EXISTS idx_attempts_status ON task_attempts (status);
+"""
+
+_STOP = object()
+
+
+def _result_size(result: Any) -> Optional[int]:
+    if result is None:
+        return None
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return None
+
+
+class RunHistoryStore:
+    """
+    Local SQLite record of workflow runs and task attempts.
+
+    Writes are queued and applied by a background thread in batched
+    transactions, so recording never blocks task dispatch. Queries open
+    their own connection and can run while a workflow is writing.
+    """
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None,
+                 batch_size: int = 200, flush_interval: float = 1.0):
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='tao-history-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def start_run(self, workflow: str) -> str:
+        run_id = uuid.uuid4().hex
+        self._queue.put(("INSERT INTO runs (run_id, workflow, started_at, status) VALUES (?, ?, ?, ?)",
+                         (run_id, workflow, time.time(), 'running')))
+        return run_id
+
+    def record_attempt(self, run_id: str, workflow: str, task: str, started_at: float,
+                       duration: Optional[float], status: str, result: Any = None,
+                       error: Optional[str] = None, retries: int = 0, attempt: int = 1):
+        # The result size is computed on the writer thread, off the dispatch path
+        self._queue.put((
+            "INSERT INTO task_attempts (run_id, workflow, task, attempt, started_at, duration, status, "
+            "result_size, error, retries) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            lambda: (run_id, workflow, task, attempt, started_at, duration, status,
+                     _result_size(result), error, retries)))
+
+    def finish_run(self, run_id: str, status: str, total_tasks: int, completed_tasks: int,
+                   failed_tasks: int, skipped_tasks: int):
+        self._queue.put((
+            "UPDATE runs SET finished_at = ?, status = ?, total_tasks = ?, completed_tasks = ?, "
+            "failed_tasks = ?, skipped_tasks = ? WHERE run_id = ?",
+            (time.time(), status, total_tasks, completed_tasks, failed_tasks, skipped_tasks, run_id)))
+
+    def flush(self, timeout: Optional[float] = None):
+        """
+        Block until everything queued so far has been written.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    def _write_loop(self):
+        connection = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch, waiters = [], []
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+                    if stopping or len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self._write_batch(connection, batch)
+                for waiter in waiters:
+                    waiter.set()
+        finally:
+            connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, batch: List):
+        if not batch:
+            return
+        try:
+            with connection:
+                for statement, parameters in batch:
+                    connection.execute(statement, parameters() if callable(parameters) else parameters)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error writing {len(batch)} history records to {self.path}: {str(e)}")
+
+    def _query(self, sql: str, parameters: tuple = ()) -> List[Dict[str, Any]]:
+        with self._connect() as connection:
+            return [dict(row) for row in connection.execute(sql, parameters)]
+
+    @staticmethod
+    def _filters(workflow: Optional[str], since: Optional[float]):
+        clauses, parameters = [], []
+        if workflow:
+            clauses.append("workflow = ?")
+            parameters.append(workflow)
+        if since is not None:
+            clauses.append("started_at >= ?")
+            parameters.append(since)
+        return (" AND ".join(clauses) or "1 = 1"), tuple(parameters)
+
+    def recent_runs(self, workflow: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        where, parameters = self._filters(workflow, None)
+        return self._query(
+            f"SELECT run_id, workflow, started_at, finished_at - started_at AS duration, status, total_tasks, "
+            f"completed_tasks, failed_tasks, skipped_tasks FROM runs WHERE {where} "
+            f"ORDER BY started_at DESC LIMIT ?", parameters + (limit,))
+
+    def slow_tasks(self, workflow: Optional[str] = None, since: Optional[float] = None,
+                   limit: int = 10) -> List[Dict[str, Any]]:
+        where, parameters = self._filters(workflow, since)
+        return self._query(
+            f"SELECT workflow, task, COUNT(*) AS runs, AVG(duration) AS avg_duration, "
+            f"MAX(duration) AS max_duration FROM task_attempts "
+            f"WHERE {where} AND status = 'completed' AND duration IS NOT NULL "
+            f"GROUP BY workflow, task ORDER BY avg_duration DESC LIMIT ?", parameters + (limit,))
+
+    def failure_rates(self, workflow: Optional[str] = None, since: Optional[float] = None,
+                      limit: int = 10) -> List[Dict[str, Any]]:
+        where, parameters = self._filters(workflow, since)
+        return self._query(
+            f"SELECT workflow, task, COUNT(*) AS attempts, "
+            f"SUM(status = 'failed') AS failures, AVG(status = 'failed') AS failure_rate, "
+            f"SUM(retries) AS retries FROM task_attempts WHERE {where} "
+            f"GROUP BY workflow, task HAVING failures > 0 ORDER BY failure_rate DESC, failures DESC LIMIT ?",
+            parameters + (limit,))
+
+    def duration_trend(self, workflow: str, task: str, since: Optional[float] = None,
+                       bucket_seconds: int = 86400) -> List[Dict[str, Any]]:
+        where, parameters = self._filters(workflow, since)
+        return self._query(
+            f"SELECT CAST(started_at / ? AS INTEGER) * ? AS bucket, COUNT(*) AS runs, "
+            f"AVG(duration) AS avg_duration, MAX(duration) AS max_duration FROM task_attempts "
+            f"WHERE {where} AND task = ? AND status = 'completed' AND duration IS NOT NULL "
+            f"GROUP BY bucket ORDER BY bucket", (bucket_seconds, bucket_seconds) + parameters + (task,))
+
+    def load_task_statistics(self, task_statistics: TaskStatistics, workflow: Optional[str] = None,
+                             samples_per_task: Optional[int] = None):
+        """
+        Replay recorded durations, oldest first, into a TaskStatistics instance
+        so scheduling priorities and ETAs start from past runs.
+        """
+        samples_per_task = samples_per_task or task_statistics.max_samples
+        where, parameters = self._filters(workflow, None)
+        rows = self._query(
+            f"SELECT workflow, task, duration FROM ("
+            f"SELECT workflow, task, duration, started_at, ROW_NUMBER() OVER "
+            f"(PARTITION BY workflow, task ORDER BY started_at DESC) AS position FROM task_attempts "
+            f"WHERE {where} AND status = 'completed' AND duration IS NOT NULL) "
+            f"WHERE position <= ? ORDER BY started_at", parameters + (samples_per_task,))
+        for row in rows:
+            task_statistics.record(row['workflow'], row['task'], row['duration'])
+        return len(rows)
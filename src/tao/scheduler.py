@@ -0,0 +1,355 @@
+import heapq
+import threading
+from typing import Dict, Any, List, Optional, Set
+import logging
+from tao.configuration_manager import TaskConfig
+from tao.conditional_logic import ConditionalLogic, CompiledCondition
+from tao.resources import ResourcePool, DEFAULT_TASK_RESOURCES
+
+PENDING, READY, RUNNING, COMPLETED, FAILED, SKIPPED = 'pending', 'ready', 'running', 'completed', 'failed', 'skipped'
+FINISHED_STATES = (COMPLETED, FAILED, SKIPPED)
+
+
+class TaskNode:
+    __slots__ = ('name', 'config', 'index', 'hard_dependencies', 'soft_dependencies', 'dependents',
+                 'unresolved', 'state', 'gate', 'branch_conditions', 'result_branches', 'skip_reason',
+                 'estimated_duration', 'priority', 'resources', 'bypassed')
+
+    def __init__(self, config: TaskConfig, index: int):
+        self.name = config.name
+        self.config = config
+        self.index = index
+        # Hard dependencies come from `dependencies:` and propagate skips;
+        # soft dependencies only order tasks (implicit list order, `after:`, branch owners).
+        self.hard_dependencies: Set[str] = set(config.dependencies or [])
+        self.soft_dependencies: Set[str] = set(config.after or []) - self.hard_dependencies
+        self.dependents: List[str] = []
+        self.unresolved = 0
+        self.state = PENDING
+        self.gate: Optional[CompiledCondition] = None
+        self.branch_conditions: List[CompiledCondition] = []
+        self.result_branches: Optional[Dict[str, str]] = None
+        self.skip_reason: Optional[str] = None
+        self.estimated_duration = 0.0
+        # Longest remaining path through the DAG starting at this task
+        self.priority = 0.0
+        self.resources: Dict[str, float] = dict(config.resources or DEFAULT_TASK_RESOURCES)
+        # Times a lower-priority task was dispatched ahead of this one for lack of resources
+        self.bypassed = 0
+
+    @property
+    def dependencies(self) -> Set[str]:
+        return self.hard_dependencies | self.soft_dependencies
+
+    @property
+    def branch_targets(self) -> Set[str]:
+        targets = set()
+        for condition in self.branch_conditions + ([self.gate] if self.gate else []):
+            targets.update(name for name in (condition.true_branch, condition.false_branch) if name)
+        if self.result_branches:
+            targets.update(name for name in self.result_branches.values() if name)
+        return targets
+
+
+class TaskScheduler:
+    """
+    Dependency-aware execution plan for a workflow.
+
+    Tasks without a `dependencies` key run after the task listed before
+    them, which keeps the behaviour of sequential configurations. Tasks
+    named in `after` are waited for without propagating their skips. Branch
+    targets named by a task's conditions wait for that task, and once a
+    branch is decided the branch that was not taken is pruned from the plan
+    together with everything that hard-depends on it.
+
+    Ready tasks are dispatched in order of their longest remaining path
+    (critical path first) once durations are set, and in list order before.
+    With a resource pool, a ready task that does not fit is passed over for
+    smaller ones at most `max_bypass` times; after that the capacity is
+    held back for it until enough running tasks finish.
+    """
+
+    def __init__(self, tasks: List[TaskConfig], conditional_logic: ConditionalLogic, logger: logging.Logger,
+                 resource_pool: Optional[ResourcePool] = None, max_bypass: int = 3):
+        self.conditional_logic = conditional_logic
+        self.logger = logger
+        self.resource_pool = resource_pool
+        self.max_bypass = max_bypass
+        self.nodes: Dict[str, TaskNode] = {}
+        self._ready: List = []
+        self._lock = threading.RLock()
+        self._build(tasks, resource_pool)
+
+    def _build(self, tasks: List[TaskConfig], resource_pool: Optional[ResourcePool]):
+        for index, task_config in enumerate(tasks):
+            if task_config.name in self.nodes:
+                raise ValueError(f"Duplicate task name: {task_config.name}")
+            node = TaskNode(task_config, index)
+            self._compile_conditions(node)
+            if resource_pool is not None:
+                node.resources = resource_pool.clamp(node.resources)
+            self.nodes[node.name] = node
+
+        previous: Optional[TaskNode] = None
+        for node in self.nodes.values():
+            unknown = node.dependencies - self.nodes.keys()
+            if unknown:
+                raise ValueError(f"Task '{node.name}' depends on unknown tasks: {sorted(unknown)}")
+            if node.config.dependencies is None and previous is not None:
+                node.soft_dependencies.add(previous.name)
+            previous = node
+
+        for node in self.nodes.values():
+            for target in node.branch_targets:
+                target_node = self.nodes.get(target)
+                if target_node is not None and target_node.index > node.index:
+                    target_node.soft_dependencies.add(node.name)
+
+        for node in self.nodes.values():
+            node.unresolved = len(node.dependencies)
+            for dependency in node.dependencies:
+                self.nodes[dependency].dependents.append(node.name)
+        self._check_cycles()
+
+        for node in self.nodes.values():
+            if node.unresolved == 0:
+                self._make_ready(node)
+
+    def _compile_conditions(self, node: TaskNode):
+        config = node.config
+        if config.conditional_logic:
+            node.gate = self.conditional_logic.compile(config.conditional_logic)
+        for condition in config.conditions or []:
+            node.branch_conditions.append(self.conditional_logic.compile(condition))
+        on_success = config.on_success or {}
+        if 'true_branch' in on_success or 'false_branch' in on_success:
+            node.result_branches = {'true': on_success.get('true_branch'), 'false': on_success.get('false_branch')}
+
+    def _check_cycles(self):
+        ordered = {node.name for node in self._topological_order()}
+        if len(ordered) != len(self.nodes):
+            cyclic = sorted(self.nodes.keys() - ordered)
+            raise ValueError(f"Task dependencies contain a cycle involving: {cyclic}")
+
+    def _make_ready(self, node: TaskNode):
+        node.state = READY
+        heapq.heappush(self._ready, (-node.priority, node.index, node.name))
+
+    def _topological_order(self) -> List[TaskNode]:
+        remaining = {name: len(node.dependencies) for name, node in self.nodes.items()}
+        queue = [name for name, count in remaining.items() if count == 0]
+        order = []
+        while queue:
+            name = queue.pop()
+            order.append(self.nodes[name])
+            for dependent in self.nodes[name].dependents:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    queue.append(dependent)
+        return order
+
+    def set_durations(self, durations: Dict[str, float]):
+        """
+        Set the estimated duration of each task and recompute priorities as
+        the longest remaining path through the dependency graph.
+
+        Args:
+            durations (Dict[str, float]): Estimated seconds per task name.
+        """
+        with self._lock:
+            for node in reversed(self._topological_order()):
+                node.estimated_duration = durations.get(node.name, 0.0)
+                node.priority = node.estimated_duration + max(
+                    (self.nodes[dependent].priority for dependent in node.dependents), default=0.0)
+            self._ready = [(-self.nodes[name].priority, index, name) for _, index, name in self._ready]
+            heapq.heapify(self._ready)
+
+    def estimate_remaining(self, workers: int = 1, durations: Optional[Dict[str, float]] = None) -> float:
+        """
+        Estimate the remaining wall-clock time: the longer of the critical
+        path through unfinished tasks and their total work spread over the
+        available workers. `durations` overrides the estimated durations,
+        e.g. with p95s for a pessimistic bound.
+        """
+        with self._lock:
+            unfinished = [node for node in self.nodes.values() if node.state not in FINISHED_STATES]
+            if not unfinished:
+                return 0.0
+            if durations is None:
+                critical_path = max(node.priority for node in unfinished)
+                total_work = sum(node.estimated_duration for node in unfinished)
+            else:
+                path: Dict[str, float] = {}
+                for node in reversed(self._topological_order()):
+                    path[node.name] = durations.get(node.name, 0.0) + max(
+                        (path[dependent] for dependent in node.dependents), default=0.0)
+                critical_path = max(path[node.name] for node in unfinished)
+                total_work = sum(durations.get(node.name, 0.0) for node in unfinished)
+            return max(critical_path, total_work / max(1, workers))
+
+    def next_ready(self) -> Optional[TaskNode]:
+        """
+        Pop the highest-priority ready task whose resources are available and
+        reserve them. The caller returns them with release() when it finishes.
+
+        Returns:
+            Optional[TaskNode]: The task to run, or None if nothing can start now.
+        """
+        with self._lock:
+            blocked = []
+            try:
+                while self._ready:
+                    entry = heapq.heappop(self._ready)
+                    node = self.nodes[entry[2]]
+                    if node.state != READY:
+                        continue
+                    if self.resource_pool is None or self.resource_pool.try_acquire(node.resources):
+                        for blocked_node in blocked:
+                            blocked_node.bypassed += 1
+                        node.state = RUNNING
+                        return node
+                    blocked.append(node)
+                    if node.bypassed >= self.max_bypass:
+                        # Reserve: let running tasks drain until this one fits
+                        return None
+                return None
+            finally:
+                for blocked_node in blocked:
+                    heapq.heappush(self._ready, (-blocked_node.priority, blocked_node.index, blocked_node.name))
+
+    def requeue(self, name: str):
+        """
+        Make a task that ran and is to be retried ready again. Its resources
+        must have been returned with release() first.
+        """
+        with self._lock:
+            node = self.nodes[name]
+            if node.state == RUNNING:
+                self._make_ready(node)
+
+    def release(self, name: str):
+        if self.resource_pool is not None:
+            self.resource_pool.release(self.nodes[name].resources)
+
+    def ready_count(self) -> int:
+        with self._lock:
+            return sum(1 for _, _, name in self._ready if self.nodes[name].state == READY)
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return any(node.state not in FINISHED_STATES for node in self.nodes.values())
+
+    def _resolve(self, node: TaskNode) -> List[str]:
+        skipped = []
+        for dependent_name in node.dependents:
+            dependent = self.nodes[dependent_name]
+            if dependent.state != PENDING:
+                continue
+            if node.state != COMPLETED and node.name in dependent.hard_dependencies:
+                skipped.extend(self._skip(dependent, f"dependency '{node.name}' {node.state}"))
+                continue
+            dependent.unresolved -= 1
+            if dependent.unresolved == 0:
+                self._make_ready(dependent)
+        return skipped
+
+    def _skip(self, node: TaskNode, reason: str) -> List[str]:
+        if node.state in FINISHED_STATES or node.state == RUNNING:
+            return []
+        node.state = SKIPPED
+        node.skip_reason = reason
+        self.logger.info(f"Pruned task '{node.name}': {reason}")
+        return [node.name] + self._resolve(node)
+
+    def mark_completed(self, name: str) -> List[str]:
+        """
+        Mark a task as completed and release its dependents.
+
+        Returns:
+            List[str]: Tasks pruned as a consequence.
+        """
+        with self._lock:
+            node = self.nodes[name]
+            node.state = COMPLETED
+            return self._resolve(node)
+
+    def mark_failed(self, name: str) -> List[str]:
+        with self._lock:
+            node = self.nodes[name]
+            node.state = FAILED
+            return self._resolve(node)
+
+    def skip(self, name: str, reason: str, dispatched: bool = False) -> List[str]:
+        """
+        Skip a task that has not run yet, pruning everything that hard-depends on it.
+        Tasks that are running or finished are left alone.
+
+        Args:
+            dispatched (bool): The task was just returned by next_ready() and has not
+                started, e.g. because its gate turned out false.
+
+        Returns:
+            List[str]: All tasks pruned, including the task itself.
+        """
+        with self._lock:
+            node = self.nodes[name]
+            if dispatched and node.state == RUNNING:
+                node.state = READY
+            return self._skip(node, reason)
+
+    def prune_branch(self, owner: str, taken: Optional[str], not_taken: Optional[str]) -> List[str]:
+        if not not_taken or not_taken == taken or not_taken not in self.nodes:
+            return []
+        self.logger.info(f"Task '{owner}' took branch '{taken}', pruning '{not_taken}'")
+        return self.skip(not_taken, f"branch not taken by '{owner}'")
+
+    def prune_static_gates(self, variable_manager) -> List[str]:
+        """
+        Evaluate, before anything runs, the gates that only read variables no
+        task can change, and prune the tasks whose gate is already false.
+        """
+        written = set()
+        for node in self.nodes.values():
+            written.update((node.config.set_variables or {}).keys())
+            for step in node.config.steps or []:
+                written.update((step.set_variables or {}).keys())
+        pruned = []
+        for node in list(self.nodes.values()):
+            if node.gate is None or written.intersection(node.gate.dependencies):
+                continue
+            if not self.conditional_logic.evaluate_with(node.gate, variable_manager):
+                pruned.extend(self.skip(node.name, "condition is false"))
+                taken, not_taken = self.conditional_logic.select_branch(node.gate, False)
+                pruned.extend(self.prune_branch(node.name, taken, not_taken))
+        return pruned
+
+    def route_branches(self, name: str, result: Any, variable_manager) -> List[str]:
+        """
+        Decide the branches of a finished task and prune the ones not taken.
+
+        Returns:
+            List[str]: Tasks pruned by the decision.
+        """
+        node = self.nodes[name]
+        pruned = []
+        for condition in node.branch_conditions:
+            if not condition.has_branches:
+                continue
+            outcome = self.conditional_logic.evaluate_with(condition, variable_manager)
+            taken, not_taken = self.conditional_logic.select_branch(condition, outcome)
+            pruned.extend(self.prune_branch(name, taken, not_taken))
+        if node.gate is not None and node.gate.has_branches:
+            taken, not_taken = self.conditional_logic.select_branch(node.gate, True)
+            pruned.extend(self.prune_branch(name, taken, not_taken))
+        if node.result_branches:
+            value = result.get('result', result) if isinstance(result, dict) else result
+            if bool(value):
+                taken, not_taken = node.result_branches['true'], node.result_branches['false']
+            else:
+                taken, not_taken = node.result_branches['false'], node.result_branches['true']
+            pruned.extend(self.prune_branch(name, taken, not_taken))
+        return pruned
+
+    def get_states(self) -> Dict[str, str]:
+        with self._lock:
+            return {name: node.state for name, node in self.nodes.items()}
@@ -1,109 +1,199 @@
-from transitions import Machine
-from rich.console import Console
-from rich.table import Table
-from typing import Dict, Any, List, Optional
+import threading
+from array import array
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 
-class StateMachine:
-    states = ['initialized', 'in_progress', 'completed', 'error', 'paused']
+INITIALIZED, IN_PROGRESS, COMPLETED, ERROR, PAUSED, SKIPPED = range(6)
 
-    def __init__(self, logger: logging.Logger):
-        self.console = Console()
+class StateMachine:
+    states = ['initialized', 'in_progress', 'completed', 'error', 'paused', 'skipped']
+
+    # event -> (bitmask of allowed source states, target state)
+    transitions: Dict[str, Tuple[int, int]] = {
+        'start_task': (1 << INITIALIZED, IN_PROGRESS),
+        # A task paused by pause_workflow keeps running and may still finish
+        'complete_task': (1 << IN_PROGRESS | 1 << PAUSED, COMPLETED),
+        'error_occurred': ((1 << len(states)) - 1, ERROR),
+        'pause_task': (1 << IN_PROGRESS, PAUSED),
+        'resume_task': (1 << PAUSED, IN_PROGRESS),
+        'skip_task': (1 << INITIALIZED, SKIPPED),
+        'reset': ((1 << len(states)) - 1, INITIALIZED),
+    }
+
+    def __init__(self, logger: logging.Logger, history_size: int = 0):
+        self._console = None
         self.logger = logger
         self.current_task: Optional[str] = None
-        self.task_states: Dict[str, str] = {}
-        self.task_variables: Dict[str, Dict[str, Any]] = {}
-        self.task_history: Dict[str, List[Dict[str, Any]]] = {}
-
-        # Initialize the state machine
-        self.machine = Machine(model=self, states=StateMachine.states, initial='initialized')
-
-        # Define transitions
-        self.machine.add_transition('start_task', 'initialized', 'in_progress', after='_log_transition')
-        self.machine.add_transition('complete_task', 'in_progress', 'completed', after='_log_transition')
-        self.machine.add_transition('error_occurred', '*', 'error', after='_log_transition')
-        self.machine.add_transition('pause_task', 'in_progress', 'paused', after='_log_transition')
-        self.machine.add_transition('resume_task', 'paused', 'in_progress', after='_log_transition')
-        self.machine.add_transition('reset', '*', 'initialized', after='_log_transition')
+        self.history_size = history_size
+        self._lock = threading.RLock()
+        self._task_ids: Dict[str, int] = {}
+        self._task_names: List[str] = []
+        self._state_table = array('B')
+        self._task_variables: List[Dict[str, Any]] = []
+        self._pending_deltas: List[Dict[str, Any]] = []
+        # Ring buffer of (task_id, from_state, to_state, variable_delta)
+        self._history: Optional[deque] = deque(maxlen=history_size) if history_size > 0 else None
+
+    @property
+    def console(self):
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console()
+        return self._console
+
+    def register_task(self, task: str) -> int:
+        task_id = self._task_ids.get(task)
+        if task_id is not None:
+            return task_id
+        with self._lock:
+            task_id = self._task_ids.get(task)
+            if task_id is None:
+                task_id = len(self._task_names)
+                self._task_names.append(task)
+                self._state_table.append(INITIALIZED)
+                self._task_variables.append({})
+                self._pending_deltas.append({})
+                self._task_ids[task] = task_id
+        return task_id
+
+    def transition(self, task: str, event: str) -> str:
+        """
+        Apply a transition event to a task.
+
+        Args:
+            task (str): The task to transition.
+            event (str): The transition event, e.g. 'start_task'.
+
+        Returns:
+            str: The new state of the task.
+
+        Raises:
+            ValueError: If the event is unknown or not allowed from the task's current state.
+        """
+        if event not in self.transitions:
+            raise ValueError(f"Unknown transition: {event}")
+        allowed_sources, target = self.transitions[event]
+        task_id = self.register_task(task)
+        with self._lock:
+            source = self._state_table[task_id]
+            if not allowed_sources & (1 << source):
+                raise ValueError(f"Invalid transition '{event}' for task '{task}' in state '{self.states[source]}'")
+            self._state_table[task_id] = target
+            if self._history is not None:
+                self._history.append((task_id, source, target, self._pending_deltas[task_id]))
+                self._pending_deltas[task_id] = {}
+        self.logger.debug(f"Task '{task}' transitioned to state: {self.states[target]}")
+        return self.states[target]
 
     def set_task(self, task: str, variables: Optional[Dict[str, Any]] = None):
+        self.register_task(task)
         self.current_task = task
-        if task not in self.task_states:
-            self.task_states[task] = 'initialized'
-            self.task_variables[task] = {}
-            self.task_history[task] = []
         if variables:
-            self.task_variables[task].update(variables)
-        self.state = self.task_states[task]
-
-    def _log_transition(self):
-        if self.current_task:
-            transition_info = {
-                'from_state': self.task_states[self.current_task],
-                'to_state': self.state,
-                'variables': self.task_variables[self.current_task].copy()
-            }
-            self.task_history[self.current_task].append(transition_info)
-            self.task_states[self.current_task] = self.state
-            
-            log_message = f"Task '{self.current_task}' transitioned to state: {self.state}"
-            self.logger.info(log_message)
-            self.console.print(f"[bold cyan]{log_message}[/bold cyan]")
-
-    def update_variables(self, variables: Dict[str, Any]):
-        if self.current_task:
-            self.task_variables[self.current_task].update(variables)
+            self.update_variables(variables, task)
+
+    def _resolve_task(self, task: Optional[str]) -> str:
+        task = task or self.current_task
+        if task is None:
+            raise ValueError("No task selected")
+        return task
+
+    def update_variables(self, variables: Dict[str, Any], task: Optional[str] = None):
+        task = task or self.current_task
+        if task is None:
+            return
+        task_id = self.register_task(task)
+        with self._lock:
+            self._task_variables[task_id].update(variables)
+            if self._history is not None:
+                self._pending_deltas[task_id].update(variables)
 
     def get_current_state(self) -> str:
-        return self.state
+        return self.get_task_state(self._resolve_task(None))
 
     def get_task_state(self, task: str) -> str:
-        return self.task_states.get(task, 'unknown')
+        task_id = self._task_ids.get(task)
+        if task_id is None:
+            return 'unknown'
+        return self.states[self._state_table[task_id]]
 
     def get_task_variables(self, task: str) -> Dict[str, Any]:
-        return self.task_variables.get(task, {})
+        task_id = self._task_ids.get(task)
+        if task_id is None:
+            return {}
+        with self._lock:
+            return self._task_variables[task_id].copy()
 
     def get_task_history(self, task: str) -> List[Dict[str, Any]]:
-        return self.task_history.get(task, [])
+        task_id = self._task_ids.get(task)
+        if task_id is None or self._history is None:
+            return []
+        with self._lock:
+            entries = list(self._history)
+        return [
+            {'from_state': self.states[source], 'to_state': self.states[target], 'variables': delta}
+            for entry_id, source, target, delta in entries if entry_id == task_id
+        ]
 
     def get_all_task_states(self) -> Dict[str, str]:
-        return self.task_states.copy()
+        with self._lock:
+            return {name: self.states[state] for name, state in zip(self._task_names, self._state_table)}
 
     def display_current_state(self):
+        from rich.table import Table
         if self.current_task:
             table = Table(title=f"Current State: {self.current_task}")
             table.add_column("Attribute", style="cyan")
             table.add_column("Value", style="magenta")
-            table.add_row("State", self.state)
-            for var, value in self.task_variables[self.current_task].items():
+            table.add_row("State", self.get_task_state(self.current_task))
+            for var, value in self.get_task_variables(self.current_task).items():
                 table.add_row(var, str(value))
             self.console.print(table)
 
     def display_all_states(self):
+        from rich.table import Table
         table = Table(title="All Task States")
         table.add_column("Task", style="cyan")
         table.add_column("State", style="magenta")
-        for task, state in self.task_states.items():
+        for task, state in self.get_all_task_states().items():
             table.add_row(task, state)
         self.console.print(table)
 
-    def task_completed(self):
-        self.complete_task()
+    def start_task(self, task: Optional[str] = None):
+        self.transition(self._resolve_task(task), 'start_task')
+
+    def task_completed(self, task: Optional[str] = None):
+        self.transition(self._resolve_task(task), 'complete_task')
+
+    def task_failed(self, task: Optional[str] = None):
+        self.transition(self._resolve_task(task), 'error_occurred')
+
+    def task_skipped(self, task: Optional[str] = None):
+        # Skipping a task that already started or finished is a no-op
+        task = self._resolve_task(task)
+        with self._lock:
+            if self.get_task_state(task) in ('initialized', 'unknown'):
+                self.transition(task, 'skip_task')
 
-    def task_failed(self):
-        self.error_occurred()
+    def task_paused(self, task: Optional[str] = None):
+        self.transition(self._resolve_task(task), 'pause_task')
 
-    def task_paused(self):
-        self.pause_task()
+    def task_resumed(self, task: Optional[str] = None):
+        self.transition(self._resolve_task(task), 'resume_task')
 
-    def task_resumed(self):
-        self.resume_task()
+    pause_task = task_paused
+    resume_task = task_resumed
 
     def reset_task(self, task: str):
-        if task in self.task_states:
-            self.task_states[task] = 'initialized'
-            self.task_variables[task] = {}
-            self.task_history[task] = []
-            log_message = f"Task '{task}' has been reset"
-            self.logger.info(log_message)
-            self.console.print(f"[bold yellow]{log_message}[/bold yellow]")
\ No newline at end of file
+        task_id = self._task_ids.get(task)
+        if task_id is None:
+            return
+        with self._lock:
+            self._state_table[task_id] = INITIALIZED
+            self._task_variables[task_id] = {}
+            self._pending_deltas[task_id] = {}
+            if self._history is not None:
+                retained = [entry for entry in self._history if entry[0] != task_id]
+                self._history.clear()
+                self._history.extend(retained)
+        self.logger.info(f"Task '{task}' has been reset")
@@ -0,0 +1,111 @@
+import threading
+from typing import Dict, Any, Iterator, List, Optional
+
+
+def uses_step_graph(steps: List[Dict[str, Any]]) -> bool:
+    """
+    Steps run as a graph once any of them declares depends_on, outputs or
+    each; otherwise they keep running one after another.
+    """
+    return any(step.get('depends_on') is not None or step.get('outputs') is not None or step.get('each')
+               for step in steps)
+
+
+def validate_step_graph(task_name: str, steps: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Check step names and dependencies.
+
+    Returns:
+        Dict[str, List[str]]: The dependencies of each step, by step name.
+
+    Raises:
+        ValueError: If step names repeat, a dependency is unknown, or the dependencies form a cycle.
+    """
+    dependencies: Dict[str, List[str]] = {}
+    for step in steps:
+        name = step.get('name', 'Unnamed Step')
+        if name in dependencies:
+            raise ValueError(f"Task '{task_name}' has more than one step named '{name}'")
+        dependencies[name] = list(step.get('depends_on') or [])
+    for name, depends_on in dependencies.items():
+        for dependency in depends_on:
+            if dependency not in dependencies:
+                raise ValueError(f"Step '{name}' of task '{task_name}' depends on unknown step '{dependency}'")
+
+    visiting, visited = set(), set()
+
+    def visit(name: str, path: List[str]):
+        if name in visited:
+            return
+        if name in visiting:
+            cycle = path[path.index(name):] + [name]
+            raise ValueError(f"Steps of task '{task_name}' form a cycle: {' -> '.join(cycle)}")
+        visiting.add(name)
+        for dependency in dependencies[name]:
+            visit(dependency, path + [name])
+        visiting.discard(name)
+        visited.add(name)
+
+    for name in dependencies:
+        visit(name, [])
+    return dependencies
+
+
+class StepOutputs:
+    """
+    What one step passes to the steps that depend on it.
+
+    A step that runs once publishes its outputs when it finishes. A step
+    that runs once per item (`each`) also publishes every item's outputs as
+    soon as that item is done, so the next step can start on it while this
+    one works on the following item.
+    """
+
+    def __init__(self, per_item: bool = False):
+        self.per_item = per_item
+        self.items: List[Dict[str, Any]] = []
+        self.values: Optional[Dict[str, Any]] = None
+        self.finished = False
+        self.failed = False
+        self._condition = threading.Condition()
+
+    def add_item(self, item: Dict[str, Any]):
+        with self._condition:
+            self.items.append(item)
+            self._condition.notify_all()
+
+    def finish(self, values: Dict[str, Any]):
+        with self._condition:
+            self.values = values
+            self.finished = True
+            self._condition.notify_all()
+
+    def fail(self):
+        with self._condition:
+            self.failed = True
+            self.finished = True
+            self._condition.notify_all()
+
+    def wait(self) -> Optional[Dict[str, Any]]:
+        """
+        Block until the step finishes. Returns its outputs, or None if it failed.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.finished)
+            return None if self.failed else self.values
+
+    def iter_items(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the outputs of each item as it completes. Stops early if the step fails.
+        """
+        index = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: index < len(self.items) or self.finished)
+                if self.failed:
+                    return
+                if index >= len(self.items):
+                    return
+                item = self.items[index]
+            index += 1
+            yield item
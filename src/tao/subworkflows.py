@@ -0,0 +1,381 @@
+import hashlib
+import io
+import os
+import re
+import threading
+import tokenize
+from typing import Dict, Any, List, Optional, Set, Tuple
+import logging
+import yaml
+from tao.configuration_manager import TaskConfig, WorkflowConfig
+from tao.conditional_logic import ConditionalLogic
+from tao.metrics import WorkflowMetrics
+from tao.scheduler import TaskScheduler
+
+_TEMPLATE_BLOCK = re.compile(r'(\{\{.*?\}\}|\{%.*?%\})', re.S)
+
+
+def rename_identifiers(expression: str, renames: Dict[str, str]) -> str:
+    """
+    Rename variables in a Python or Jinja expression, leaving attribute
+    names, keyword arguments and string literals alone.
+    """
+    if not renames or not any(name in expression for name in renames):
+        return expression
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(expression).readline))
+    except (tokenize.TokenError, SyntaxError, IndentationError):
+        return expression
+    line_offsets = [0]
+    for line in expression.splitlines(keepends=True):
+        line_offsets.append(line_offsets[-1] + len(line))
+    replacements = []
+    for index, token in enumerate(tokens):
+        if token.type != tokenize.NAME or token.string not in renames:
+            continue
+        previous = tokens[index - 1].string if index else ''
+        following = tokens[index + 1].string if index + 1 < len(tokens) else ''
+        if previous == '.' or (following == '=' and previous in ('(', ',')):
+            continue
+        start = line_offsets[token.start[0] - 1] + token.start[1]
+        replacements.append((start, start + len(token.string), renames[token.string]))
+    for start, end, name in reversed(replacements):
+        expression = expression[:start] + name + expression[end:]
+    return expression
+
+
+def rename_in_template(value: str, renames: Dict[str, str]) -> str:
+    """
+    Rename variables in a `${name}` reference or inside the '{{ }}' and
+    '{% %}' blocks of a template. Other text is left as it is.
+    """
+    if value.startswith('${') and value.endswith('}'):
+        return '${' + renames.get(value[2:-1], value[2:-1]) + '}'
+    if '{{' not in value and '{%' not in value:
+        return value
+    return _TEMPLATE_BLOCK.sub(lambda match: match.group(0)[:2] + rename_identifiers(match.group(0)[2:-2], renames)
+                               + match.group(0)[-2:], value)
+
+
+def _rename_values(value: Any, renames: Dict[str, str]) -> Any:
+    if isinstance(value, str):
+        return rename_in_template(value, renames)
+    if isinstance(value, dict):
+        return {key: _rename_values(item, renames) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_rename_values(item, renames) for item in value]
+    return value
+
+
+class CompiledWorkflow:
+    """
+    A sub-workflow definition parsed and validated once: its tasks, the
+    variables local to it and those its tasks set, and the tasks where it
+    starts and ends.
+    """
+
+    def __init__(self, path: str, digest: str, tasks: List[Dict[str, Any]], variables: Dict[str, Any],
+                 written_variables: Set[str], roots: List[str], sinks: List[str]):
+        self.path = path
+        self.digest = digest
+        self.tasks = tasks
+        self.variables = variables
+        self.written_variables = written_variables
+        self.local_variables = set(variables) | written_variables
+        self.roots = roots
+        self.sinks = sinks
+
+
+class SubWorkflowCache:
+    """
+    Compiled sub-workflows by content hash, so a definition used by many
+    tasks, runs or workflows is parsed and validated only once per process.
+    """
+
+    def __init__(self):
+        self._compiled: Dict[str, CompiledWorkflow] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, logger: logging.Logger,
+            metrics: Optional[WorkflowMetrics] = None) -> CompiledWorkflow:
+        """
+        Raises:
+            ValueError: If the file is not a valid workflow definition.
+        """
+        with open(path, 'rb') as file:
+            content = file.read()
+        digest = hashlib.sha1(content).hexdigest()
+        with self._lock:
+            compiled = self._compiled.get(digest)
+        if metrics is not None:
+            metrics.record_cache('subworkflows', compiled is not None)
+        if compiled is None:
+            compiled = self._compile(path, digest, content, logger)
+            with self._lock:
+                compiled = self._compiled.setdefault(digest, compiled)
+        return compiled
+
+    @staticmethod
+    def _compile(path: str, digest: str, content: bytes, logger: logging.Logger) -> CompiledWorkflow:
+        data = yaml.safe_load(content) or {}
+        try:
+            workflow = WorkflowConfig(**data.get('workflow', data))
+        except ValueError as e:
+            raise ValueError(f"Sub-workflow {path} is not a valid workflow: {e}")
+        # Builds the dependency graph, which rejects unknown dependencies, cycles and bad conditions
+        scheduler = TaskScheduler(workflow.tasks, ConditionalLogic(logger), logger)
+        variables = dict(data.get('global_variables') or {})
+        variables.update(workflow.variables)
+        written_variables = set()
+        for task in workflow.tasks:
+            written_variables.update((task.set_variables or {}).keys())
+            written_variables.update((task.outputs or {}).keys())
+            for step in task.steps or []:
+                written_variables.update((step.set_variables or {}).keys())
+        logger.info(f"Compiled sub-workflow {path} ({len(workflow.tasks)} tasks)")
+        return CompiledWorkflow(
+            path, digest, [task.dict() for task in workflow.tasks], variables, written_variables,
+            roots=[name for name, node in scheduler.nodes.items() if not node.dependencies],
+            sinks=[name for name, node in scheduler.nodes.items() if not node.dependents])
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+
+
+shared_cache = SubWorkflowCache()
+
+
+class SubWorkflowExpander:
+    """
+    Inlines sub-workflow tasks into the task list of the workflow that uses
+    them, so one scheduler runs everything and independent tasks on either
+    side of the boundary run in parallel.
+
+    A task with `workflow: path/to/file.yaml` (relative to the configuration
+    that uses it) is replaced by that workflow's tasks, named
+    `<task>.<subtask>`. The sub-workflow's tasks start once the task's
+    `dependencies` are done (or the task before it, without any), and tasks
+    that depend on the sub-workflow task wait for all of its last tasks.
+
+    Variables of the sub-workflow, and those its tasks set, are local to
+    each use of it. `inputs` sets them from the caller, either to a value or
+    to `${variable}` of the caller. `outputs` maps caller variables to
+    variables the sub-workflow's tasks set; the caller's variable is written
+    when such a task runs. Other variables are shared with the caller.
+    """
+
+    def __init__(self, logger: logging.Logger, metrics: Optional[WorkflowMetrics] = None,
+                 cache: Optional[SubWorkflowCache] = None):
+        self.logger = logger
+        self.metrics = metrics
+        self.cache = cache if cache is not None else shared_cache
+
+    def expand(self, tasks: List[TaskConfig], base_directory: str) -> Tuple[List[TaskConfig], Dict[str, Any]]:
+        """
+        Returns:
+            Tuple[List[TaskConfig], Dict[str, Any]]: The tasks with every sub-workflow inlined,
+            and the initial values of the sub-workflows' local variables.
+
+        Raises:
+            ValueError: If a task has neither a plugin and function nor a workflow, a sub-workflow
+                is invalid or includes itself, or a branch targets a sub-workflow task.
+        """
+        if not any(task.workflow for task in tasks):
+            for task in tasks:
+                self._check_task(task)
+            return tasks, {}
+        expanded, variables, _ = self._expand(tasks, base_directory, ())
+        return expanded, variables
+
+    @staticmethod
+    def _check_task(task: TaskConfig):
+        if task.workflow is None and not (task.plugin and task.function):
+            raise ValueError(f"Task '{task.name}' needs a plugin and function, or a workflow")
+
+    def _expand(self, tasks: List[TaskConfig], base_directory: str,
+                stack: Tuple[str, ...]) -> Tuple[List[TaskConfig], Dict[str, Any], Dict[str, List[str]]]:
+        expanded: List[TaskConfig] = []
+        variables: Dict[str, Any] = {}
+        # What each task of this list became: itself, or the last tasks of its sub-workflow
+        finals: Dict[str, List[str]] = {}
+        previous: List[str] = []
+        previous_inlined = False
+        for task in tasks:
+            self._check_task(task)
+            if task.workflow is None:
+                if task.dependencies is None and previous_inlined:
+                    task = TaskConfig(**dict(task.dict(), after=list(task.after or []) + previous))
+                expanded.append(task)
+                finals[task.name] = previous = [task.name]
+                previous_inlined = False
+                continue
+            sub_tasks, sub_variables, sinks = self._inline(task, base_directory, stack, previous)
+            expanded.extend(sub_tasks)
+            variables.update(sub_variables)
+            finals[task.name] = previous = sinks
+            previous_inlined = True
+
+        inlined = {name: names for name, names in finals.items() if names != [name]}
+        if not inlined:
+            return expanded, variables, finals
+        for index, task in enumerate(expanded):
+            targets = self._branch_targets(task)
+            if targets & inlined.keys():
+                raise ValueError(f"Task '{task.name}' branches to sub-workflow task "
+                                 f"'{sorted(targets & inlined.keys())[0]}', which cannot be a branch target")
+            dependencies = self._replace(task.dependencies, inlined)
+            after = self._replace(task.after, inlined)
+            if dependencies is not task.dependencies or after is not task.after:
+                expanded[index] = TaskConfig(**dict(task.dict(), dependencies=dependencies, after=after))
+        return expanded, variables, finals
+
+    @staticmethod
+    def _replace(names: Optional[List[str]], inlined: Dict[str, List[str]]) -> Optional[List[str]]:
+        if not names or not inlined.keys() & set(names):
+            return names
+        replaced = []
+        for name in names:
+            replaced.extend(inlined.get(name, [name]))
+        return list(dict.fromkeys(replaced))
+
+    @staticmethod
+    def _branch_targets(task: TaskConfig) -> Set[str]:
+        targets = {(task.on_success or {}).get('true_branch'), (task.on_success or {}).get('false_branch')}
+        for condition in task.conditions or []:
+            targets.update((condition.true_branch, condition.false_branch))
+        if isinstance(task.conditional_logic, dict):
+            targets.update((task.conditional_logic.get('true_branch'), task.conditional_logic.get('false_branch')))
+        targets.discard(None)
+        return targets
+
+    def _inline(self, task: TaskConfig, base_directory: str, stack: Tuple[str, ...],
+                previous: List[str]) -> Tuple[List[TaskConfig], Dict[str, Any], List[str]]:
+        if task.plugin or task.steps or task.conditional_logic or task.conditions:
+            raise ValueError(f"Sub-workflow task '{task.name}' cannot also have a plugin, steps or conditions")
+        path = os.path.normpath(os.path.join(base_directory, task.workflow))
+        compiled = self.cache.get(path, self.logger, self.metrics)
+        if compiled.digest in stack:
+            raise ValueError(f"Sub-workflow {path} includes itself through task '{task.name}'")
+
+        prefix = f"{task.name}."
+        scope = re.sub(r'\W', '_', task.name) + '__'
+        renames: Dict[str, str] = {}
+        variables: Dict[str, Any] = {}
+        for name, value in (task.inputs or {}).items():
+            if isinstance(value, str) and value.startswith('${') and value.endswith('}'):
+                # Read the caller's variable directly, so it is current when each task starts
+                renames[name] = value[2:-1]
+            else:
+                renames[name] = scope + name
+                variables[scope + name] = value
+        for name in compiled.local_variables:
+            renames.setdefault(name, scope + name)
+        for name, value in compiled.variables.items():
+            if name not in (task.inputs or {}):
+                variables[scope + name] = _rename_values(value, renames)
+
+        outputs: Dict[str, List[str]] = {}
+        for caller_variable, name in (task.outputs or {}).items():
+            # Outputs are written when the sub-workflow's tasks set them, never from its defaults,
+            # so the caller's value stays in place for the tasks that run before
+            if name not in compiled.written_variables:
+                raise ValueError(f"Sub-workflow task '{task.name}' maps output '{caller_variable}' to "
+                                 f"'{name}', which no task of {path} sets")
+            outputs.setdefault(name, []).append(caller_variable)
+
+        sub_tasks = []
+        roots = set(compiled.roots)
+        for task_data in compiled.tasks:
+            data = self._rename_task(task_data, prefix, renames, outputs)
+            if task_data['name'] in roots:
+                after = list(data.get('after') or []) + list(task.after or [])
+                if task.dependencies is not None:
+                    data['dependencies'] = list(task.dependencies)
+                else:
+                    after += previous
+                data['after'] = list(dict.fromkeys(after)) or None
+            sub_tasks.append(TaskConfig(**data))
+
+        expanded, nested_variables, finals = self._expand(sub_tasks, os.path.dirname(path),
+                                                          stack + (compiled.digest,))
+        variables.update(nested_variables)
+        sinks = [name for sink in compiled.sinks for name in finals[prefix + sink]]
+        return expanded, variables, sinks
+
+    def _rename_task(self, task_data: Dict[str, Any], prefix: str, renames: Dict[str, str],
+                     outputs: Dict[str, List[str]]) -> Dict[str, Any]:
+        data = dict(task_data)
+        data['name'] = prefix + data['name']
+        for key in ('dependencies', 'after'):
+            if data.get(key) is not None:
+                data[key] = [prefix + name for name in data[key]]
+        data['parameters'] = _rename_values(data.get('parameters') or {}, renames)
+        if data.get('variables'):
+            data['variables'] = _rename_values(data['variables'], renames)
+        data['set_variables'] = self._rename_set_variables(data.get('set_variables'), renames, outputs)
+        if data.get('conditional_logic') is not None:
+            data['conditional_logic'] = self._rename_condition(data['conditional_logic'], prefix, renames)
+        if data.get('conditions'):
+            data['conditions'] = [self._rename_condition(condition, prefix, renames)
+                                  for condition in data['conditions']]
+        if data.get('on_success') and ('true_branch' in data['on_success'] or 'false_branch' in data['on_success']):
+            data['on_success'] = {key: prefix + value if key in ('true_branch', 'false_branch') and value else value
+                                  for key, value in data['on_success'].items()}
+        if data.get('steps'):
+            data['steps'] = [self._rename_step(step, renames, outputs) for step in data['steps']]
+        # A sub-workflow used inside this one reads its inputs and writes its outputs in this scope
+        if data.get('inputs'):
+            data['inputs'] = _rename_values(data['inputs'], renames)
+        if data.get('outputs'):
+            nested_outputs = {}
+            for name, value in data['outputs'].items():
+                nested_outputs[renames.get(name, name)] = value
+                nested_outputs.update((caller_variable, value) for caller_variable in outputs.get(name, []))
+            data['outputs'] = nested_outputs
+        return data
+
+    def _rename_step(self, step: Dict[str, Any], renames: Dict[str, str],
+                     outputs: Dict[str, List[str]]) -> Dict[str, Any]:
+        step = dict(step)
+        step['parameters'] = _rename_values(step.get('parameters') or {}, renames)
+        if step.get('variables'):
+            step['variables'] = _rename_values(step['variables'], renames)
+        step['set_variables'] = self._rename_set_variables(step.get('set_variables'), renames, outputs)
+        if step.get('conditions'):
+            # Step conditions only gate the step; their branch names are not task names
+            step['conditions'] = [self._rename_condition(condition, '', renames) for condition in step['conditions']]
+        return step
+
+    @staticmethod
+    def _rename_set_variables(set_variables: Optional[Dict[str, str]], renames: Dict[str, str],
+                              outputs: Dict[str, List[str]]) -> Optional[Dict[str, str]]:
+        if not set_variables:
+            return set_variables
+        renamed = {}
+        for name, expression in set_variables.items():
+            renamed[renames.get(name, name)] = expression
+            for caller_variable in outputs.get(name, []):
+                renamed[caller_variable] = expression
+        return renamed
+
+    def _rename_condition(self, condition: Any, prefix: str, renames: Dict[str, str]) -> Any:
+        if isinstance(condition, str):
+            if '{{' in condition or '{%' in condition:
+                return rename_in_template(condition, renames)
+            return rename_identifiers(condition, renames)
+        if isinstance(condition, list):
+            return [self._rename_condition(item, prefix, renames) for item in condition]
+        if not isinstance(condition, dict):
+            return condition
+        condition = dict(condition)
+        for key in ('expression', 'condition'):
+            if isinstance(condition.get(key), str):
+                condition[key] = self._rename_condition(condition[key], prefix, renames)
+        if condition.get('conditions'):
+            condition['conditions'] = [self._rename_condition(item, prefix, renames)
+                                       for item in condition['conditions']]
+        for key in ('true_branch', 'false_branch'):
+            if condition.get(key):
+                condition[key] = prefix + condition[key]
+        return condition
@@ -0,0 +1,140 @@
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import logging
+import yaml
+from tao.configuration_manager import ConfigurationManager
+from tao.plugin_system import PluginSystem
+from tao.workflow_engine import build_workflow_engine
+from tao.metrics import WorkflowMetrics
+from tao.task_statistics import TaskStatistics
+from tao.run_history import RunHistoryStore
+
+
+def load_sweep_variables(path: str) -> List[Dict[str, Any]]:
+    """
+    Load the variable sets for a sweep.
+
+    CSV files provide one instance per row, with the header naming the
+    variables; cell values are parsed as YAML scalars so numbers and booleans
+    keep their types. JSON and YAML files must contain a list of mappings.
+
+    Args:
+        path (str): Path to a .csv, .json, .yaml or .yml file.
+
+    Returns:
+        List[Dict[str, Any]]: One variable mapping per workflow instance.
+    """
+    suffix = Path(path).suffix.lower()
+    with open(path, 'r', newline='') as file:
+        if suffix == '.csv':
+            return [
+                {name: yaml.safe_load(value) if value != '' else None for name, value in row.items()}
+                for row in csv.DictReader(file)
+            ]
+        if suffix == '.json':
+            variable_sets = json.load(file)
+        else:
+            variable_sets = yaml.safe_load(file)
+    if not isinstance(variable_sets, list) or not all(isinstance(item, dict) for item in variable_sets):
+        raise ValueError(f"Sweep file {path} must contain a list of variable mappings")
+    return variable_sets
+
+
+class SweepInstanceResult:
+    def __init__(self, index: int, variables: Dict[str, Any]):
+        self.index = index
+        self.variables = variables
+        self.success = False
+        self.error: Optional[str] = None
+        self.duration = 0.0
+        self.task_states: Dict[str, str] = {}
+        self.outputs: Dict[str, Any] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'index': self.index,
+            'variables': self.variables,
+            'success': self.success,
+            'error': self.error,
+            'duration_seconds': self.duration,
+            'task_states': self.task_states,
+            'outputs': self.outputs,
+        }
+
+
+class ParameterSweep:
+    def __init__(self, config_manager: ConfigurationManager, plugin_system: PluginSystem,
+                 logger: logging.Logger, max_parallel: int = 4,
+                 collect_variables: Optional[List[str]] = None,
+                 metrics: Optional[WorkflowMetrics] = None):
+        self.config_manager = config_manager
+        self.plugin_system = plugin_system
+        self.logger = logger
+        self.max_parallel = max(1, max_parallel)
+        self.collect_variables = collect_variables or []
+        self.metrics = metrics
+        # One statistics store for all instances; saved by each engine as it finishes
+        engine_config = config_manager.get_engine_config()
+        self.task_statistics = TaskStatistics(engine_config.get('statistics_file'), logger=logger)
+        history_database = engine_config.get('history_database')
+        self.run_history = RunHistoryStore(history_database, logger) if history_database else None
+
+    def run(self, variable_sets: List[Dict[str, Any]]) -> List[SweepInstanceResult]:
+        """
+        Execute one workflow instance per variable set, at most max_parallel at a time.
+
+        Args:
+            variable_sets (List[Dict[str, Any]]): Variable overrides for each instance.
+
+        Returns:
+            List[SweepInstanceResult]: Results in the order of variable_sets.
+        """
+        self.logger.info(f"Starting sweep of {len(variable_sets)} instances (max parallel: {self.max_parallel})")
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='tao-sweep') as executor:
+            results = list(executor.map(self._run_instance, range(len(variable_sets)), variable_sets))
+        if self.run_history is not None:
+            self.run_history.flush()
+        self.logger.info(f"Sweep finished: {sum(r.success for r in results)}/{len(results)} instances succeeded")
+        return results
+
+    def close(self):
+        """
+        Flush and close the history database shared by the instances.
+        """
+        if self.run_history is not None:
+            self.run_history.close()
+            self.run_history = None
+
+    def _run_instance(self, index: int, variables: Dict[str, Any]) -> SweepInstanceResult:
+        result = SweepInstanceResult(index, variables)
+        start_time = time.perf_counter()
+        try:
+            engine = build_workflow_engine(self.config_manager, self.plugin_system, self.logger,
+                                           variables={**variables, 'sweep_index': index}, metrics=self.metrics,
+                                           task_statistics=self.task_statistics, run_history=self.run_history)
+            result.success = engine.execute_workflow()
+            result.task_states = engine.get_all_task_states()
+            workflow_variables = engine.get_workflow_variables()
+            result.outputs = {name: workflow_variables.get(name) for name in self.collect_variables}
+        except Exception as e:
+            self.logger.error(f"Sweep instance {index} failed: {str(e)}")
+            result.error = str(e)
+        result.duration = time.perf_counter() - start_time
+        return result
+
+    @staticmethod
+    def summarize(results: List[SweepInstanceResult]) -> Dict[str, Any]:
+        durations = sorted(r.duration for r in results)
+        succeeded = sum(r.success for r in results)
+        return {
+            "Instances": len(results),
+            "Succeeded": succeeded,
+            "Failed": len(results) - succeeded,
+            "Total Instance Time": f"{sum(durations):.2f} seconds",
+            "Median Instance Time": f"{durations[len(durations) // 2]:.2f} seconds" if durations else "n/a",
+            "Slowest Instance Time": f"{durations[-1]:.2f} seconds" if durations else "n/a",
+        }
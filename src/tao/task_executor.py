@@ -1,9 +1,13 @@
-from typing import Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
 import logging
 from tao.plugin_system import PluginSystem
 from tao.variable_manager import VariableManager
 from tao.conditional_logic import ConditionalLogic
 from tao.error_handler import ErrorHandler
+from tao.event_bus import STEP_FINISHED
+from tao.step_graph import StepOutputs, uses_step_graph, validate_step_graph
 
 class TaskExecutor:
     def __init__(self, plugin_system: PluginSystem, variable_manager: VariableManager, 
@@ -14,8 +18,13 @@ class TaskExecutor:
         self.conditional_logic = conditional_logic
         self.error_handler = error_handler
         self.logger = logger
+        self.event_bus = None
 
-    def execute_task(self, task_name: str, task_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def set_event_bus(self, event_bus):
+        self.event_bus = event_bus
+
+    def execute_task(self, task_name: str, task_config: Dict[str, Any],
+                     runner: Optional[Callable] = None) -> Optional[Dict[str, Any]]:
         self.logger.info(f"Executing task: {task_name}")
         
         # Resolve variables in task parameters
@@ -30,17 +39,22 @@ class TaskExecutor:
             plugin_name = task_config['plugin']
             function_name = task_config['function']
             
-            # Execute the task
-            result = self.plugin_system.execute_task(plugin_name, function_name, resolved_params)
+            # Execute the task, failing fast while the plugin function's circuit is open
+            self.error_handler.check_circuit(plugin_name, function_name)
+            result = self.plugin_system.execute_task(plugin_name, function_name, resolved_params,
+                                                     self.variable_manager.get_all_variables(), runner)
+            self.error_handler.record_success(plugin_name, function_name)
             
             # Update variables based on task output
-            self._update_variables(task_config.get('set_variables', {}), result)
+            self._update_variables(task_config.get('set_variables') or {}, result)
             
             self.logger.info(f"Task {task_name} executed successfully")
             return result
         except Exception as e:
             self.logger.error(f"Error executing task {task_name}: {str(e)}")
-            self.error_handler.handle_error(e, task_name, resolved_params)
+            # The engine retries the task through the scheduler if the error handler asks for it
+            self.error_handler.handle_error(e, task_name, resolved_params, task_config.get('plugin'),
+                                            task_config.get('function'))
             return None
 
     def _resolve_variables(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -53,13 +67,11 @@ class TaskExecutor:
                 resolved_params[key] = value
         return resolved_params
 
-    def _evaluate_condition(self, condition: Optional[Dict[str, Any]]) -> bool:
+    def _evaluate_condition(self, condition: Optional[Any]) -> bool:
         if condition is None:
             return True
         
-        variables = self.variable_manager.get_all_variables()
-        self.conditional_logic.update_context(variables)
-        return self.conditional_logic.evaluate(condition)
+        return self.conditional_logic.evaluate_with(condition, self.variable_manager)
 
     def _update_variables(self, variable_updates: Dict[str, str], task_result: Dict[str, Any]):
         for var_name, value_expr in variable_updates.items():
@@ -69,7 +81,8 @@ class TaskExecutor:
             except Exception as e:
                 self.logger.error(f"Error updating variable {var_name}: {str(e)}")
 
-    def execute_step(self, step_config: Dict[str, Any], task_context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def execute_step(self, step_config: Dict[str, Any], task_context: Dict[str, Any],
+                     runner: Optional[Callable] = None) -> Optional[Dict[str, Any]]:
         step_name = step_config.get('name', 'Unnamed Step')
         self.logger.info(f"Executing step: {step_name}")
 
@@ -84,30 +97,149 @@ class TaskExecutor:
 
         try:
             function_name = step_config['function']
-            plugin_name = step_config.get('plugin', 'core_plugin')  # Default to core_plugin if not specified
+            plugin_name = step_config.get('plugin') or 'core_plugin'  # Default to core_plugin if not specified
             
-            # Execute the step
-            result = self.plugin_system.execute_task(plugin_name, function_name, resolved_params)
+            # Execute the step, failing fast while the plugin function's circuit is open
+            self.error_handler.check_circuit(plugin_name, function_name)
+            result = self.plugin_system.execute_task(plugin_name, function_name, resolved_params,
+                                                     self.variable_manager.get_all_variables(), runner)
+            self.error_handler.record_success(plugin_name, function_name)
             
             # Update variables based on step output
-            self._update_variables(step_config.get('set_variables', {}), result)
+            self._update_variables(step_config.get('set_variables') or {}, result)
             
             self.logger.info(f"Step {step_name} executed successfully")
             return result
         except Exception as e:
             self.logger.error(f"Error executing step {step_name}: {str(e)}")
-            self.error_handler.handle_error(e, step_name, resolved_params)
+            self.error_handler.handle_error(e, step_name, resolved_params, step_config.get('plugin') or 'core_plugin',
+                                            step_config.get('function'), retryable=False)
             return None
 
-    def execute_task_with_steps(self, task_name: str, task_config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def execute_task_with_steps(self, task_name: str, task_config: Dict[str, Any],
+                                runner: Optional[Callable] = None) -> Optional[Dict[str, Any]]:
         self.logger.info(f"Executing task with steps: {task_name}")
         
         task_context = {}
-        for step_config in task_config.get('steps', []):
-            step_result = self.execute_step(step_config, task_context)
+        steps = task_config.get('steps', [])
+        if uses_step_graph(steps):
+            return self._execute_step_graph(task_name, steps, runner)
+        for index, step_config in enumerate(steps):
+            step_result = self.execute_step(step_config, task_context, runner)
             if step_result is None:
                 self.logger.warning(f"Step execution failed in task {task_name}")
                 return None
             task_context.update(step_result)
+            if self.event_bus is not None:
+                self.event_bus.publish(STEP_FINISHED, task_name, step=step_config.get('name', 'Unnamed Step'),
+                                       progress=100.0 * (index + 1) / len(steps))
         
-        return task_context
\ No newline at end of file
+        return task_context
+
+    def _execute_step_graph(self, task_name: str, steps: List[Dict[str, Any]],
+                            runner: Optional[Callable] = None) -> Optional[Dict[str, Any]]:
+        """
+        Run steps as soon as the steps they depend on have finished, so
+        independent steps run concurrently. Each step receives the declared
+        outputs of its direct dependencies rather than the whole context.
+        A step with `each` runs once per item of that input and streams its
+        results to the steps after it.
+        """
+        try:
+            dependencies = validate_step_graph(task_name, steps)
+        except ValueError as e:
+            self.error_handler.handle_error(e, task_name, {}, retryable=False)
+            return None
+
+        step_configs = {step.get('name', 'Unnamed Step'): step for step in steps}
+        outputs = {name: StepOutputs(per_item=bool(step.get('each'))) for name, step in step_configs.items()}
+        progress = {'finished': 0, 'total': len(steps), 'lock': threading.Lock()}
+        with ThreadPoolExecutor(max_workers=len(steps), thread_name_prefix='tao-step') as pool:
+            # Every step gets a thread, so steps waiting on their inputs cannot starve the ones producing them
+            for name in step_configs:
+                pool.submit(self._run_graph_step, task_name, name, step_configs, dependencies, outputs, progress,
+                            runner)
+
+        failed = [name for name, step_outputs in outputs.items() if step_outputs.failed]
+        if failed:
+            self.logger.warning(f"Steps {', '.join(failed)} failed in task {task_name}")
+            return None
+        result = {}
+        for name in step_configs:
+            result.update(outputs[name].values)
+        return result
+
+    def _run_graph_step(self, task_name: str, name: str, step_configs: Dict[str, Dict[str, Any]],
+                        dependencies: Dict[str, List[str]], outputs: Dict[str, StepOutputs],
+                        progress: Dict[str, Any], runner: Optional[Callable]):
+        step_config = step_configs[name]
+        own = outputs[name]
+        try:
+            each = step_config.get('each')
+            # The dependency whose items this step consumes while it is still producing them
+            source = next((dependency for dependency in dependencies[name] if each and outputs[dependency].per_item
+                           and each in (step_configs[dependency].get('outputs') or [each])), None)
+            context = {}
+            for dependency in dependencies[name]:
+                if dependency == source:
+                    continue
+                values = outputs[dependency].wait()
+                if values is None:
+                    self.logger.info(f"Skipping step {name} because step {dependency} failed")
+                    return
+                context.update(values)
+
+            if not each:
+                result = self.execute_step(step_config, context, runner)
+                if result is None:
+                    return
+                own.finish(self._select_outputs(step_config, result))
+            else:
+                if source is not None:
+                    items = (item.get(each) for item in outputs[source].iter_items())
+                elif isinstance(context.get(each), (list, tuple)):
+                    items = context[each]
+                else:
+                    raise ValueError(f"Step '{name}' runs for each '{each}', but its dependencies do not output "
+                                     f"a list named '{each}'")
+                collected = []
+                for item in items:
+                    result = self.execute_step(step_config, dict(context, **{each: item}), runner)
+                    if result is None:
+                        return
+                    selected = self._select_outputs(step_config, result)
+                    own.add_item(selected)
+                    collected.append(selected)
+                if source is not None and outputs[source].failed:
+                    return
+                keys = step_config.get('outputs') or sorted({key for item in collected for key in item})
+                own.finish({key: [item.get(key) for item in collected] for key in keys})
+
+            with progress['lock']:
+                progress['finished'] += 1
+                finished = progress['finished']
+            if self.event_bus is not None:
+                self.event_bus.publish(STEP_FINISHED, task_name, step=name,
+                                       progress=100.0 * finished / progress['total'])
+        except Exception as e:
+            self.logger.error(f"Error executing step {name}: {str(e)}")
+            self.error_handler.handle_error(e, name, {}, retryable=False)
+        finally:
+            # Unblock the steps waiting on this one if it did not finish
+            if not own.finished:
+                own.fail()
+
+    def _select_outputs(self, step_config: Dict[str, Any], result: Any) -> Dict[str, Any]:
+        declared = step_config.get('outputs')
+        if declared is None:
+            return dict(result) if isinstance(result, dict) else {'result': result}
+        if not isinstance(result, dict):
+            # A plain value can only fill a single declared output
+            if len(declared) == 1:
+                return {declared[0]: result}
+            raise ValueError(f"Step '{step_config.get('name')}' returned {type(result).__name__}, "
+                             f"but declares outputs {', '.join(declared)}")
+        missing = [key for key in declared if key not in result]
+        if missing:
+            self.logger.warning(f"Step {step_config.get('name')} did not return outputs: {', '.join(missing)}")
+        return {key: result[key] for key in declared if key in result}
@@ -0,0 +1,133 @@
+import json
+import math
+import os
+import threading
+from typing import Dict, Any, List, Optional
+import logging
+
+
+class TaskDurationStats:
+    __slots__ = ('count', 'ewma', 'samples', 'memory_overruns')
+
+    def __init__(self, count: int = 0, ewma: Optional[float] = None, samples: Optional[List[float]] = None,
+                 memory_overruns: int = 0):
+        self.count = count
+        self.ewma = ewma
+        self.samples = samples or []
+        self.memory_overruns = memory_overruns
+
+    def add(self, duration: float, alpha: float, max_samples: int):
+        self.count += 1
+        self.ewma = duration if self.ewma is None else alpha * duration + (1 - alpha) * self.ewma
+        self.samples.append(duration)
+        if len(self.samples) > max_samples:
+            del self.samples[:len(self.samples) - max_samples]
+
+    @property
+    def p95(self) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class TaskStatistics:
+    """
+    Per-task duration statistics from previous runs, keyed by workflow and
+    task name: an exponentially weighted moving average plus a bounded
+    window of recent samples for the p95.
+    """
+
+    def __init__(self, path: Optional[str] = None, alpha: float = 0.3, max_samples: int = 50,
+                 logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.alpha = alpha
+        self.max_samples = max_samples
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats: Dict[str, TaskDurationStats] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def _key(workflow: str, task: str) -> str:
+        return f"{workflow}::{task}"
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not load task statistics from {self.path}: {str(e)}")
+            return
+        with self._lock:
+            self.stats = {key: TaskDurationStats(entry.get('count', 0), entry.get('ewma'), entry.get('samples'),
+                                                 entry.get('memory_overruns', 0))
+                          for key, entry in data.items()}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {key: {'count': stats.count, 'ewma': stats.ewma, 'samples': stats.samples,
+                          'memory_overruns': stats.memory_overruns}
+                    for key, stats in self.stats.items()}
+            self._dirty = False
+        with self._save_lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w') as file:
+                json.dump(data, file)
+            os.replace(temp_path, self.path)
+
+    def record(self, workflow: str, task: str, duration: float):
+        with self._lock:
+            stats = self.stats.setdefault(self._key(workflow, task), TaskDurationStats())
+            stats.add(duration, self.alpha, self.max_samples)
+            self._dirty = True
+
+    def record_memory_overruns(self, workflow: str, task: str, overruns: int = 1):
+        with self._lock:
+            stats = self.stats.setdefault(self._key(workflow, task), TaskDurationStats())
+            stats.memory_overruns += overruns
+            self._dirty = True
+
+    def get_memory_overruns(self, workflow: str) -> Dict[str, int]:
+        prefix = f"{workflow}::"
+        with self._lock:
+            return {key[len(prefix):]: stats.memory_overruns for key, stats in self.stats.items()
+                    if key.startswith(prefix) and stats.memory_overruns}
+
+    def get(self, workflow: str, task: str) -> Optional[TaskDurationStats]:
+        return self.stats.get(self._key(workflow, task))
+
+    def estimate(self, workflow: str, task: str, default: Optional[float] = None) -> Optional[float]:
+        stats = self.get(workflow, task)
+        return stats.ewma if stats is not None and stats.ewma is not None else default
+
+    def estimate_all(self, workflow: str, tasks: List[str], use_p95: bool = False) -> Dict[str, float]:
+        """
+        Estimate the duration of the tasks that have been measured before,
+        as their moving average or, with `use_p95`, their p95. Tasks without
+        history are left out rather than guessed.
+        """
+        estimates = {}
+        for task in tasks:
+            stats = self.get(workflow, task)
+            if stats is None or stats.ewma is None:
+                continue
+            value = stats.p95 if use_p95 else stats.ewma
+            estimates[task] = value if value is not None else stats.ewma
+        return estimates
+
+    def to_summary(self, workflow: str) -> Dict[str, Dict[str, Any]]:
+        prefix = f"{workflow}::"
+        with self._lock:
+            return {key[len(prefix):]: {'count': stats.count, 'ewma': stats.ewma, 'p95': stats.p95}
+                    for key, stats in self.stats.items() if key.startswith(prefix)}
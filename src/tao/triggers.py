@@ -0,0 +1,215 @@
+import fnmatch
+import os
+import threading
+from typing import Dict, Any, Callable, Iterable, List, Optional, Set, Tuple
+import logging
+from tao.configuration_manager import ConfigurationManager
+from tao.file_watcher import FileWatcher
+
+TRIGGER_TYPES = ('file_watch',)
+
+# submit(config_file, variables, client)
+SubmitFunction = Callable[[str, Dict[str, Any], str], Any]
+
+
+class FileWatchTrigger:
+    """
+    Starts workflow runs when files matching `patterns` appear or change in
+    a directory.
+
+    By default one run is started per batch of changes, with the changed
+    paths in the `variable` variable (default `trigger_files`). With
+    `map_over`, one run is started per changed file, with that variable set
+    to the file's path. A file is only handed to a run again once its size
+    or modification time changes.
+    """
+
+    def __init__(self, name: str, config_file: str, workflow: str, directory: str, submit: SubmitFunction,
+                 logger: logging.Logger, patterns: Iterable[str] = ('*',), recursive: bool = False,
+                 debounce: float = 0.2, poll_interval: float = 1.0, use_polling: bool = False,
+                 map_over: Optional[str] = None, variable: str = 'trigger_files', process_existing: bool = False):
+        self.name = name
+        self.config_file = config_file
+        self.workflow = workflow
+        self.directory = os.path.abspath(directory)
+        self.submit = submit
+        self.logger = logger
+        self.patterns = tuple(patterns)
+        self.recursive = recursive
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_polling = use_polling
+        self.map_over = map_over
+        self.variable = variable
+        self.process_existing = process_existing
+        self.runs_started = 0
+        self._seen: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def watch_key(self) -> Tuple[str, bool, bool]:
+        return self.directory, self.recursive, self.use_polling
+
+    def matches(self, path: str) -> bool:
+        if not self.recursive and os.path.dirname(path) != self.directory:
+            return False
+        name = os.path.basename(path)
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def existing_files(self) -> Set[str]:
+        paths = set()
+        for root, _, files in os.walk(self.directory):
+            paths.update(os.path.join(root, name) for name in files)
+            if not self.recursive:
+                break
+        return paths
+
+    def handle(self, paths: Iterable[str]) -> int:
+        """
+        Start runs for the files among `paths` that are new or changed.
+
+        Returns:
+            int: The number of runs started.
+        """
+        new_files = []
+        with self._lock:
+            for path in sorted(paths):
+                if not self.matches(path):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    self._seen.pop(path, None)
+                    continue
+                signature = (stat.st_mtime, stat.st_size)
+                if self._seen.get(path) == signature:
+                    continue
+                self._seen[path] = signature
+                new_files.append(path)
+        if not new_files:
+            return 0
+
+        if self.map_over:
+            variable_sets = [{self.map_over: path} for path in new_files]
+        else:
+            variable_sets = [{self.variable: new_files}]
+        for variables in variable_sets:
+            self.submit(self.config_file, dict(variables, trigger=self.name), self.workflow)
+        self.runs_started += len(variable_sets)
+        self.logger.info(f"Trigger '{self.name}' started {len(variable_sets)} run(s) of {self.workflow} for "
+                         f"{len(new_files)} file(s)")
+        return len(variable_sets)
+
+
+class TriggerManager:
+    """
+    Runs the triggers of any number of workflows in one process.
+
+    File watch triggers on the same directory share a single FileWatcher,
+    which uses the shortest debounce and poll interval among them.
+    `use_polling` polls every directory, e.g. on network filesystems where
+    inotify sees no events.
+    """
+
+    def __init__(self, logger: logging.Logger, submit: SubmitFunction, use_polling: bool = False):
+        self.logger = logger
+        self.submit = submit
+        self.use_polling = use_polling
+        self.triggers: List[FileWatchTrigger] = []
+        self._watchers: Dict[Tuple[str, bool, bool], FileWatcher] = {}
+        self._subscribers: Dict[Tuple[str, bool, bool], List[FileWatchTrigger]] = {}
+        self._started = False
+        self._lock = threading.Lock()
+
+    def add_workflow(self, config_manager: ConfigurationManager, config_file: str) -> List[FileWatchTrigger]:
+        """
+        Register the triggers declared in a workflow configuration.
+
+        Raises:
+            ValueError: If a trigger has an unknown type or no directory.
+        """
+        config = config_manager.config or config_manager.load_config()
+        variables = dict(config.global_variables)
+        variables.update(config.workflow.variables)
+        triggers = []
+        for index, trigger_config in enumerate(config.triggers):
+            trigger_type = trigger_config.get('type', 'file_watch')
+            if trigger_type not in TRIGGER_TYPES:
+                raise ValueError(f"Unknown trigger type '{trigger_type}' in {config_file}, expected one of "
+                                 f"{', '.join(TRIGGER_TYPES)}")
+            directory = self._resolve(trigger_config.get('directory'), variables)
+            if not directory:
+                raise ValueError(f"Trigger {index} in {config_file} needs a directory")
+            patterns = trigger_config.get('patterns') or trigger_config.get('pattern') or '*'
+            trigger = FileWatchTrigger(
+                trigger_config.get('name', f"{config.workflow.name}#{index}"),
+                os.path.abspath(config_file), config.workflow.name, directory, self.submit, self.logger,
+                patterns=[patterns] if isinstance(patterns, str) else patterns,
+                recursive=trigger_config.get('recursive', False),
+                debounce=float(trigger_config.get('debounce', 0.2)),
+                poll_interval=float(trigger_config.get('poll_interval', 1.0)),
+                use_polling=self.use_polling or trigger_config.get('use_polling', False),
+                map_over=trigger_config.get('map_over'),
+                variable=trigger_config.get('variable', 'trigger_files'),
+                process_existing=trigger_config.get('process_existing', False))
+            self.add_trigger(trigger)
+            triggers.append(trigger)
+        return triggers
+
+    @staticmethod
+    def _resolve(value: Any, variables: Dict[str, Any]) -> Any:
+        if isinstance(value, str) and value.startswith('${') and value.endswith('}'):
+            return variables.get(value[2:-1])
+        return value
+
+    def add_trigger(self, trigger: FileWatchTrigger):
+        with self._lock:
+            self.triggers.append(trigger)
+            key = trigger.watch_key
+            self._subscribers.setdefault(key, []).append(trigger)
+            watcher = self._watchers.get(key)
+            if watcher is None:
+                os.makedirs(trigger.directory, exist_ok=True)
+                watcher = FileWatcher(trigger.directory, lambda paths, key=key: self._dispatch(key, paths),
+                                      self.logger, recursive=trigger.recursive, debounce=trigger.debounce,
+                                      poll_interval=trigger.poll_interval, use_polling=trigger.use_polling)
+                self._watchers[key] = watcher
+                if self._started:
+                    watcher.start()
+            else:
+                watcher.debounce = min(watcher.debounce, trigger.debounce)
+                watcher.poll_interval = min(watcher.poll_interval, trigger.poll_interval)
+        self.logger.info(f"Registered trigger '{trigger.name}' on {trigger.directory} for {trigger.workflow}")
+        if self._started and trigger.process_existing:
+            trigger.handle(trigger.existing_files())
+
+    def _dispatch(self, key: Tuple[str, bool, bool], paths: Set[str]):
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, []))
+        for trigger in subscribers:
+            try:
+                trigger.handle(paths)
+            except Exception as e:
+                self.logger.error(f"Trigger '{trigger.name}' failed to start a run: {str(e)}")
+
+    def start(self):
+        with self._lock:
+            self._started = True
+            watchers = list(self._watchers.values())
+            triggers = list(self.triggers)
+        for watcher in watchers:
+            watcher.start()
+        for trigger in triggers:
+            if trigger.process_existing:
+                trigger.handle(trigger.existing_files())
+
+    def stop(self):
+        with self._lock:
+            self._started = False
+            watchers = list(self._watchers.values())
+        for watcher in watchers:
+            watcher.stop()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {trigger.name: {'workflow': trigger.workflow, 'directory': trigger.directory,
+                               'runs_started': trigger.runs_started} for trigger in self.triggers}
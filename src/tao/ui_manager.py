@@ -1,24 +1,53 @@
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.progress import Progress, TaskID
-from rich.syntax import Syntax
-from rich.tree import Tree
+import functools
 from typing import Dict, Any, Optional, List
 import logging
 
+# rich renderables are imported where they are used, so headless runs never
+# pay for importing them.
+
+
+def _interactive(method):
+    """
+    Make a display method a no-op when running headless.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.headless:
+            return None
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
 class UIManager:
     def __init__(self, config: Dict[str, Any], logger: logging.Logger):
-        self.console = Console()
         self.config = config
         self.logger = logger
-        self.progress = Progress()
-        self.tasks: Dict[str, TaskID] = {}
-
+        self.headless = config.get('headless', False)
+        self._console = None
+        self._progress = None
+        self.tasks: Dict[str, Any] = {}
+
+    @property
+    def console(self):
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console(quiet=self.headless)
+        return self._console
+
+    @property
+    def progress(self):
+        if self._progress is None:
+            from rich.progress import Progress
+            self._progress = Progress(console=self.console, disable=self.headless)
+        return self._progress
+
+    @_interactive
     def display_welcome(self):
+        from rich.panel import Panel
         welcome_message = self.config.get('welcome_message', 'Welcome to TAO Agent v2.0')
         self.console.print(Panel(welcome_message, expand=False, border_style="bold blue"))
 
+    @_interactive
     def display_progress(self, task_name: str, progress_percentage: float, 
                          step_name: Optional[str] = None, 
                          variables: Optional[Dict[str, Any]] = None,
@@ -39,7 +68,9 @@ class UIManager:
         if variables:
             self.display_variables(variables)
 
+    @_interactive
     def display_variables(self, variables: Dict[str, Any]):
+        from rich.table import Table
         table = Table(title="Current Variables")
         table.add_column("Variable", style="cyan")
         table.add_column("Value", style="magenta")
@@ -49,7 +80,10 @@ class UIManager:
         
         self.console.print(table)
 
+    @_interactive
     def display_task_result(self, task_name: str, result: Any):
+        from rich.table import Table
+        from rich.panel import Panel
         self.console.print(f"[bold green]Task Completed:[/bold green] {task_name}")
         if isinstance(result, dict):
             table = Table(title=f"Result for {task_name}")
@@ -61,21 +95,39 @@ class UIManager:
         else:
             self.console.print(Panel(str(result), title=f"Result for {task_name}", expand=False))
 
+    @_interactive
     def display_error(self, error_message: str, task_name: Optional[str] = None):
+        from rich.panel import Panel
         title = f"Error in task: {task_name}" if task_name else "Error"
         self.console.print(Panel(error_message, title=title, border_style="bold red"))
 
+    @_interactive
+    def display_exception(self, error: BaseException, task_name: Optional[str] = None):
+        from rich.panel import Panel
+        from rich.traceback import Traceback
+        title = f"Error in task '{task_name}'" if task_name else "Error"
+        self.console.print(Panel.fit(Traceback.from_exception(type(error), error, error.__traceback__),
+                                     title=title, border_style="bold red"))
+
+    @_interactive
     def display_warning(self, warning_message: str):
+        from rich.panel import Panel
         self.console.print(Panel(warning_message, title="Warning", border_style="bold yellow"))
 
+    @_interactive
     def display_info(self, info_message: str):
+        from rich.panel import Panel
         self.console.print(Panel(info_message, title="Info", border_style="bold blue"))
 
+    @_interactive
     def display_code(self, code: str, language: str = "python"):
+        from rich.syntax import Syntax
         syntax = Syntax(code, language, theme="monokai", line_numbers=True)
         self.console.print(syntax)
 
+    @_interactive
     def display_workflow_summary(self, summary: Dict[str, Any]):
+        from rich.table import Table
         table = Table(title="Workflow Summary")
         table.add_column("Metric", style="cyan")
         table.add_column("Value", style="magenta")
@@ -85,16 +137,30 @@ class UIManager:
         
         self.console.print(table)
 
-    def display_task_tree(self, tasks: List[Dict[str, Any]]):
-        tree = Tree("Workflow")
+    @_interactive
+    def display_task_tree(self, tasks: List[Dict[str, Any]], estimates: Optional[Dict[str, float]] = None,
+                          estimated_time: Optional[float] = None, estimated_time_p95: Optional[float] = None):
+        from rich.tree import Tree
+        if estimated_time is None:
+            title = "Workflow"
+        elif estimated_time_p95 is None or estimated_time_p95 <= estimated_time:
+            title = f"Workflow (ETA {estimated_time:.1f}s)"
+        else:
+            title = f"Workflow (ETA {estimated_time:.1f}s-{estimated_time_p95:.1f}s)"
+        tree = Tree(title)
         for task in tasks:
-            task_node = tree.add(f"[bold cyan]{task['name']}[/bold cyan]")
-            if 'steps' in task:
+            label = f"[bold cyan]{task['name']}[/bold cyan]"
+            if estimates and task['name'] in estimates:
+                label += f" [dim]~{estimates[task['name']]:.1f}s[/dim]"
+            task_node = tree.add(label)
+            if task.get('steps'):
                 for step in task['steps']:
                     step_node = task_node.add(f"[green]{step['name']}[/green]")
-                    if 'conditions' in step:
+                    if step.get('depends_on'):
+                        step_node.add(f"[dim]after {', '.join(step['depends_on'])}[/dim]")
+                    if step.get('conditions'):
                         step_node.add("[yellow]Conditional[/yellow]")
-            elif 'conditional_logic' in task:
+            elif task.get('conditional_logic'):
                 task_node.add("[yellow]Conditional[/yellow]")
         
         self.console.print(tree)
@@ -102,15 +168,21 @@ class UIManager:
     def prompt_user(self, message: str) -> str:
         return self.console.input(f"[bold yellow]{message}[/bold yellow] ")
 
+    @_interactive
     def display_help(self):
+        from rich.panel import Panel
         help_text = self.config.get('help_text', 'No help available.')
         self.console.print(Panel(help_text, title="Help", expand=False))
 
+    @_interactive
     def clear_screen(self):
         self.console.clear()
 
+    @_interactive
     def start_progress(self):
         self.progress.start()
 
+    @_interactive
     def stop_progress(self):
-        self.progress.stop()
\ No newline at end of file
+        if self._progress is not None:
+            self._progress.stop()
@@ -1,24 +1,89 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set, FrozenSet
 import re
+import threading
 from jinja2 import Template, Environment, meta
 
+_MISSING = object()
+
+class DerivedVariable:
+    """
+    A variable defined by a '{{ ... }}' expression. The template is compiled
+    once and rendered on first read; the rendered value is memoized until one
+    of the variables it depends on changes.
+    """
+    __slots__ = ('expression', 'template', 'dependencies', 'value')
+
+    def __init__(self, expression: str, template: Template, dependencies: FrozenSet[str]):
+        self.expression = expression
+        self.template = template
+        self.dependencies = dependencies
+        # _MISSING until evaluated
+        self.value: Any = _MISSING
+
 class VariableManager:
     def __init__(self, initial_variables: Optional[Dict[str, Any]] = None):
-        self.variables: Dict[str, Any] = initial_variables or {}
+        self.variables: Dict[str, Any] = {}
+        self.derived: Dict[str, DerivedVariable] = {}
+        self.dependents: Dict[str, Set[str]] = {}
         self.jinja_env = Environment()
+        self.versions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._evaluating: Set[str] = set()
+        self.update_variables(initial_variables or {})
 
     def set_variable(self, name: str, value: Any):
         """
         Set a variable with the given name and value.
 
+        String values of the form '{{ ... }}' define derived variables: they
+        are compiled now but only evaluated when first read.
+
         Args:
             name (str): The name of the variable.
             value (Any): The value to assign to the variable.
         """
-        if isinstance(value, str) and self._is_dynamic_expression(value):
-            self.variables[name] = self._evaluate_expression(value)
-        else:
-            self.variables[name] = value
+        with self._lock:
+            self._remove_derived(name)
+            if isinstance(value, str) and self._is_dynamic_expression(value):
+                self.variables.pop(name, None)
+                self._define_derived(name, value)
+            else:
+                self.variables[name] = value
+            self._invalidate(name)
+
+    def _define_derived(self, name: str, expression: str):
+        ast = self.jinja_env.parse(expression)
+        dependencies = frozenset(meta.find_undeclared_variables(ast)) - self.jinja_env.globals.keys()
+        self.derived[name] = DerivedVariable(expression, self.jinja_env.from_string(expression), dependencies)
+        for dependency in dependencies:
+            self.dependents.setdefault(dependency, set()).add(name)
+
+    def _remove_derived(self, name: str):
+        derived = self.derived.pop(name, None)
+        if derived is not None:
+            for dependency in derived.dependencies:
+                dependents = self.dependents.get(dependency)
+                if dependents:
+                    dependents.discard(name)
+
+    def _invalidate(self, name: str):
+        """
+        Bump the version of a variable and drop the memoized values of every
+        derived variable that depends on it, directly or transitively.
+        """
+        self._bump_version(name)
+        pending = list(self.dependents.get(name, ()))
+        seen = set()
+        while pending:
+            dependent = pending.pop()
+            if dependent in seen:
+                continue
+            seen.add(dependent)
+            derived = self.derived.get(dependent)
+            if derived is not None:
+                derived.value = _MISSING
+            self._bump_version(dependent)
+            pending.extend(self.dependents.get(dependent, ()))
 
     def get_variable(self, name: str) -> Any:
         """
@@ -33,18 +98,94 @@ class VariableManager:
         Raises:
             KeyError: If the variable is not found.
         """
-        if name not in self.variables:
+        value = self.lookup(name, _MISSING)
+        if value is _MISSING:
             raise KeyError(f"Variable '{name}' not found")
-        return self.variables[name]
+        return value
+
+    def lookup(self, name: str, default: Any = None) -> Any:
+        """
+        Get the value of a variable, or a default if it is not defined.
+
+        Args:
+            name (str): The name of the variable.
+            default (Any): The value returned when the variable is not defined.
+
+        Returns:
+            Any: The value of the variable or the default.
+        """
+        # set_variable replaces a variable in several steps, so reads wait for it to finish
+        with self._lock:
+            value = self.variables.get(name, _MISSING)
+            if value is not _MISSING:
+                return value
+            derived = self.derived.get(name)
+            if derived is None:
+                return default
+            value = derived.value
+            if value is not _MISSING:
+                return value
+            return self._evaluate_derived(name, derived)
+
+    def _evaluate_derived(self, name: str, derived: DerivedVariable) -> Any:
+        with self._lock:
+            if derived.value is not _MISSING:
+                return derived.value
+            if name in self._evaluating:
+                raise ValueError(f"Circular dependency while evaluating variable '{name}'")
+            self._evaluating.add(name)
+            try:
+                context = {}
+                for dependency in derived.dependencies:
+                    value = self.lookup(dependency, _MISSING)
+                    if value is not _MISSING:
+                        context[dependency] = value
+                try:
+                    value = derived.template.render(context)
+                except Exception as e:
+                    raise ValueError(f"Error evaluating expression '{derived.expression}': {str(e)}")
+                derived.value = value
+                return value
+            finally:
+                self._evaluating.discard(name)
+
+    def get_version(self, name: str) -> int:
+        """
+        Get the change counter of a variable. The counter increases every time
+        the variable, or a variable it is derived from, is set or deleted, so
+        callers can cache values derived from it.
+
+        Args:
+            name (str): The name of the variable.
+
+        Returns:
+            int: The current version, 0 if the variable was never set.
+        """
+        return self.versions.get(name, 0)
+
+    def _bump_version(self, name: str):
+        self.versions[name] = self.versions.get(name, 0) + 1
 
     def get_all_variables(self) -> Dict[str, Any]:
         """
-        Get all variables as a dictionary.
+        Get all variables as a dictionary, evaluating derived variables that
+        have not been read yet. Derived variables that fail to evaluate are
+        left out; reading one of them with get_variable raises the error.
 
         Returns:
             Dict[str, Any]: A dictionary containing all variables.
         """
-        return self.variables.copy()
+        with self._lock:
+            variables = self.variables.copy()
+            for name, derived in self.derived.items():
+                value = derived.value
+                if value is _MISSING:
+                    try:
+                        value = self._evaluate_derived(name, derived)
+                    except ValueError:
+                        continue
+                variables[name] = value
+            return variables
 
     def update_variables(self, new_variables: Dict[str, Any]):
         """
@@ -66,7 +207,7 @@ class VariableManager:
         Returns:
             str: The template with variables resolved.
         """
-        return Template(template).render(self.variables)
+        return Template(template).render(self.get_all_variables())
 
     def _is_dynamic_expression(self, value: str) -> bool:
         """
@@ -82,7 +223,7 @@ class VariableManager:
 
     def _evaluate_expression(self, expression: str) -> Any:
         """
-        Evaluate a dynamic expression.
+        Evaluate a dynamic expression immediately.
 
         Args:
             expression (str): The expression to evaluate.
@@ -95,7 +236,7 @@ class VariableManager:
         """
         template = self.jinja_env.from_string(expression)
         try:
-            return template.render(self.variables)
+            return template.render(self.get_all_variables())
         except Exception as e:
             raise ValueError(f"Error evaluating expression '{expression}': {str(e)}")
 
@@ -111,13 +252,18 @@ class VariableManager:
         """
         ast = self.jinja_env.parse(template)
         undefined = meta.find_undeclared_variables(ast)
-        return undefined - set(self.variables.keys())
+        return undefined - set(self.variables.keys()) - set(self.derived.keys()) - self.jinja_env.globals.keys()
 
     def clear_variables(self):
         """
         Clear all variables.
         """
-        self.variables.clear()
+        with self._lock:
+            for name in list(self.variables) + list(self.derived):
+                self._bump_version(name)
+            self.variables.clear()
+            self.derived.clear()
+            self.dependents.clear()
 
     def delete_variable(self, name: str):
         """
@@ -129,6 +275,9 @@ class VariableManager:
         Raises:
             KeyError: If the variable is not found.
         """
-        if name not in self.variables:
-            raise KeyError(f"Variable '{name}' not found")
-        del self.variables[name]
\ No newline at end of file
+        with self._lock:
+            if name not in self.variables and name not in self.derived:
+                raise KeyError(f"Variable '{name}' not found")
+            self.variables.pop(name, None)
+            self._remove_derived(name)
+            self._invalidate(name)
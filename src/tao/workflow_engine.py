@@ -1,7 +1,10 @@
+import heapq
+import os
 import time
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
 import logging
-from tao.configuration_manager import ConfigurationManager
+from tao.configuration_manager import ConfigurationManager, TaskConfig
 from tao.plugin_system import PluginSystem
 from tao.ui_manager import UIManager
 from tao.task_executor import TaskExecutor
@@ -9,12 +12,25 @@ from tao.variable_manager import VariableManager
 from tao.conditional_logic import ConditionalLogic
 from tao.error_handler import ErrorHandler
 from tao.state_machine import StateMachine
+from tao.metrics import WorkflowMetrics
+from tao.scheduler import TaskScheduler
+from tao.resources import ResourcePool, shared_resource_pool
+from tao.task_statistics import TaskStatistics
+from tao.run_history import RunHistoryStore
+from tao.event_bus import (WorkflowEvent, BLOCK, WORKFLOW_STARTED, TASK_QUEUED, TASK_STARTED, TASK_FINISHED,
+                           TASK_FAILED, TASK_SKIPPED, WORKFLOW_FINISHED)
+from tao.event_subscribers import create_event_bus
+from tao.memory_budget import MemoryMonitor
+from tao.subworkflows import SubWorkflowExpander
 
 class WorkflowEngine:
     def __init__(self, config: ConfigurationManager, plugins: PluginSystem, 
                  ui_manager: UIManager, variable_manager: VariableManager, 
                  conditional_logic: ConditionalLogic, error_handler: ErrorHandler, 
-                 logger: logging.Logger):
+                 logger: logging.Logger, metrics: Optional[WorkflowMetrics] = None,
+                 task_statistics: Optional[TaskStatistics] = None,
+                 run_history: Optional[RunHistoryStore] = None,
+                 resource_pool: Optional[ResourcePool] = None):
         self.config = config
         self.plugins = plugins
         self.ui_manager = ui_manager
@@ -22,53 +38,167 @@ class WorkflowEngine:
         self.conditional_logic = conditional_logic
         self.error_handler = error_handler
         self.logger = logger
+        self.metrics = metrics
+        self.task_statistics = task_statistics
+        self.run_history = run_history
+        self.resource_pool = resource_pool if resource_pool is not None else \
+            shared_resource_pool(config.get_engine_config(), logger)
         self.state_machine = StateMachine(logger)
+        self.event_bus = None
+        self.event_subscribers: List[Tuple[str, Callable, str, Optional[Iterable[str]]]] = []
+        self.memory_monitor: Optional[MemoryMonitor] = None
+        self.subworkflows = SubWorkflowExpander(logger, metrics)
+        plugins.apply_configuration(os.path.abspath(config.config_file),
+                                    config.config.plugins if config.config else [],
+                                    config.get_engine_config().get('resource_pools', {}))
         self.task_executor = TaskExecutor(plugins, variable_manager, conditional_logic, error_handler, logger)
 
+    def add_event_subscriber(self, name: str, handler: Callable[[WorkflowEvent], None], policy: str = BLOCK,
+                             event_types: Optional[Iterable[str]] = None):
+        """
+        Subscribe a handler to the events of every run of this engine, next
+        to the built-in UI, logging, metrics and history consumers.
+        """
+        self.event_subscribers.append((name, handler, policy, event_types))
+
     def execute_workflow(self) -> bool:
         workflow_config = self.config.get_workflow_config()
-        self.ui_manager.display_welcome()
-        self.ui_manager.display_task_tree(workflow_config.tasks)
-        self.ui_manager.start_progress()
+        engine_config = self.config.get_engine_config()
+        max_parallel_tasks = max(1, int(engine_config.get('max_parallel_tasks', 1)))
+
+        # Sub-workflow tasks are replaced by their own tasks, so one scheduler sees the whole graph
+        tasks, subworkflow_variables = self.subworkflows.expand(
+            workflow_config.tasks, os.path.dirname(os.path.abspath(self.config.config_file)))
+        self.variable_manager.update_variables(subworkflow_variables)
+
+        scheduler = TaskScheduler(tasks, self.conditional_logic, self.logger, self.resource_pool,
+                                  max_bypass=int(engine_config.get('max_resource_bypass', 3)))
+        estimates = None
+        estimated_time = estimated_time_p95 = None
+        if self.task_statistics is not None:
+            if self.run_history is not None and not self.task_statistics.to_summary(workflow_config.name):
+                self.run_history.load_task_statistics(self.task_statistics, workflow_config.name)
+            estimates = self.task_statistics.estimate_all(workflow_config.name, list(scheduler.nodes)) or None
+            if estimates:
+                scheduler.set_durations(estimates)
+                estimated_time = scheduler.estimate_remaining(max_parallel_tasks)
+                estimated_time_p95 = scheduler.estimate_remaining(
+                    max_parallel_tasks,
+                    self.task_statistics.estimate_all(workflow_config.name, list(scheduler.nodes), use_p95=True))
+
+        run_id = self.run_history.start_run(workflow_config.name) if self.run_history is not None else None
+        self.event_bus = create_event_bus(engine_config.get('events', {}), self.logger, self.ui_manager,
+                                          self.metrics, self.run_history, run_id, workflow_config.name)
+        for name, handler, policy, event_types in self.event_subscribers:
+            self.event_bus.subscribe(name, handler, policy, event_types)
+        self.error_handler.set_event_bus(self.event_bus)
+        self.task_executor.set_event_bus(self.event_bus)
+        self.memory_monitor = self._create_memory_monitor(workflow_config, tasks, engine_config)
+        self.event_bus.publish(WORKFLOW_STARTED, tasks=[task.dict() for task in tasks],
+                               estimates=estimates, estimated_time=estimated_time,
+                               estimated_time_p95=estimated_time_p95)
 
         start_time = time.time()
-        total_tasks = len(workflow_config.tasks)
+        total_tasks = len(tasks)
         completed_tasks = 0
         failed_tasks = 0
+        aborted = False
 
         try:
-            for task_config in workflow_config.tasks:
-                task_name = task_config.name
-                self.logger.info(f"Starting task: {task_name}")
-                self.state_machine.set_task(task_name)
-                self.state_machine.start_task()
-
-                try:
-                    if task_config.steps:
-                        result = self.task_executor.execute_task_with_steps(task_name, task_config.dict())
-                    else:
-                        result = self.task_executor.execute_task(task_name, task_config.dict())
-
-                    if result is not None:
-                        self.ui_manager.display_task_result(task_name, result)
-                        self.state_machine.task_completed()
-                        completed_tasks += 1
-                    else:
-                        self.state_machine.task_failed()
-                        failed_tasks += 1
-
-                except Exception as e:
-                    self.logger.error(f"Error in task {task_name}: {str(e)}")
-                    self.ui_manager.display_error(str(e), task_name)
-                    self.state_machine.task_failed()
-                    failed_tasks += 1
+            self._mark_skipped(scheduler.prune_static_gates(self.variable_manager))
+
+            with ThreadPoolExecutor(max_workers=max_parallel_tasks, thread_name_prefix='tao-task') as pool:
+                in_flight: Dict[Future, Any] = {}
+                # Failed tasks waiting out their retry delay, as (due time, name); no pool thread is held meanwhile
+                retry_due: List[Tuple[float, str]] = []
+                retrying = set()
+                while True:
+                    while retry_due and retry_due[0][0] <= time.monotonic():
+                        scheduler.requeue(heapq.heappop(retry_due)[1])
+
+                    while not aborted and len(in_flight) < max_parallel_tasks:
+                        node = scheduler.next_ready()
+                        if node is None:
+                            break
+                        if node.name in retrying:
+                            retrying.discard(node.name)
+                        elif self._skip_gated_task(scheduler, node):
+                            scheduler.release(node.name)
+                            continue
+                        else:
+                            self.state_machine.start_task(node.name)
+                        self.event_bus.publish(TASK_QUEUED, node.name)
+                        in_flight[pool.submit(self._run_task, node.config)] = node
 
-                    if self.error_handler.should_abort_workflow():
-                        self.logger.error("Workflow aborted due to excessive errors")
-                        self.ui_manager.display_error("Workflow aborted due to excessive errors")
-                        return False
+                    if self.metrics is not None:
+                        self.metrics.ready_queue_depth.set(scheduler.ready_count())
+                    retry_wait = max(0.0, retry_due[0][0] - time.monotonic()) if retry_due and not aborted else None
+                    if not in_flight:
+                        if aborted or (retry_wait is None and
+                                       (self.resource_pool is None or not scheduler.ready_count())):
+                            break
+                        if retry_wait is not None and not scheduler.ready_count():
+                            time.sleep(retry_wait)
+                            continue
+                        # Another run sharing the resource pool holds what the ready tasks need
+                        self.resource_pool.wait_for_release(1.0 if retry_wait is None else min(1.0, retry_wait))
+                        continue
 
-                self.ui_manager.display_progress(task_name, 100)
+                    done, _ = wait(in_flight, timeout=retry_wait, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        node = in_flight.pop(future)
+                        task_name = node.name
+                        scheduler.release(task_name)
+
+                        try:
+                            result, started_at, duration = future.result()
+                        except Exception as e:
+                            self.event_bus.publish(TASK_FAILED, task_name, error=str(e), raised=True,
+                                                   retries=self.error_handler.get_retry_count(task_name))
+                            self.state_machine.task_failed(task_name)
+                            failed_tasks += 1
+                            self._mark_skipped(scheduler.mark_failed(task_name))
+
+                            if not aborted and self.error_handler.should_abort_workflow():
+                                aborted = True
+                            continue
+
+                        if result is not None:
+                            self.state_machine.task_completed(task_name)
+                            completed_tasks += 1
+                            if self.task_statistics is not None:
+                                self.task_statistics.record(workflow_config.name, task_name, duration)
+                            self.event_bus.publish(TASK_FINISHED, task_name, result=result, started_at=started_at,
+                                                   duration=duration,
+                                                   retries=self.error_handler.get_retry_count(task_name))
+                            self._mark_skipped(scheduler.route_branches(task_name, result, self.variable_manager))
+                            self._mark_skipped(scheduler.mark_completed(task_name))
+                        else:
+                            retry_delay = self.error_handler.take_retry(task_name)
+                            if retry_delay is not None and not aborted:
+                                retrying.add(task_name)
+                                heapq.heappush(retry_due, (time.monotonic() + retry_delay, task_name))
+                                continue
+                            self.state_machine.task_failed(task_name)
+                            failed_tasks += 1
+                            self.event_bus.publish(TASK_FAILED, task_name, started_at=started_at, duration=duration,
+                                                   error=self.error_handler.get_last_error(task_name),
+                                                   retries=self.error_handler.get_retry_count(task_name))
+                            self._mark_skipped(scheduler.mark_failed(task_name))
+
+                # Retries still waiting when the workflow was aborted will not run
+                for task_name in sorted(retrying):
+                    self.state_machine.task_failed(task_name)
+                    failed_tasks += 1
+                    self.event_bus.publish(TASK_FAILED, task_name, error=self.error_handler.get_last_error(task_name),
+                                           retries=self.error_handler.get_retry_count(task_name))
+                    self._mark_skipped(scheduler.mark_failed(task_name))
+
+            counts = {'total': total_tasks, 'completed': completed_tasks, 'failed': failed_tasks,
+                      'skipped': total_tasks - completed_tasks - failed_tasks}
+            if aborted:
+                self.event_bus.publish(WORKFLOW_FINISHED, status='aborted', counts=counts)
+                return False
 
             end_time = time.time()
             execution_time = end_time - start_time
@@ -77,19 +207,101 @@ class WorkflowEngine:
                 "Total Tasks": total_tasks,
                 "Completed Tasks": completed_tasks,
                 "Failed Tasks": failed_tasks,
+                "Skipped Tasks": total_tasks - completed_tasks - failed_tasks,
                 "Execution Time": f"{execution_time:.2f} seconds"
             }
-            self.ui_manager.display_workflow_summary(summary)
-
-            return completed_tasks == total_tasks
+            if self.metrics is not None:
+                for cache_name, hit_rate in self.metrics.get_cache_hit_rates().items():
+                    summary[f"Cache Hit Rate ({cache_name})"] = f"{hit_rate:.1%}"
+            if estimated_time is not None:
+                summary["Estimated Time"] = \
+                    f"{estimated_time:.2f} seconds (p95 {estimated_time_p95:.2f} seconds)"
+            if self.memory_monitor is not None:
+                for task_name, peak_mb in self.memory_monitor.get_peaks().items():
+                    summary[f"Peak Memory ({task_name})"] = f"{peak_mb:.1f} MB"
+            for group in self.error_handler.get_error_groups():
+                if group['count'] > 1:
+                    summary[f"Repeated Error ({group['fingerprint']})"] = \
+                        f"{group['count']}x {group['type']} in {len(group['tasks'])} task(s): {group['message'][:80]}"
+            for circuit, stats in self.error_handler.get_circuit_stats().items():
+                if stats['times_opened']:
+                    summary[f"Circuit ({circuit})"] = \
+                        f"{stats['state']}, opened {stats['times_opened']}x, {stats['rejected']} calls failed fast"
+            self.event_bus.publish(WORKFLOW_FINISHED, status='completed' if failed_tasks == 0 else 'failed',
+                                   counts=counts, summary=summary)
+            return failed_tasks == 0
 
         except Exception as e:
-            self.logger.error(f"Unexpected error in workflow execution: {str(e)}")
-            self.ui_manager.display_error(f"Unexpected error in workflow execution: {str(e)}")
+            self.logger.exception(f"Unexpected error in workflow execution: {str(e)}")
+            self.event_bus.publish(WORKFLOW_FINISHED, status='error', error=str(e),
+                                   counts={'total': total_tasks, 'completed': completed_tasks,
+                                           'failed': failed_tasks,
+                                           'skipped': total_tasks - completed_tasks - failed_tasks})
             return False
 
         finally:
-            self.ui_manager.stop_progress()
+            # Let the subscribers catch up so output and history are complete when the run returns
+            self.event_bus.close()
+            self.error_handler.set_event_bus(None)
+            self.task_executor.set_event_bus(None)
+            if self.memory_monitor is not None:
+                self.memory_monitor.stop()
+                if self.task_statistics is not None:
+                    for task_name, overruns in self.memory_monitor.overruns.items():
+                        self.task_statistics.record_memory_overruns(workflow_config.name, task_name, overruns)
+            if self.task_statistics is not None:
+                self.task_statistics.save()
+
+    def _skip_gated_task(self, scheduler: TaskScheduler, node) -> bool:
+        if node.gate is None or self.conditional_logic.evaluate_with(node.gate, self.variable_manager):
+            return False
+        taken, not_taken = self.conditional_logic.select_branch(node.gate, False)
+        self._mark_skipped(scheduler.skip(node.name, "condition is false", dispatched=True), reason="conditional logic")
+        self._mark_skipped(scheduler.prune_branch(node.name, taken, not_taken))
+        return True
+
+    def _create_memory_monitor(self, workflow_config, tasks: List[TaskConfig],
+                               engine_config: Dict[str, Any]) -> Optional[MemoryMonitor]:
+        memory_config = engine_config.get('memory', {})
+        budgeted = any(task.max_memory_mb or task.isolated for task in tasks)
+        if not budgeted and not memory_config.get('enabled', False):
+            return None
+        previous_overruns = self.task_statistics.get_memory_overruns(workflow_config.name) \
+            if self.task_statistics is not None else None
+        isolated_timeout = memory_config.get('isolated_timeout', 3600)
+        return MemoryMonitor(self.logger, float(memory_config.get('sample_interval', 0.1)),
+                             int(memory_config.get('isolate_after', 1)), previous_overruns,
+                             float(isolated_timeout) if isolated_timeout else None)
+
+    def _run_task(self, task_config: TaskConfig):
+        self.event_bus.publish(TASK_STARTED, task_config.name)
+        started_at = time.time()
+        start_time = time.perf_counter()
+        if self.memory_monitor is None:
+            result = self._execute_task(task_config)
+        else:
+            result = self._execute_task_with_memory_budget(task_config)
+        return result, started_at, time.perf_counter() - start_time
+
+    def _execute_task(self, task_config: TaskConfig, runner=None):
+        if task_config.steps:
+            return self.task_executor.execute_task_with_steps(task_config.name, task_config.dict(), runner)
+        return self.task_executor.execute_task(task_config.name, task_config.dict(), runner)
+
+    def _execute_task_with_memory_budget(self, task_config: TaskConfig):
+        isolated = bool(task_config.isolated) or self.memory_monitor.should_isolate(task_config.name)
+        if isolated and not task_config.isolated:
+            self.logger.info(f"Running task {task_config.name} in an isolated process after memory overruns")
+        budgeted = isolated or task_config.max_memory_mb is not None
+        with self.memory_monitor.track(task_config.name, task_config.max_memory_mb, isolated,
+                                       task_config.timeout) as tracker:
+            # Overruns fail the plugin call inside the TaskExecutor, so they are retried like other errors
+            return self._execute_task(task_config, tracker.run if budgeted else None)
+
+    def _mark_skipped(self, task_names: List[str], reason: Optional[str] = None):
+        for task_name in task_names:
+            self.state_machine.task_skipped(task_name)
+            self.event_bus.publish(TASK_SKIPPED, task_name, reason=reason)
 
     def execute_action(self, action_config: Dict[str, Any]):
         action_name = action_config.get('function', 'Unknown Action')
@@ -142,14 +354,72 @@ class WorkflowEngine:
     def pause_workflow(self):
         self.logger.info("Workflow paused")
         self.ui_manager.display_info("Workflow paused")
-        self.state_machine.pause_task()
+        for task_name, state in self.state_machine.get_all_task_states().items():
+            if state == 'in_progress':
+                self.state_machine.pause_task(task_name)
 
     def resume_workflow(self):
         self.logger.info("Workflow resumed")
         self.ui_manager.display_info("Workflow resumed")
-        self.state_machine.resume_task()
+        for task_name, state in self.state_machine.get_all_task_states().items():
+            if state == 'paused':
+                self.state_machine.resume_task(task_name)
 
     def abort_workflow(self):
         self.logger.warning("Workflow aborted")
         self.ui_manager.display_warning("Workflow aborted")
-        return False
\ No newline at end of file
+        return False
+
+
+def build_workflow_engine(config_manager: ConfigurationManager, plugin_system: PluginSystem,
+                          logger: logging.Logger, variables: Optional[Dict[str, Any]] = None,
+                          ui_config: Optional[Dict[str, Any]] = None,
+                          metrics: Optional[WorkflowMetrics] = None,
+                          task_statistics: Optional[TaskStatistics] = None,
+                          run_history: Optional[RunHistoryStore] = None,
+                          resource_pool: Optional[ResourcePool] = None) -> WorkflowEngine:
+    """
+    Build a WorkflowEngine for a single run on top of an already loaded
+    configuration and plugin system.
+
+    Every call gets its own VariableManager, ErrorHandler and StateMachine, so
+    several engines can share one warm PluginSystem without seeing each
+    other's variables or task states.
+
+    Args:
+        config_manager (ConfigurationManager): A configuration manager whose config is loaded.
+        plugin_system (PluginSystem): The shared plugin system with plugins loaded.
+        logger (logging.Logger): Logger for the run.
+        variables (Optional[Dict[str, Any]]): Variables overriding the configured ones.
+        ui_config (Optional[Dict[str, Any]]): UI configuration; defaults to headless.
+        metrics (Optional[WorkflowMetrics]): Optional metrics sink.
+        task_statistics (Optional[TaskStatistics]): Shared duration statistics used for
+            prioritization and ETAs.
+        run_history (Optional[RunHistoryStore]): Store that records runs and task attempts.
+        resource_pool (Optional[ResourcePool]): Host capacities shared with other runs;
+            defaults to the process-wide pool for the configured resources.
+
+    Returns:
+        WorkflowEngine: An engine ready to execute the workflow.
+    """
+    config = config_manager.config or config_manager.load_config()
+    error_handling = config.error_handling.dict(by_alias=True)
+    circuit_breakers = plugin_system.get_circuit_breakers(os.path.abspath(config_manager.config_file),
+                                                          error_handling.get('circuit_breakers'))
+    run_variables = dict(config.global_variables)
+    run_variables.update(config.workflow.variables)
+    run_variables.update(variables or {})
+
+    return WorkflowEngine(
+        config=config_manager,
+        plugins=plugin_system,
+        ui_manager=UIManager(ui_config if ui_config is not None else {'headless': True}, logger),
+        variable_manager=VariableManager(run_variables),
+        conditional_logic=ConditionalLogic(logger, metrics),
+        error_handler=ErrorHandler(error_handling, logger, metrics, circuit_breakers),
+        logger=logger,
+        metrics=metrics,
+        task_statistics=task_statistics,
+        run_history=run_history,
+        resource_pool=resource_pool
+    )
\ No newline at end of file
@@ -0,0 +1,6 @@
+import os
+import sys
+
+SRC_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIRECTORY not in sys.path:
+    sys.path.insert(0, SRC_DIRECTORY)
@@ -0,0 +1,74 @@
+import logging
+import sqlite3
+import threading
+import time
+import pytest
+from tao.connection_pools import ConnectionPool, PoolRegistry, PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+def sqlite_pool(max_size: int) -> ConnectionPool:
+    return ConnectionPool('db', lambda: sqlite3.connect(':memory:', check_same_thread=False), max_size=max_size,
+                          timeout=5.0, logger=logger)
+
+
+def wait_for_waiters(pool: ConnectionPool, count: int):
+    deadline = time.time() + 5
+    while pool.get_stats()['waiting'] < count:
+        assert time.time() < deadline, "waiters did not queue up"
+        time.sleep(0.01)
+
+
+def test_lease_limit():
+    pool = sqlite_pool(max_size=2)
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second
+    assert pool.get_stats()['leased'] == 2
+
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.1)
+    assert pool.get_stats()['waiting'] == 0
+
+    pool.release(first)
+    assert pool.acquire(timeout=0.1) is first
+    assert pool.get_stats()['created'] == 2
+
+
+def test_waiters_are_served_in_arrival_order():
+    pool = sqlite_pool(max_size=1)
+    held = pool.acquire()
+    order = []
+
+    def lease(index: int):
+        with pool.lease() as connection:
+            assert connection is held
+            order.append(index)
+
+    threads = []
+    for index in range(3):
+        thread = threading.Thread(target=lease, args=(index,))
+        thread.start()
+        threads.append(thread)
+        wait_for_waiters(pool, index + 1)
+
+    pool.release(held)
+    for thread in threads:
+        thread.join(5)
+    assert order == [0, 1, 2]
+    assert pool.get_stats() == {'max_size': 1, 'created': 1, 'idle': 1, 'leased': 0, 'waiting': 0}
+
+
+def test_close_all_closes_idle_connections():
+    registry = PoolRegistry(logger)
+    registry.configure({'db': {'type': 'sqlite', 'database': ':memory:', 'max_size': 2}})
+    pool = registry.get('db')
+    with registry.lease('db') as connection:
+        connection.execute("SELECT 1")
+
+    registry.close_all()
+    assert registry.pools == {}
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
+    with pytest.raises(RuntimeError):
+        pool.acquire()
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tao.base_plugin import BasePlugin
+from tao.distributed import Coordinator, RemoteTaskError, WorkerAgent
+from tao.plugin_system import PluginSystem
+
+logger = logging.getLogger(__name__)
+
+
+class SleepPlugin(BasePlugin):
+    def __init__(self, worker_id: str):
+        self.worker_id = worker_id
+
+    def initialize(self):
+        pass
+
+    def cleanup(self):
+        pass
+
+    def execute_task(self, task_name, parameters, variables):
+        time.sleep(parameters.get('sleep', 0))
+        return {'worker': self.worker_id, 'value': parameters.get('value')}
+
+
+def start_worker(port: int, worker_id: str):
+    plugin_system = PluginSystem('.', logger)
+    plugin_system.plugins['sleep_plugin'] = SleepPlugin(worker_id)
+    agent = WorkerAgent(plugin_system, logger, port=port, worker_id=worker_id, capacity=1, heartbeat_interval=0.1)
+    thread = threading.Thread(target=agent.run, daemon=True)
+    thread.start()
+    return agent, thread
+
+
+@pytest.fixture
+def cluster():
+    coordinator = Coordinator(logger, port=0, heartbeat_timeout=1.0, max_attempts=2)
+    coordinator.start()
+    workers = [start_worker(coordinator.port, worker_id) for worker_id in ('w1', 'w2')]
+    assert coordinator.wait_for_workers(2, timeout=5)
+    yield coordinator, workers
+    for agent, thread in workers:
+        agent.stop()
+        thread.join(5)
+    coordinator.stop()
+
+
+def execute(coordinator, value, sleep=0.0, **kwargs):
+    return coordinator.execute('sleep_plugin', 'run', {'value': value, 'sleep': sleep}, {}, locality=[], **kwargs)
+
+
+def test_calls_are_spread_over_workers(cluster):
+    coordinator, _ = cluster
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda value: execute(coordinator, value, sleep=0.2), range(4)))
+    assert [result['value'] for result in results] == [0, 1, 2, 3]
+    assert {result['worker'] for result in results} == {'w1', 'w2'}
+
+
+def test_unknown_plugin_fails_at_once(cluster):
+    coordinator, _ = cluster
+    start = time.monotonic()
+    with pytest.raises(RemoteTaskError, match='No worker has plugin'):
+        coordinator.execute('missing_plugin', 'run', {}, {})
+    assert time.monotonic() - start < 0.5
+
+
+def test_calls_on_a_lost_worker_run_on_another(cluster):
+    coordinator, workers = cluster
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(execute, coordinator, value, 0.5) for value in range(2)]
+        time.sleep(0.2)
+        lost, _ = workers[0]
+        lost.stop()
+        results = [future.result(timeout=10) for future in futures]
+    assert [result['value'] for result in results] == [0, 1]
+    assert {result['worker'] for result in results} == {'w2'}
+
+
+def test_redispatch_fails_when_no_worker_is_left(cluster):
+    coordinator, workers = cluster
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(execute, coordinator, 0, 0.5)
+        time.sleep(0.2)
+        for agent, _ in workers:
+            agent.stop()
+        with pytest.raises(RemoteTaskError):
+            future.result(timeout=5)
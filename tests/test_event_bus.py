@@ -0,0 +1,58 @@
+import logging
+import threading
+from tao.event_bus import EventBus, DROP, TASK_FAILED, TASK_STARTED
+
+logger = logging.getLogger(__name__)
+
+
+def test_lagging_drop_subscriber_keeps_never_drop_events_once():
+    bus = EventBus(logger, capacity=4)
+    received = []
+    first_batch = threading.Event()
+    release = threading.Event()
+
+    def handler(event):
+        if not first_batch.is_set():
+            first_batch.set()
+            release.wait(5)
+        received.append((event.event_type, event.task))
+
+    subscription = bus.subscribe('ui', handler, DROP, never_drop=(TASK_FAILED,))
+    for index in range(4):
+        bus.publish(TASK_FAILED, f"f{index}")
+    assert first_batch.wait(5)
+    for index in range(4, 8):
+        bus.publish(TASK_STARTED, f"s{index}")
+    for index in range(8, 12):
+        bus.publish(TASK_FAILED, f"f{index}")
+    release.set()
+    bus.close(5)
+
+    # The first batch was already taken when the buffer wrapped, so nothing is rescued twice
+    assert received == [(TASK_FAILED, f"f{index}") for index in list(range(4)) + list(range(8, 12))]
+    assert subscription.dropped == 4
+
+
+def test_rescued_events_are_not_counted_as_dropped():
+    bus = EventBus(logger, capacity=2)
+    received = []
+    first_batch = threading.Event()
+    release = threading.Event()
+
+    def handler(event):
+        if not first_batch.is_set():
+            first_batch.set()
+            release.wait(5)
+        received.append(event.task)
+
+    subscription = bus.subscribe('ui', handler, DROP, never_drop=(TASK_FAILED,))
+    bus.publish(TASK_STARTED, 'first')
+    assert first_batch.wait(5)
+    bus.publish(TASK_FAILED, 'failed')
+    for index in range(4):
+        bus.publish(TASK_STARTED, f"s{index}")
+    release.set()
+    bus.close(5)
+
+    assert received == ['first', 'failed', 's2', 's3']
+    assert subscription.dropped == 2
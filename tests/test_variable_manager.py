@@ -0,0 +1,18 @@
+import pytest
+from tao.variable_manager import VariableManager
+
+
+def test_failing_derived_variable_is_left_out_of_all_variables():
+    variables = VariableManager({'items': [1, 2], 'total': '{{ items | sum }}', 'broken': '{{ missing() }}'})
+
+    assert variables.get_all_variables() == {'items': [1, 2], 'total': '3'}
+    with pytest.raises(ValueError):
+        variables.get_variable('broken')
+
+
+def test_derived_variable_is_invalidated_when_its_dependency_changes():
+    variables = VariableManager({'name': 'a', 'output_file': "{{ name ~ '.csv' }}"})
+    assert variables.get_variable('output_file') == 'a.csv'
+
+    variables.set_variable('name', 'b')
+    assert variables.get_all_variables()['output_file'] == 'b.csv'